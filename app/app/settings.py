@@ -48,11 +48,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.InstrumentationMiddleware',
+    'core.middleware.ConcurrencyLimitMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.db_routers.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -83,14 +88,52 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # django.db.backends.sqlite3 to run locally, DB_NAME is then a file
+        'ENGINE': os.environ.get(
+            'DB_ENGINE', 'django.db.backends.postgresql',
+        ),
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # seconds a connection is reused, 0 to close it after each request
+        # (which also closes the one opened by the warm-up, see WARM_UP)
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
     }
 }
 
+# Read replicas, one alias per host of DB_REPLICA_HOSTS (coma separated).
+# With SQLite the host is ignored and the replica is a second connection
+# to the same file. The replicas need a shared cache, see CACHES
+for index, host in enumerate(
+    filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))
+):
+    DATABASES[f'replica{index + 1}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+DATABASE_ROUTERS = ['core.db_routers.ReplicaRouter']
+
+# Cache, shared by the workers when CACHE_BACKEND is e.g.
+# django.core.cache.backends.redis.RedisCache (needs redis) with
+# CACHE_LOCATION=redis://host:6379, or the file based cache on one host.
+# The default local memory cache is per process
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Seconds a client reads from the primary after a write
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -114,6 +157,41 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing: 'pbkdf2', 'scrypt' or 'argon2' (needs argon2-cffi).
+# The other hashers stay enabled so existing passwords are rehashed with
+# the selected one on the next login.
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+
+_password_hashers = {
+    'pbkdf2': 'core.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'core.hashers.ScryptPasswordHasher',
+    'argon2': 'core.hashers.Argon2PasswordHasher',
+}
+PASSWORD_HASHERS = [_password_hashers.pop(PASSWORD_HASHER)] + list(
+    _password_hashers.values()
+) + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+
+PASSWORD_PBKDF2_ITERATIONS = int(
+    os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 320000)
+)
+PASSWORD_SCRYPT_WORK_FACTOR = int(
+    os.environ.get('PASSWORD_SCRYPT_WORK_FACTOR', 2 ** 14)
+)
+PASSWORD_ARGON2_TIME_COST = int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 2))
+PASSWORD_ARGON2_MEMORY_COST = int(
+    os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 102400)
+)
+
+# Concurrent password hash computations of the API per worker, and how
+# many seconds a login waits for a free slot before getting a 503. The
+# default shares the CPUs between the WEB_CONCURRENCY workers, the worker
+# count gunicorn and uvicorn read
+PASSWORD_HASH_CONCURRENCY = int(os.environ.get(
+    'PASSWORD_HASH_CONCURRENCY',
+    max(1, (os.cpu_count() or 1) // int(os.environ.get('WEB_CONCURRENCY', 1))),
+))
+PASSWORD_HASH_WAIT = float(os.environ.get('PASSWORD_HASH_WAIT', 5))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
@@ -147,8 +225,160 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.UserTokenBucketThrottle',
+        'core.throttling.RouteTokenBucketThrottle',
+    ],
+    # token buckets: '<burst>/<period>' refilling the burst every period,
+    # per user ('user', 'anon') and per user and URL name
+    'DEFAULT_THROTTLE_RATES': {
+        'user': os.environ.get('THROTTLE_USER_RATE', '1200/min'),
+        'anon': os.environ.get('THROTTLE_ANON_RATE', '120/min'),
+        'recipe-list': os.environ.get('THROTTLE_RECIPE_LIST_RATE', '300/min'),
+        'recipe-upload-image': os.environ.get(
+            'THROTTLE_UPLOAD_IMAGE_RATE', '30/min',
+        ),
+    },
+    # reverse proxies in front of the workers, anonymous clients are then
+    # identified by their X-Forwarded-For address rather than the proxy's
+    'NUM_PROXIES': (
+        int(os.environ['NUM_PROXIES']) if os.environ.get('NUM_PROXIES')
+        else None
+    ),
 }
 
+# Share the throttle token counts of the workers through the cache
+THROTTLE_CACHE_SYNC = os.environ.get('THROTTLE_CACHE_SYNC', '') == '1'
+THROTTLE_SYNC_SECONDS = float(os.environ.get('THROTTLE_SYNC_SECONDS', 1))
+# Requests a client may have running at once in a worker, 0 for no limit
+THROTTLE_MAX_IN_FLIGHT = int(os.environ.get('THROTTLE_MAX_IN_FLIGHT', 8))
+
+# Content encodings of the API responses in order of preference, among
+# 'br' and 'zstd' (when brotli and zstandard are installed) and 'gzip'
+COMPRESSION_ENCODINGS = [
+    encoding for encoding in os.environ.get(
+        'COMPRESSION_ENCODINGS', 'br,zstd,gzip',
+    ).split(',') if encoding
+]
+# Responses smaller than this are not compressed
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+
+# Most recipe IDs fetched at once with the `ids` parameter of the list
+RECIPE_IDS_MAX = int(os.environ.get('RECIPE_IDS_MAX', 100))
+
+# JSON backend used by the API renderer and parser: 'orjson' or 'json'
+JSON_BACKEND = os.environ.get('JSON_BACKEND', 'orjson')
+
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
 }
+
+# Tokens issued by the token endpoint: 'db' (DRF's Token model) or
+# 'signed' (self-contained, see core.authentication)
+AUTH_TOKEN_MODE = os.environ.get('AUTH_TOKEN_MODE', 'db')
+
+# Lifetime in seconds of the signed tokens
+SIGNED_TOKEN_MAX_AGE = int(os.environ.get('SIGNED_TOKEN_MAX_AGE', 86400))
+# Seconds the user of a signed token is cached, the longest a revocation
+# or deactivation made outside User.save takes to apply (or made in
+# another worker, when the cache is per process). 0 loads it every request
+SIGNED_TOKEN_CACHE_SECONDS = int(
+    os.environ.get('SIGNED_TOKEN_CACHE_SECONDS', 60)
+)
+
+# Bulk user creation endpoint: maximum users per request, kept low as
+# the passwords are hashed during the request (larger imports go through
+# the bulk_create_users command, hashing them in parallel), and processes
+# hashing the passwords. 1 hashes them in the worker, more start a pool of
+# that many interpreters for every request
+USER_BULK_CREATE_MAX_ROWS = int(
+    os.environ.get('USER_BULK_CREATE_MAX_ROWS', 200)
+)
+USER_BULK_CREATE_PROCESSES = int(
+    os.environ.get('USER_BULK_CREATE_PROCESSES', 1)
+)
+
+# Requests running more queries than this are logged as warnings
+INSTRUMENTATION_QUERY_THRESHOLD = int(
+    os.environ.get('INSTRUMENTATION_QUERY_THRESHOLD', 50)
+)
+
+# Queries slower than this are logged with their view and serializer, 0 to
+# disable, and a fraction of them are explained
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+SLOW_QUERY_EXPLAIN_RATE = float(
+    os.environ.get('SLOW_QUERY_EXPLAIN_RATE', 0.1)
+)
+# Directory shared by the worker processes to aggregate the query
+# statistics shown by the query_report command, which fails while empty
+QUERY_LOG_DIR = os.environ.get('QUERY_LOG_DIR', '')
+
+# Directory shared by the worker processes to aggregate the /metrics,
+# leave empty for a single process
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 1))
+# Networks allowed to scrape /metrics (coma separated). They are matched
+# against REMOTE_ADDR, so behind a reverse proxy the proxy must not pass
+# /metrics requests from outside
+METRICS_ALLOWED_NETWORKS = [
+    network for network in os.environ.get(
+        'METRICS_ALLOWED_NETWORKS', '127.0.0.0/8,::1/128',
+    ).split(',') if network
+]
+
+# Sampling profiler, disabled while PROFILER_DIR is empty. It profiles
+# PROFILER_SAMPLE_RATE of the requests, at most PROFILER_MAX_PER_MINUTE,
+# keeps the profiles of the ones slower than PROFILER_SLOW_MS and writes
+# them as 'collapsed' or 'speedscope' files
+PROFILER_DIR = os.environ.get('PROFILER_DIR', '')
+PROFILER_SAMPLE_RATE = float(os.environ.get('PROFILER_SAMPLE_RATE', 0.01))
+PROFILER_SLOW_MS = float(os.environ.get('PROFILER_SLOW_MS', 0))
+PROFILER_INTERVAL_MS = float(os.environ.get('PROFILER_INTERVAL_MS', 5))
+PROFILER_MAX_PER_MINUTE = int(os.environ.get('PROFILER_MAX_PER_MINUTE', 6))
+PROFILER_MAX_FILES = int(os.environ.get('PROFILER_MAX_FILES', 100))
+PROFILER_FORMAT = os.environ.get('PROFILER_FORMAT', 'collapsed')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core': {
+            'handlers': ['console'],
+            'level': os.environ.get('CORE_LOG_LEVEL', 'WARNING'),
+        },
+    },
+}
+
+# Schema generated at build time, served from memory by the schema view
+SCHEMA_FILE = os.environ.get('SCHEMA_FILE', str(BASE_DIR / 'schema.yml'))
+
+# Warm-up of the workers when the WSGI/ASGI application is loaded: 'sync'
+# before serving, 'background' while serving (not ready until it is over)
+# or 'off'. The database connection opened by the warm-up requests is only
+# kept for the first requests with 'sync' and DB_CONN_MAX_AGE > 0, with
+# 'background' it belongs to the warm-up thread and is closed
+WARM_UP = os.environ.get('WARM_UP', 'sync')
+# Paths requested during the warm-up (coma separated)
+WARM_UP_PATHS = [
+    path for path in os.environ.get(
+        'WARM_UP_PATHS', '/api/schema/',
+    ).split(',') if path
+]
+
+# Seconds the readiness checks may take, and their results are kept
+HEALTH_CHECK_TIMEOUT = float(os.environ.get('HEALTH_CHECK_TIMEOUT', 2))
+HEALTH_CHECK_CACHE_SECONDS = float(
+    os.environ.get('HEALTH_CHECK_CACHE_SECONDS', 5)
+)
@@ -0,0 +1,45 @@
+"""
+Django settings for the API-only worker processes.
+
+Select them with DJANGO_SETTINGS_MODULE=app.settings_api for workers that
+only serve the token authenticated /api/ routes. They drop the browser
+machinery of the default settings: the admin, sessions, flash messages,
+CSRF and clickjacking protection, and the browsable API. The schema and
+metrics views are only imported on their first request, so the schema is
+not requested during the warm-up.
+"""
+
+from app.settings import *  # noqa: F401,F403
+from app.settings import INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK
+
+# Apps only used by the admin and browser sessions
+BROWSER_APPS = [
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+]
+
+# Middlewares only needed for cookie authenticated browsers
+BROWSER_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in BROWSER_APPS]
+
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if middleware not in BROWSER_MIDDLEWARE
+]
+
+ROOT_URLCONF = 'app.urls_api'
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': ['core.renderers.FastJSONRenderer'],
+}
+
+WARM_UP_PATHS = []
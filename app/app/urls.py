@@ -15,20 +15,27 @@ Including another URLconf
 """
 
 
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView,
-)
+from drf_spectacular.views import SpectacularSwaggerView
 
 from django.contrib import admin
 from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core import health
+from core.views import CachedSpectacularAPIView, metrics
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
+    path('metrics', metrics, name='metrics'),
+    path('health/live', health.live, name='health-live'),
+    path('health/ready', health.ready, name='health-ready'),
+    path(
+        'api/schema/',
+        CachedSpectacularAPIView.as_view(),
+        name='api-schema',
+    ),
     path(
         'api/docs/',
         SpectacularSwaggerView.as_view(url_name='api-schema'),
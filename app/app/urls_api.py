@@ -0,0 +1,51 @@
+"""
+URL Configuration of the API-only worker processes
+
+The routes of `app.urls` without the admin. The schema and metrics views
+are imported on their first request, which keeps drf-spectacular's schema
+generator and views out of the worker startup. Its AutoSchema still loads
+with the API views: their extend_schema decorators resolve
+DEFAULT_SCHEMA_CLASS when the classes are defined.
+"""
+
+from django.urls import path, include
+from django.utils.module_loading import import_string
+
+from core import health
+
+
+def lazy_view(dotted_path, **initkwargs):
+    """Return a view importing the view at `dotted_path` when first called"""
+    view = None
+
+    def wrapper(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            view = import_string(dotted_path)
+            if initkwargs or hasattr(view, 'as_view'):
+                view = view.as_view(**initkwargs)
+        return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+urlpatterns = [
+    path('metrics', lazy_view('core.views.metrics'), name='metrics'),
+    path('health/live', health.live, name='health-live'),
+    path('health/ready', health.ready, name='health-ready'),
+    path(
+        'api/schema/',
+        lazy_view('core.views.CachedSpectacularAPIView'),
+        name='api-schema',
+    ),
+    path(
+        'api/docs/',
+        lazy_view(
+            'drf_spectacular.views.SpectacularSwaggerView',
+            url_name='api-schema',
+        ),
+        name='api-docs',
+    ),
+    path('api/user/', include('user.urls')),
+    path('api/recipe/', include('recipe.urls')),
+]
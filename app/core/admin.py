@@ -3,10 +3,17 @@ Django admin customization.
 """
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
 from core import models
 
+# Changelists count at most this many rows, larger unfiltered PostgreSQL
+# tables use the planner estimate instead
+COUNT_LIMIT = 10000
+
 
 class UserAdmin(BaseUserAdmin):
     """Define the admin pages for users."""
@@ -44,7 +51,53 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class EstimatedCountPaginator(Paginator):
+    """Paginator which never counts more than COUNT_LIMIT rows."""
+
+    def _estimate(self):
+        """Return the planner row estimate of the table, None if unknown."""
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql' or queryset.query.where:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # reltuples is -1 (0 before PostgreSQL 14) until the first ANALYZE
+        return int(row[0]) if row and row[0] > 0 else None
+
+    @cached_property
+    def count(self):
+        estimate = self._estimate()
+        if estimate is not None and estimate >= COUNT_LIMIT:
+            return estimate
+        return self.object_list[:COUNT_LIMIT].count()
+
+
+class OwnedObjectAdmin(admin.ModelAdmin):
+    """Base admin for the objects of a user, sized for large tables."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_select_related = ['user']
+    raw_id_fields = ['user']
+
+
+@admin.register(models.Recipe)
+class RecipeAdmin(OwnedObjectAdmin):
+    """Define the admin pages for recipes."""
+    list_display = ['id', 'title', 'user', 'time_minutes', 'price']
+    raw_id_fields = ['user', 'tags', 'ingredients']
+    search_fields = ['title__startswith', 'user__email__exact']
+
+
+@admin.register(models.Tag, models.Ingredient)
+class NameAdmin(OwnedObjectAdmin):
+    """Define the admin pages for tags and ingredients."""
+    list_display = ['id', 'name', 'user']
+    search_fields = ['name__startswith', 'user__email__exact']
+
+
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Recipe)
-admin.site.register(models.Tag)
-admin.site.register(models.Ingredient)
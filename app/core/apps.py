@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from core import (  # noqa: F401
+            checks,
+            recipe_counts,
+            recipe_summaries,
+        )
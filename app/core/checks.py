@@ -0,0 +1,26 @@
+"""
+System checks of the project settings
+"""
+
+from django.conf import settings
+from django.core.checks import Error, register
+
+# cache backends keeping their data in the process
+PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def check_replica_cache(app_configs, **kwargs):
+    """Check the read replicas are used with a cache shared by workers"""
+    if settings.DATABASE_REPLICAS and \
+            settings.CACHES['default']['BACKEND'] in PROCESS_CACHES:
+        return [Error(
+            'Read replicas need a cache shared by the workers.',
+            hint='Set CACHE_BACKEND and CACHE_LOCATION, the primary pins '
+            'of the clients which wrote are kept in the cache.',
+            id='core.E001',
+        )]
+    return []
@@ -0,0 +1,87 @@
+"""
+Content encodings of the API responses
+"""
+
+import gzip
+import re
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is optional
+    zstandard = None
+
+# levels trading a little ratio for the speed dynamic responses need
+LEVELS = {'br': 4, 'zstd': 3, 'gzip': 6}
+
+_COMPRESSIBLE = re.compile(
+    r'^(text/|application/(json|.*\+json|.*openapi|yaml|x-yaml|javascript))'
+)
+
+
+def _brotli(content, level):
+    return brotli.compress(content, quality=level)
+
+
+def _zstd(content, level):
+    return zstandard.ZstdCompressor(level=level).compress(content)
+
+
+def _gzip(content, level):
+    # a fixed mtime keeps the output of identical content identical
+    return gzip.compress(content, compresslevel=level, mtime=0)
+
+
+COMPRESSORS = {
+    encoding: compressor for encoding, compressor, module in (
+        ('br', _brotli, brotli),
+        ('zstd', _zstd, zstandard),
+        ('gzip', _gzip, gzip),
+    ) if module is not None
+}
+
+
+def available(encodings):
+    """Return the encodings whose library is installed, in order"""
+    return [encoding for encoding in encodings if encoding in COMPRESSORS]
+
+
+def compressible(content_type):
+    """Return whether a content type is worth compressing"""
+    return bool(_COMPRESSIBLE.match(content_type.lower()))
+
+
+def negotiate(accept_encoding, encodings):
+    """
+    Return the encoding of `encodings`, in order of preference, the client
+    accepts with the highest quality, None if it accepts none of them
+    """
+    qualities = {}
+    for part in accept_encoding.lower().split(','):
+        name, _, params = part.partition(';')
+        quality = 1.0
+        match = re.search(r'q=([\d.]+)', params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        qualities[name.strip()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in available(encodings):
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(content, encoding, level=None):
+    """Return the content compressed with the encoding"""
+    if level is None:
+        level = LEVELS[encoding]
+    return COMPRESSORS[encoding](content, level)
@@ -0,0 +1,160 @@
+"""
+Database routers
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import random
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+# the replica routing state of the current request, None outside requests
+_request_state = contextvars.ContextVar('replica_routing', default=None)
+
+
+class ReplicaRouter:
+    """
+    Send reads to the read replicas and writes to the primary.
+
+    Reads only go to a replica inside a request marked replica safe by
+    ReplicaRoutingMiddleware. Anything else (unsafe methods, users who
+    wrote recently, management commands) reads from the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if not settings.DATABASE_REPLICAS or state is None \
+                or not state['use_replica'] or _user_pinned(state):
+            return 'default'
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            # read our own writes for the rest of the request
+            state['use_replica'] = False
+            state['wrote'] = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def _user_pinned(state):
+    """
+    Return whether the user authenticated by DRF during the request is
+    pinned to the primary, checked at the first read once it is known
+    """
+    if state['user_checked']:
+        return False
+    # DRF sets the user it authenticated on the request, until then it is
+    # unset or the lazy user of AuthenticationMiddleware
+    user = vars(state['request']).get('user')
+    if user is None or isinstance(user, SimpleLazyObject):
+        return False
+    state['user_checked'] = True
+    if user.is_authenticated and cache.get(_user_pin_key(user)):
+        state['use_replica'] = False
+        return True
+    return False
+
+
+def _user_pin_key(user):
+    return f'replica-pin:user:{user.pk}'
+
+
+def _authorization_pin_key(authorization):
+    digest = hashlib.sha256(authorization.encode()).hexdigest()
+    return f'replica-pin:auth:{digest}'
+
+
+def pin_authorization(authorization):
+    """
+    Pin the requests sent with an Authorization header to the primary, for
+    the credentials just issued which may not be on the replicas yet
+    """
+    if settings.DATABASE_REPLICAS:
+        cache.set(
+            _authorization_pin_key(authorization), True,
+            settings.REPLICA_PIN_SECONDS,
+        )
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """
+    Mark safe method requests as replica safe, and pin a client to the
+    primary for REPLICA_PIN_SECONDS after it wrote so it never reads a
+    replica that has not caught up with its own writes.
+
+    A client is pinned by its Authorization header and by its user, so
+    the other tokens and sessions of the user are pinned too. The user of
+    a token is only known once DRF authenticated it, the router checks
+    its pin at the first read after that. The pins are stored in the
+    default cache, which must be shared by the workers (see the core.E001
+    check).
+    """
+
+    def _pin_key(self, request):
+        """Return the cache key identifying the client, if any"""
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if authorization:
+            return _authorization_pin_key(authorization)
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return _user_pin_key(user)
+        return None
+
+    def _start(self, request):
+        """Return the pin key of the client and the routing state"""
+        key = self._pin_key(request)
+        return key, {
+            'use_replica': request.method in ('GET', 'HEAD', 'OPTIONS')
+            and not (key and cache.get(key)),
+            'wrote': False,
+            'request': request,
+            # without a header the key is the one of the user, if any
+            'user_checked': 'HTTP_AUTHORIZATION' not in request.META,
+        }
+
+    def _finish(self, key, state):
+        if not state['wrote']:
+            return
+        keys = [key] if key else []
+        user = getattr(state['request'], 'user', None)
+        if user is not None and user.is_authenticated:
+            keys.append(_user_pin_key(user))
+        cache.set_many(
+            dict.fromkeys(keys, True), settings.REPLICA_PIN_SECONDS,
+        )
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        key, state = self._start(request)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        self._finish(key, state)
+        return response
+
+    async def __acall__(self, request):
+        # loading the user and the cache lookups may block
+        key, state = await sync_to_async(self._start)(request)
+        token = _request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        await sync_to_async(self._finish)(key, state)
+        return response
@@ -0,0 +1,92 @@
+"""
+Password hashers with configurable cost, and the slots bounding the
+concurrent password hashing of the API
+"""
+
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+_semaphores = {}
+_semaphores_lock = threading.Lock()
+_local = threading.local()
+
+
+class PasswordHashingBusy(APIException):
+    """Raised to API clients when no hashing slot frees up in time"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many logins in progress, try again later.')
+    default_code = 'password_hashing_busy'
+
+
+def _get_semaphore():
+    """Return the semaphore sized by PASSWORD_HASH_CONCURRENCY"""
+    size = settings.PASSWORD_HASH_CONCURRENCY
+    with _semaphores_lock:
+        if size not in _semaphores:
+            _semaphores[size] = threading.BoundedSemaphore(size)
+        return _semaphores[size]
+
+
+@contextmanager
+def hashing_slot():
+    """
+    Hold one of the PASSWORD_HASH_CONCURRENCY hashing slots of the worker.
+
+    Waits up to PASSWORD_HASH_WAIT seconds for a slot then raises
+    PasswordHashingBusy, a 503 for the API. Only the API views hashing
+    passwords take a slot, the admin, the management commands and the
+    bulk creation pool hash without one. Nested calls in the same thread
+    share the slot.
+    """
+    if getattr(_local, 'depth', 0):
+        _local.depth += 1
+        try:
+            yield
+        finally:
+            _local.depth -= 1
+        return
+
+    semaphore = _get_semaphore()
+    if not semaphore.acquire(timeout=settings.PASSWORD_HASH_WAIT):
+        raise PasswordHashingBusy()
+    _local.depth = 1
+    try:
+        yield
+    finally:
+        _local.depth = 0
+        semaphore.release()
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2 hasher using PASSWORD_PBKDF2_ITERATIONS iterations"""
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    """Memory-hard scrypt hasher using PASSWORD_SCRYPT_WORK_FACTOR"""
+
+    @property
+    def work_factor(self):
+        return settings.PASSWORD_SCRYPT_WORK_FACTOR
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Memory-hard argon2 hasher, needs the argon2-cffi package"""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
@@ -0,0 +1,157 @@
+"""
+Health endpoints of the workers
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent import futures
+
+from psycopg2 import OperationalError as Psycopg2Error
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.utils import OperationalError
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from core import warmup
+
+logger = logging.getLogger(__name__)
+
+# errors meaning the database is not available (yet)
+DATABASE_ERRORS = (Psycopg2Error, OperationalError)
+
+
+def check_database(alias='default'):
+    """
+    Run a query on a new connection to the database, closed right after so
+    the probe never holds one of the connections of the worker
+    """
+    connection = connections.create_connection(alias)
+    if connection.vendor == 'postgresql':
+        timeout = max(int(settings.HEALTH_CHECK_TIMEOUT), 1)
+        options = connection.settings_dict['OPTIONS']
+        connection.settings_dict = {
+            **connection.settings_dict,
+            'OPTIONS': {
+                **options,
+                'connect_timeout': timeout,
+                'options': ' '.join(filter(None, [
+                    options.get('options'),
+                    f'-c statement_timeout={timeout * 1000}',
+                ])),
+            },
+        }
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    finally:
+        connection.close()
+
+
+def check_media():
+    """Create and delete a file in MEDIA_ROOT"""
+    with tempfile.TemporaryFile(dir=settings.MEDIA_ROOT) as probe:
+        probe.write(b'ok')
+
+
+def check_cache():
+    """Write and read back a key of the cache"""
+    key = f'health:{os.getpid()}'
+    cache.set(key, 'ok', 60)
+    if cache.get(key) != 'ok':
+        raise RuntimeError('the cache did not return the value written')
+
+
+CHECKS = {
+    'database': check_database,
+    'media': check_media,
+    'cache': check_cache,
+}
+
+
+class HealthChecks:
+    """
+    Run the checks in parallel, each limited to HEALTH_CHECK_TIMEOUT, and
+    keep the results for HEALTH_CHECK_CACHE_SECONDS. Concurrent probes wait
+    for the checks in progress and share their results. A check still
+    running from a previous probe is reported as timed out instead of
+    being run again, so a hung dependency holds one thread at most.
+    """
+
+    def __init__(self, checks):
+        self.checks = checks
+        self._executor = futures.ThreadPoolExecutor(
+            max_workers=len(checks), thread_name_prefix='health',
+        )
+        self._lock = threading.Lock()
+        self._results = None
+        self._checked = 0
+        # the last run of each check
+        self._futures = {}
+
+    def clear(self):
+        with self._lock:
+            self._results = None
+
+    def _run(self):
+        for name, check in self.checks.items():
+            future = self._futures.get(name)
+            if future is None or future.done():
+                self._futures[name] = self._executor.submit(check)
+        deadline = time.monotonic() + settings.HEALTH_CHECK_TIMEOUT
+        results = {}
+        for name in self.checks:
+            future = self._futures[name]
+            try:
+                future.result(timeout=max(deadline - time.monotonic(), 0))
+                results[name] = 'ok'
+            except futures.TimeoutError:
+                # dropped if it did not start, else the next probes wait
+                # on this run instead of starting another one
+                if future.cancel():
+                    del self._futures[name]
+                results[name] = 'timeout'
+            except Exception as error:
+                logger.warning('Health check %s failed', name, exc_info=True)
+                results[name] = f'error: {type(error).__name__}'
+        return results
+
+    def results(self):
+        """Return the result of each check, 'ok' if it passed"""
+        with self._lock:
+            age = time.monotonic() - self._checked
+            if self._results is None or \
+                    age >= settings.HEALTH_CHECK_CACHE_SECONDS:
+                self._results = self._run()
+                self._checked = time.monotonic()
+            return self._results
+
+
+HEALTH_CHECKS = HealthChecks(CHECKS)
+
+
+@require_GET
+def live(request):
+    """Return 200 while the worker is able to answer"""
+    return JsonResponse({'status': 'alive'})
+
+
+@require_GET
+def ready(request):
+    """
+    Return 200 once the worker is warmed up and its database, media
+    storage and cache work, 503 otherwise
+    """
+    if not warmup.is_ready():
+        return JsonResponse({'status': 'warming up'}, status=503)
+    results = HEALTH_CHECKS.results()
+    if any(result != 'ok' for result in results.values()):
+        return JsonResponse(
+            {'status': 'not ready', 'checks': results}, status=503,
+        )
+    return JsonResponse({'status': 'ready', 'checks': results})
@@ -0,0 +1,122 @@
+"""
+Per request instrumentation of database, serializer and render time
+
+The views time their serialization with `timed('serialize')`, the generic
+ones through the mixins below.
+"""
+
+import contextvars
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+from rest_framework import mixins
+from rest_framework.response import Response
+
+from core import query_log
+
+# metrics of the request being handled, None outside requests
+_current_metrics = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Work done while handling one request"""
+
+    def __init__(self):
+        self.queries = 0
+        self.timings = {'db': 0.0, 'serialize': 0.0, 'render': 0.0}
+        self._running = set()
+
+    def add(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+
+def start_request():
+    """Start collecting metrics, return the token to stop collecting"""
+    return _current_metrics.set(RequestMetrics())
+
+
+def finish_request(token):
+    """Stop collecting metrics and return them"""
+    metrics = _current_metrics.get()
+    _current_metrics.reset(token)
+    return metrics
+
+
+def current_metrics():
+    """Return the metrics of the current request, if any"""
+    return _current_metrics.get()
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to the `name` timing"""
+    metrics = _current_metrics.get()
+    # nested blocks of the same name are only counted once
+    if metrics is None or name in metrics._running:
+        yield
+        return
+
+    metrics._running.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(name, time.perf_counter() - start)
+        metrics._running.discard(name)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper counting and timing the queries"""
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.add('db', time.perf_counter() - start)
+
+
+@contextmanager
+def instrument_queries():
+    """
+    Count and time the queries run on the connections of the calling
+    thread, and add them to the slow query log
+    """
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(record_query))
+            stack.enter_context(
+                connection.execute_wrapper(query_log.log_query)
+            )
+        yield
+
+
+class TimedListModelMixin(mixins.ListModelMixin):
+    """List mixin adding the time spent serializing to `serialize`"""
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(
+            queryset if page is None else page, many=True,
+        )
+        with timed('serialize'):
+            data = serializer.data
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+
+class TimedRetrieveModelMixin(mixins.RetrieveModelMixin):
+    """Retrieve mixin adding the time spent serializing to `serialize`"""
+
+    def retrieve(self, request, *args, **kwargs):
+        serializer = self.get_serializer(self.get_object())
+        with timed('serialize'):
+            data = serializer.data
+        return Response(data)
@@ -0,0 +1,302 @@
+"""
+Django command to benchmark the recipe API scenarios
+"""
+
+import io
+import json
+import random
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from core import recipe_summaries
+from core.models import Recipe, Tag, Ingredient
+from core.recipe_counts import recount
+from core.throttling import unthrottled_settings
+
+SCENARIOS = ('list', 'detail', 'filter', 'create', 'update', 'upload_image')
+EMAIL_DOMAIN = 'benchmark.example.com'
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+
+def percentile(values, percent):
+    """Return the nearest-rank percentile of sorted values"""
+    if not values:
+        return None
+    index = max(0, int(round(percent / 100 * len(values))) - 1)
+    return values[min(index, len(values) - 1)]
+
+
+def sample_image():
+    """Return the bytes of a small JPEG image"""
+    image_file = io.BytesIO()
+    Image.new('RGB', (64, 64)).save(image_file, format='JPEG')
+    return image_file.getvalue()
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the recipe API scenarios"""
+    help = (
+        'Seed benchmark users in the configured database, run the API '
+        'scenarios and print the results as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--recipes', type=int, default=200,
+                            help='Recipes per user')
+        parser.add_argument('--tags', type=int, default=30,
+                            help='Tags per user')
+        parser.add_argument('--ingredients', type=int, default=100,
+                            help='Ingredients per user')
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the JSON to this file')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the seeded data')
+
+    def _seed(self, options, rand):
+        """Create the benchmark users and their data, return the users"""
+        User = get_user_model()
+        User.objects.bulk_create([
+            User(
+                email=f'bench-{index}@{EMAIL_DOMAIN}',
+                name=f'Bench {index}',
+                password=make_password(None),
+            )
+            for index in range(options['users'])
+        ])
+        # bulk_create does not set the primary keys on every backend
+        users = list(User.objects.filter(email__endswith=EMAIL_DOMAIN))
+
+        Tag.objects.bulk_create([
+            Tag(user=user, name=f'Tag {index}')
+            for user in users for index in range(options['tags'])
+        ], batch_size=1000)
+        Ingredient.objects.bulk_create([
+            Ingredient(user=user, name=f'Ingredient {index}')
+            for user in users for index in range(options['ingredients'])
+        ], batch_size=1000)
+        Recipe.objects.bulk_create([
+            Recipe(
+                user=user,
+                title=f'Recipe {index}',
+                time_minutes=rand.randint(5, 120),
+                price=Decimal(rand.randint(100, 9999)) / 100,
+                description='Mix everything and bake.',
+            )
+            for user in users for index in range(options['recipes'])
+        ], batch_size=1000)
+
+        user_ids = [user.id for user in users]
+        tag_ids, ingredient_ids = {}, {}
+        for tag_id, user_id in Tag.objects.filter(
+                user_id__in=user_ids).values_list('id', 'user_id'):
+            tag_ids.setdefault(user_id, []).append(tag_id)
+        for ingredient_id, user_id in Ingredient.objects.filter(
+                user_id__in=user_ids).values_list('id', 'user_id'):
+            ingredient_ids.setdefault(user_id, []).append(ingredient_id)
+
+        recipe_tags, recipe_ingredients = [], []
+        for recipe_id, user_id in Recipe.objects.filter(
+                user_id__in=user_ids).values_list('id', 'user_id'):
+            for tag_id in rand.sample(
+                    tag_ids.get(user_id, []),
+                    min(options['tags_per_recipe'], options['tags'])):
+                recipe_tags.append(Recipe.tags.through(
+                    recipe_id=recipe_id, tag_id=tag_id,
+                ))
+            for ingredient_id in rand.sample(
+                    ingredient_ids.get(user_id, []),
+                    min(options['ingredients_per_recipe'],
+                        options['ingredients'])):
+                recipe_ingredients.append(Recipe.ingredients.through(
+                    recipe_id=recipe_id, ingredient_id=ingredient_id,
+                ))
+        Recipe.tags.through.objects.bulk_create(recipe_tags, batch_size=1000)
+        Recipe.ingredients.through.objects.bulk_create(
+            recipe_ingredients, batch_size=1000,
+        )
+        recount(Tag.objects.filter(user__in=users))
+        recount(Ingredient.objects.filter(user__in=users))
+        recipe_summaries.refresh(Recipe.objects.filter(
+            user__in=users,
+        ).values_list('id', flat=True))
+        return users
+
+    def _requests(self, scenario, users, count, rand):
+        """Build the requests of a scenario as (user, method, url, kwargs)"""
+        recipes = {}
+        for recipe_id, user_id in Recipe.objects.filter(
+                user__in=users).values_list('id', 'user_id'):
+            recipes.setdefault(user_id, []).append(recipe_id)
+        tags = {}
+        for tag_id, user_id in Tag.objects.filter(
+                user__in=users).values_list('id', 'user_id'):
+            tags.setdefault(user_id, []).append(tag_id)
+        image = sample_image()
+
+        requests = []
+        for _ in range(count):
+            user = rand.choice(users)
+            recipe_id = rand.choice(recipes.get(user.id) or [0])
+            detail_url = reverse('recipe:recipe-detail', args=[recipe_id])
+            if scenario == 'list':
+                request = ('get', reverse('recipe:recipe-list'), {})
+            elif scenario == 'detail':
+                request = ('get', detail_url, {})
+            elif scenario == 'filter':
+                tag_ids = rand.sample(tags.get(user.id, []),
+                                      min(2, len(tags.get(user.id, []))))
+                request = ('get', reverse('recipe:recipe-list'), {
+                    'data': {'tags': ','.join(map(str, tag_ids))},
+                })
+            elif scenario == 'create':
+                request = ('post', reverse('recipe:recipe-list'), {
+                    'data': json.dumps({
+                        'title': 'Benchmark recipe',
+                        'time_minutes': 10,
+                        'price': '5.00',
+                        'tags': [{'name': 'Tag 0'}, {'name': 'Benchmark'}],
+                    }),
+                    'content_type': 'application/json',
+                })
+            elif scenario == 'update':
+                request = ('patch', detail_url, {
+                    'data': json.dumps({'title': 'Updated recipe'}),
+                    'content_type': 'application/json',
+                })
+            else:
+                url = reverse('recipe:recipe-upload-image', args=[recipe_id])
+                request = ('post', url, {'data': {
+                    'image': _NamedBytesIO(image, 'image.jpg'),
+                }})
+            requests.append((user, *request))
+        return requests
+
+    def _run(self, requests, tokens, concurrency):
+        """Run the requests, return the elapsed time and the results"""
+        def run_one(request):
+            user, method, url, kwargs = request
+            client = Client(HTTP_AUTHORIZATION=f'Token {tokens[user.id]}')
+            start = time.perf_counter()
+            res = getattr(client, method)(url, **kwargs)
+            elapsed = time.perf_counter() - start
+            match = QUERIES_RE.search(res.get('Server-Timing', ''))
+            return elapsed, res.status_code, int(match[1]) if match else 0
+
+        def run_thread(chunk):
+            try:
+                return [run_one(request) for request in chunk]
+            finally:
+                close_old_connections()
+
+        chunks = [requests[i::concurrency] for i in range(concurrency)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = [
+                result
+                for chunk_results in executor.map(run_thread, chunks)
+                for result in chunk_results
+            ]
+        return time.perf_counter() - start, results
+
+    def _report(self, elapsed, results):
+        """Return the figures of a scenario, None when no request passed"""
+        # failed requests stop early, they would make the figures look good
+        passed = [result for result in results if result[1] < 400]
+        latencies = sorted(result[0] * 1000 for result in passed)
+
+        def rounded(value):
+            return None if value is None else round(value, 2)
+
+        return {
+            'requests': len(results),
+            'errors': len(results) - len(passed),
+            'rps': round(len(results) / elapsed, 2) if elapsed else None,
+            'p50_ms': rounded(percentile(latencies, 50)),
+            'p95_ms': rounded(percentile(latencies, 95)),
+            'p99_ms': rounded(percentile(latencies, 99)),
+            'queries_per_request': rounded(
+                sum(result[2] for result in passed) / len(passed)
+                if passed else None
+            ),
+        }
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        rand = random.Random(options['seed'])
+        scenarios = [name for name in options['scenarios'].split(',') if name]
+        unknown = set(scenarios).difference(SCENARIOS)
+        if unknown:
+            self.stderr.write(f'Unknown scenarios: {", ".join(unknown)}')
+            return
+
+        users = self._seed(options, rand)
+        tokens = {
+            user.id: Token.objects.get_or_create(user=user)[0].key
+            for user in users
+        }
+        report = {
+            'config': {
+                key: options[key] for key in (
+                    'users', 'recipes', 'tags', 'ingredients',
+                    'tags_per_recipe', 'ingredients_per_recipe',
+                    'requests', 'concurrency', 'seed',
+                )
+            },
+            'scenarios': {},
+        }
+        try:
+            with tempfile.TemporaryDirectory() as media_root, \
+                    override_settings(
+                        ALLOWED_HOSTS=['testserver'], MEDIA_ROOT=media_root,
+                        **unthrottled_settings(),
+                    ):
+                for scenario in scenarios:
+                    requests = self._requests(
+                        scenario, users, options['requests'], rand,
+                    )
+                    elapsed, results = self._run(
+                        requests, tokens, options['concurrency'],
+                    )
+                    report['scenarios'][scenario] = self._report(
+                        elapsed, results,
+                    )
+        finally:
+            if not options['keep']:
+                get_user_model().objects.filter(
+                    email__endswith=f'@{EMAIL_DOMAIN}',
+                ).delete()
+
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                output_file.write(output + '\n')
+        self.stdout.write(output)
+
+
+class _NamedBytesIO(io.BytesIO):
+    """In memory file with a name, for multipart uploads"""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
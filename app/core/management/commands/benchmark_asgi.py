@@ -0,0 +1,87 @@
+"""
+Django command to compare the WSGI and ASGI read path throughput
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from core.throttling import unthrottled_settings
+
+
+class Command(BaseCommand):
+    """Django command to compare the WSGI and ASGI read path throughput"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'email',
+            help='Existing user whose recipes are listed',
+        )
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument(
+            '--concurrency', type=int, default=50,
+            help='Concurrent clients, on both sides',
+        )
+
+    def _wsgi(self, authorization, total, concurrency):
+        """Return the requests/second of the sync view through WSGI"""
+        url = reverse('recipe:recipe-list')
+        client = Client(HTTP_AUTHORIZATION=authorization)
+
+        def request(_):
+            return client.get(url).status_code
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            statuses = list(executor.map(request, range(total)))
+        return total / (time.perf_counter() - start), statuses
+
+    async def _asgi_requests(self, authorization, total, concurrency):
+        url = reverse('recipe:async-recipe-list')
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request():
+            async with semaphore:
+                res = await client.get(url, authorization=authorization)
+                return res.status_code
+
+        return await asyncio.gather(*(request() for _ in range(total)))
+
+    def _asgi(self, authorization, total, concurrency):
+        """Return the requests/second of the async view through ASGI"""
+        start = time.perf_counter()
+        statuses = asyncio.run(
+            self._asgi_requests(authorization, total, concurrency)
+        )
+        return total / (time.perf_counter() - start), statuses
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'User {options["email"]} does not exist')
+        token, _ = Token.objects.get_or_create(user=user)
+        authorization = f'Token {token.key}'
+        total = options['requests']
+
+        # the test clients send requests to 'testserver'
+        with override_settings(
+            ALLOWED_HOSTS=['testserver'], **unthrottled_settings(),
+        ):
+            for name, run in (('wsgi', self._wsgi), ('asgi', self._asgi)):
+                rps, statuses = run(
+                    authorization, total, options['concurrency'],
+                )
+                errors = sum(1 for code in statuses if code != 200)
+                self.stdout.write(
+                    f'{name:<6}{rps:>10.1f} req/s  {errors} errors'
+                )
@@ -0,0 +1,68 @@
+"""
+Django command to compare the cost and savings of the response encodings
+"""
+
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from core import compression
+from core.management.commands.benchmark_json import build_payload
+from core.renderers import FastJSONRenderer
+
+
+class Command(BaseCommand):
+    """Django command to compare the response encodings"""
+    help = (
+        'Compress recipe list payloads with every installed encoding and '
+        'print the compression time against the bytes saved.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, nargs='+', default=[10, 100, 1000],
+            help='Recipes per payload, one payload per value',
+        )
+        parser.add_argument('--tags', type=int, default=3)
+        parser.add_argument('--ingredients', type=int, default=8)
+        parser.add_argument(
+            '--levels', nargs='+', default=[],
+            help='Extra levels to measure, as ENCODING=LEVEL',
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def _time(self, func, repeat):
+        """Return the best time in milliseconds of `repeat` runs"""
+        return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        variants = [
+            (encoding, level) for encoding, level in compression.LEVELS.items()
+            if encoding in compression.COMPRESSORS
+        ]
+        for extra in options['levels']:
+            encoding, _, level = extra.partition('=')
+            if encoding in compression.COMPRESSORS:
+                variants.append((encoding, int(level)))
+
+        missing = set(compression.LEVELS) - set(compression.COMPRESSORS)
+        if missing:
+            self.stdout.write(f'not installed: {", ".join(sorted(missing))}')
+        for recipes in options['recipes']:
+            body = FastJSONRenderer().render(build_payload(
+                recipes, options['tags'], options['ingredients'],
+            ))
+            self.stdout.write(f'{recipes} recipes, {len(body)} bytes')
+            for encoding, level in variants:
+                content = compression.compress(body, encoding, level)
+                elapsed = self._time(
+                    lambda: compression.compress(body, encoding, level),
+                    options['repeat'],
+                )
+                saved = len(body) - len(content)
+                self.stdout.write(
+                    f'{encoding:<6}{level:>3}{len(content):>10} bytes'
+                    f'{saved / len(body):>8.1%} saved{elapsed:>10.3f} ms'
+                    f'{saved / 1024 / max(elapsed, 1e-6):>10.1f} KiB/ms'
+                )
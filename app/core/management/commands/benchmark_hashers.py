@@ -0,0 +1,48 @@
+"""
+Django command to measure logins per second of the password hashers
+"""
+
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand
+
+HASHERS = ('pbkdf2_sha256', 'scrypt', 'argon2')
+
+
+class Command(BaseCommand):
+    """Django command to measure logins per second of the password hashers"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seconds', type=float, default=2,
+            help='Time spent on each hasher',
+        )
+
+    def _logins_per_second(self, hasher, seconds):
+        """Return how many passwords one core verifies per second"""
+        encoded = hasher.encode('testpass123', hasher.salt())
+        count = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            hasher.verify('testpass123', encoded)
+            count += 1
+        return count / (time.perf_counter() - start)
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        for algorithm in HASHERS:
+            try:
+                rate = self._logins_per_second(
+                    get_hasher(algorithm), options['seconds'],
+                )
+            except ValueError as exc:
+                # e.g. argon2-cffi is not installed
+                self.stdout.write(f'{algorithm:<16}skipped: {exc}')
+                continue
+            self.stdout.write(f'{algorithm:<16}{rate:>10.1f} logins/s/core')
+        self.stdout.write(
+            f'preferred: {settings.PASSWORD_HASHER}, '
+            f'{settings.PASSWORD_HASH_CONCURRENCY} concurrent hashes/worker'
+        )
@@ -0,0 +1,78 @@
+"""
+Django command to compare the JSON renderers on recipe like payloads
+"""
+
+import io
+import timeit
+from collections import OrderedDict
+from django.core.management.base import BaseCommand
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+
+def build_payload(recipes, tags, ingredients):
+    """Build a payload shaped like the recipe detail list response"""
+    return [
+        OrderedDict([
+            ('id', i),
+            ('title', f'Recipe {i} – crème brûlée'),
+            ('time_minutes', 10 + i % 50),
+            ('price', f'{5 + i % 20}.50'),
+            ('link', f'https://example.com/recipes/{i}'),
+            ('tags', [
+                OrderedDict([('id', t), ('name', f'Tag {t}')])
+                for t in range(tags)
+            ]),
+            ('ingredients', [
+                OrderedDict([('id', g), ('name', f'Ingredient {g}')])
+                for g in range(ingredients)
+            ]),
+            ('description', 'Mix everything and bake. ' * 8),
+            ('image', None),
+        ])
+        for i in range(recipes)
+    ]
+
+
+class Command(BaseCommand):
+    """Django command to compare the JSON renderers"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--tags', type=int, default=3)
+        parser.add_argument('--ingredients', type=int, default=8)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def _time(self, func, repeat):
+        """Return the best time in milliseconds of `repeat` runs"""
+        return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        payload = build_payload(
+            options['recipes'], options['tags'], options['ingredients'],
+        )
+        repeat = options['repeat']
+        body = JSONRenderer().render(payload)
+        if FastJSONRenderer().render(payload) != body:
+            self.stderr.write(self.style.ERROR('Rendered output differs!'))
+
+        rows = [
+            ('render', 'json', self._time(
+                lambda: JSONRenderer().render(payload), repeat)),
+            ('render', 'fast', self._time(
+                lambda: FastJSONRenderer().render(payload), repeat)),
+            ('parse', 'json', self._time(
+                lambda: JSONParser().parse(io.BytesIO(body)), repeat)),
+            ('parse', 'fast', self._time(
+                lambda: FastJSONParser().parse(io.BytesIO(body)), repeat)),
+        ]
+        self.stdout.write(
+            f'{options["recipes"]} recipes, {len(body)} bytes'
+        )
+        for operation, backend, elapsed in rows:
+            self.stdout.write(f'{operation:<8}{backend:<6}{elapsed:>10.2f} ms')
@@ -0,0 +1,131 @@
+"""
+Django command to compare the startup and request overhead of settings
+"""
+
+import itertools
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# run in a fresh interpreter per sample, prints its measures as JSON
+WORKER = '''
+import io
+import json
+import sys
+import time
+
+start = time.perf_counter()
+import django
+from django.conf import settings
+django.setup()
+from django.test.utils import override_settings
+from core.throttling import unthrottled_settings
+override_settings(**unthrottled_settings()).enable()
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+application = get_wsgi_application()
+get_resolver().url_patterns
+path, host, requests, warm = sys.argv[1], sys.argv[2], int(sys.argv[3]), \
+    sys.argv[4] == '1'
+if warm:
+    from core import warmup
+    warmup.warm_up()
+startup = time.perf_counter() - start
+
+status = []
+
+
+def request():
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '',
+        'SERVER_NAME': host, 'SERVER_PORT': '80', 'HTTP_HOST': host,
+        'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http',
+        'wsgi.errors': sys.stderr,
+    }
+    start = time.perf_counter()
+    for chunk in application(environ, lambda code, headers: status.append(
+        code,
+    )):
+        pass
+    return time.perf_counter() - start
+
+
+first = request()
+timings = [request() for _ in range(requests)]
+print(json.dumps({
+    'startup': startup,
+    'first_request': first,
+    'request': sorted(timings)[len(timings) // 2],
+    'status': status[-1],
+    'modules': len(sys.modules),
+}))
+'''
+
+
+class Command(BaseCommand):
+    """Django command to compare the startup of settings modules"""
+    help = (
+        'Start fresh worker processes with each settings module and report '
+        'the time to load the WSGI application and URL patterns, without '
+        'and with the warm-up, then the first and the median request time. '
+        'The request is sent without '
+        'credentials, so it measures the middleware and view stack without '
+        'any query.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--settings-modules', nargs='+',
+            default=['app.settings', 'app.settings_api'],
+        )
+        parser.add_argument('--path', default='/api/recipe/recipes/')
+        parser.add_argument('--host', default='localhost')
+        parser.add_argument(
+            '--processes', type=int, default=5,
+            help='Worker processes started per settings module',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=500,
+            help='Requests sent by each worker process',
+        )
+
+    def _sample(self, module, warm, options):
+        """Start a worker process and return its measures"""
+        result = subprocess.run(
+            [sys.executable, '-c', WORKER, options['path'], options['host'],
+             str(options['requests']), '1' if warm else '0'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': module},
+        )
+        if result.returncode:
+            raise CommandError(f'{module} failed:\n{result.stderr}')
+        return json.loads(result.stdout.splitlines()[-1])
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        self.stdout.write(
+            f'{"settings":<24}{"warm-up":<9}{"startup":>12}{"first":>12}'
+            f'{"request":>12}{"modules":>9}{"status":>8}'
+        )
+        for module, warm in itertools.product(
+            options['settings_modules'], (False, True),
+        ):
+            samples = [
+                self._sample(module, warm, options)
+                for _ in range(options['processes'])
+            ]
+            startup, first, request = (
+                statistics.median(sample[name] for sample in samples) * 1000
+                for name in ('startup', 'first_request', 'request')
+            )
+            self.stdout.write(
+                f'{module:<24}{"yes" if warm else "no":<9}'
+                f'{startup:>9.1f} ms{first:>9.2f} ms'
+                f'{request * 1000:>9.1f} us{samples[0]["modules"]:>9}'
+                f'{samples[0]["status"][:3]:>8}'
+            )
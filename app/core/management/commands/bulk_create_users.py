@@ -0,0 +1,44 @@
+"""
+Django command to create users in bulk from a CSV file
+"""
+
+import csv
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """Django command to create users in bulk from a CSV file"""
+    help = 'Create users from a CSV file with email, password and name columns'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='Path of the CSV file')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count() or 1,
+            help='Processes hashing the passwords',
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        with open(options['csv_file'], newline='') as csv_file:
+            rows = list(csv.DictReader(csv_file))
+
+        self.stdout.write(f'Creating {len(rows)} users...')
+        created, failures = get_user_model().objects.bulk_create_users(
+            rows,
+            batch_size=options['batch_size'],
+            processes=options['processes'],
+        )
+
+        for failure in failures:
+            # the header is line 1 of the file
+            self.stderr.write(
+                f'line {failure["row"] + 2}: {failure["email"]}: '
+                f'{failure["error"]}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'{created} users created, {len(failures)} failed'
+        ))
@@ -0,0 +1,90 @@
+"""
+Django command to delete the tags and ingredients used by no recipe
+"""
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef
+from django.utils import timezone
+
+from core.models import Ingredient, Recipe, Tag
+
+
+class Command(BaseCommand):
+    """Django command to delete the tags and ingredients used by no recipe"""
+    help = (
+        'Delete the tags and ingredients linked to no recipe and older than '
+        'the grace period. Rows are examined in windows of primary keys, '
+        'each in its own short transaction, and rows locked by API writes '
+        'are skipped (SKIP LOCKED on PostgreSQL). The rows are checked '
+        'again to be unused when deleted.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=float, default=24,
+            help='Keep orphans created less than this many hours ago',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Seconds to wait between batches',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Run again every INTERVAL seconds',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only count the orphans',
+        )
+
+    def _prune(self, model, through, cutoff, options):
+        """Delete the orphans of a model, return how many were found"""
+        column = f'{model._meta.model_name}_id'
+        orphans = model.objects.filter(created_at__lt=cutoff).exclude(
+            Exists(through.objects.filter(**{column: OuterRef('pk')})),
+        )
+        last_pk = model.objects.aggregate(Max('pk'))['pk__max'] or 0
+        batch_size = options['batch_size']
+        pruned = 0
+        for start in range(0, last_pk, batch_size):
+            with transaction.atomic():
+                ids = list(orphans.filter(
+                    pk__gt=start, pk__lte=start + batch_size,
+                ).select_for_update(skip_locked=True).values_list(
+                    'pk', flat=True,
+                ))
+                found = len(ids)
+                if ids and not options['dry_run']:
+                    # checked again, a link may have been committed since
+                    # the select by a transaction which did not lock
+                    _, deleted = orphans.filter(pk__in=ids).delete()
+                    found = deleted.get(model._meta.label, 0)
+            pruned += found
+            if ids and options['pause']:
+                time.sleep(options['pause'])
+        return pruned
+
+    def _run(self, options):
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        verb = 'orphans' if options['dry_run'] else 'deleted'
+        for model, through in (
+            (Tag, Recipe.tags.through),
+            (Ingredient, Recipe.ingredients.through),
+        ):
+            pruned = self._prune(model, through, cutoff, options)
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {pruned} {verb}'
+            )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        while True:
+            self._run(options)
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
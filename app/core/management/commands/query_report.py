@@ -0,0 +1,72 @@
+"""
+Django command to report the statistics of the slow query log
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.query_log import STATS
+
+SORT_KEYS = {
+    'total': lambda stats: stats['total'],
+    'count': lambda stats: stats['count'],
+    'mean': lambda stats: stats['total'] / stats['count'],
+    'max': lambda stats: stats['max'],
+}
+
+
+class Command(BaseCommand):
+    """Django command to report the statistics of the slow query log"""
+    help = (
+        'Show the queries run by the API processes, grouped by fingerprint. '
+        'The processes write their statistics to QUERY_LOG_DIR, which must '
+        'be set to the same directory for the command.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--sort', choices=sorted(SORT_KEYS), default='total',
+        )
+        parser.add_argument(
+            '--plans', action='store_true',
+            help='Show the plans of the explained queries',
+        )
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Forget the statistics after the report',
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        if not settings.QUERY_LOG_DIR:
+            raise CommandError(
+                'QUERY_LOG_DIR is not set, the API processes do not share '
+                'their query statistics'
+            )
+        stats = STATS.collect()
+        if not stats:
+            self.stdout.write('No queries recorded')
+            return
+        rows = sorted(
+            stats.items(), key=lambda item: SORT_KEYS[options['sort']](
+                item[1]
+            ), reverse=True,
+        )[:options['limit']]
+
+        self.stdout.write(
+            f'{"count":>8} {"total ms":>10} {"mean ms":>9} {"max ms":>9}  '
+            'query'
+        )
+        for key, query in rows:
+            self.stdout.write(
+                f'{query["count"]:>8} {query["total"] * 1000:>10.1f} '
+                f'{query["total"] * 1000 / query["count"]:>9.2f} '
+                f'{query["max"] * 1000:>9.2f}  {key}'
+            )
+            if options['plans'] and query['plan']:
+                for line in query['plan'].splitlines():
+                    self.stdout.write(f'{"":>40}{line}')
+
+        if options['reset']:
+            STATS.reset()
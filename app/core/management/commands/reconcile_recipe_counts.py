@@ -0,0 +1,34 @@
+"""
+Django command to repair the recipe counts of tags and ingredients
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.models import Ingredient, Tag
+from core.recipe_counts import reconcile
+
+
+class Command(BaseCommand):
+    """Django command to repair the recipe counts of tags and ingredients"""
+    help = (
+        'Recount the recipes linked to every tag and ingredient and fix '
+        'the recipe_count columns which drifted.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report the drifted rows',
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        for model in (Tag, Ingredient):
+            fixed = reconcile(
+                model, options['batch_size'], options['dry_run'],
+            )
+            verb = 'drifted' if options['dry_run'] else 'fixed'
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {fixed} {verb}'
+            )
@@ -0,0 +1,55 @@
+"""
+Django command to check and repair the recipe summaries
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import recipe_summaries
+
+
+class Command(BaseCommand):
+    """Django command to check and repair the recipe summaries"""
+    help = (
+        'Compare the recipe summaries to the recipes in batches and rebuild '
+        'the missing or out of date ones.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report the drifted summaries, fail if any',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Run again every INTERVAL seconds',
+        )
+
+    def _run(self, options):
+        drifted = 0
+        batch = []
+        for recipe_id in recipe_summaries.check(options['batch_size']):
+            drifted += 1
+            if options['check']:
+                continue
+            batch.append(recipe_id)
+            if len(batch) >= options['batch_size']:
+                recipe_summaries.refresh(batch)
+                batch = []
+        if batch:
+            recipe_summaries.refresh(batch)
+        verb = 'drifted' if options['check'] else 'refreshed'
+        self.stdout.write(f'{drifted} recipe summaries {verb}')
+        return drifted
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        while True:
+            drifted = self._run(options)
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+        if options['check'] and drifted:
+            raise CommandError('Recipe summaries drifted')
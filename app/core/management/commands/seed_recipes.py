@@ -0,0 +1,267 @@
+"""
+Django command to generate a synthetic recipe dataset
+"""
+
+import io
+import itertools
+import json
+import random
+from decimal import Decimal
+
+from PIL import Image
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core.models import User, Recipe, RecipeSummary, Tag, Ingredient
+from core.recipe_counts import recount
+
+WORDS = (
+    'spicy', 'roasted', 'creamy', 'grilled', 'tomato', 'garlic', 'lemon',
+    'chicken', 'tofu', 'pasta', 'rice', 'curry', 'salad', 'soup', 'cake',
+    'bread', 'mushroom', 'basil', 'honey', 'chocolate', 'beans', 'fish',
+)
+EMAIL_DOMAIN = 'seed.example.com'
+
+
+def zipf_cum_weights(size, exponent):
+    """Return the cumulative Zipf weights of ranks 1 to size"""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, size + 1)
+    ))
+
+
+def zipf_sample(rand, cum_weights, count):
+    """Return `count` distinct ranks drawn from a Zipf distribution"""
+    count = min(count, len(cum_weights))
+    population = range(len(cum_weights))
+    picked = set()
+    while len(picked) < count:
+        picked.update(rand.choices(
+            population, cum_weights=cum_weights, k=count - len(picked),
+        ))
+    return sorted(picked)
+
+
+def copy_value(value):
+    """Format a value for the PostgreSQL COPY text format"""
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t') \
+        .replace('\n', '\\n').replace('\r', '\\r')
+
+
+class Command(BaseCommand):
+    """Django command to generate a synthetic recipe dataset"""
+    help = (
+        'Generate users with recipes, tags and ingredients. Tags and '
+        'ingredients are reused following a Zipf distribution. Rows are '
+        'inserted with COPY on PostgreSQL and bulk inserts elsewhere. Run it '
+        'while nothing else writes to the database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000,
+                            help='Recipes per user')
+        parser.add_argument('--tags', type=int, default=50,
+                            help='Tags per user')
+        parser.add_argument('--ingredients', type=int, default=200,
+                            help='Ingredients per user')
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--zipf', type=float, default=1.1,
+                            help='Exponent of the Zipf distribution')
+        parser.add_argument('--images', type=float, default=0,
+                            help='Fraction of the recipes with an image')
+        parser.add_argument('--password', default=None,
+                            help='Password of the users, unusable if unset')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--no-copy', action='store_true',
+                            help='Use bulk inserts on PostgreSQL too')
+
+    def _next_id(self, model):
+        return (model.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+
+    def _insert(self, model, fields, rows):
+        """Insert the rows, a list of tuples of the fields values"""
+        if not rows:
+            return
+        table = connection.ops.quote_name(model._meta.db_table)
+        columns = ', '.join(
+            connection.ops.quote_name(model._meta.get_field(f).column)
+            for f in fields
+        )
+        with connection.cursor() as cursor:
+            if self.use_copy:
+                data = io.StringIO(''.join(
+                    '\t'.join(copy_value(value) for value in row) + '\n'
+                    for row in rows
+                ))
+                cursor.cursor.copy_expert(
+                    f'COPY {table} ({columns}) FROM STDIN', data,
+                )
+            else:
+                placeholders = ', '.join(['%s'] * len(fields))
+                cursor.executemany(
+                    f'INSERT INTO {table} ({columns}) '
+                    f'VALUES ({placeholders})',
+                    rows,
+                )
+
+    def _images(self, rand, count):
+        """Save `count` small images and return their names"""
+        names = []
+        for index in range(count):
+            image_file = io.BytesIO()
+            color = tuple(rand.randrange(256) for _ in range(3))
+            Image.new('RGB', (64, 64), color).save(image_file, format='JPEG')
+            names.append(default_storage.save(
+                f'uploads/recipe/seed-{index}.jpg',
+                ContentFile(image_file.getvalue()),
+            ))
+        return names
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        rand = random.Random(options['seed'])
+        self.use_copy = connection.vendor == 'postgresql' \
+            and not options['no_copy']
+        batch_size = options['batch_size']
+        users_count = options['users']
+        tags_count, ingredients_count = options['tags'], options['ingredients']
+        password = make_password(options['password'])
+        images = self._images(rand, 10) if options['images'] > 0 else []
+
+        with transaction.atomic():
+            user_id = self._next_id(User)
+            tag_id = self._next_id(Tag)
+            ingredient_id = self._next_id(Ingredient)
+            recipe_id = self._next_id(Recipe)
+            recipe_tag_id = self._next_id(Recipe.tags.through)
+            recipe_ingredient_id = self._next_id(Recipe.ingredients.through)
+
+            first_user = user_id
+            self._insert(User, (
+                'id', 'email', 'name', 'password', 'is_active', 'is_staff',
+                'is_superuser', 'token_version',
+            ), [
+                (first_user + index, f'seed-{first_user + index}@'
+                 f'{EMAIL_DOMAIN}', f'Seed user {index}', password,
+                 True, False, False, 0)
+                for index in range(users_count)
+            ])
+            fields = ('id', 'user_id', 'name', 'recipe_count', 'created_at')
+            now = connection.ops.adapt_datetimefield_value(timezone.now())
+            for model, count, first, prefix in (
+                (Tag, tags_count, tag_id, 'Tag'),
+                (Ingredient, ingredients_count, ingredient_id, 'Ingredient'),
+            ):
+                rows = []
+                for index in range(users_count * count):
+                    rows.append((
+                        first + index,
+                        first_user + index // count,
+                        f'{prefix} {index % count}',
+                        0,
+                        now,
+                    ))
+                    if len(rows) >= batch_size:
+                        self._insert(model, fields, rows)
+                        rows = []
+                self._insert(model, fields, rows)
+
+            tag_weights = zipf_cum_weights(tags_count, options['zipf'])
+            ingredient_weights = zipf_cum_weights(
+                ingredients_count, options['zipf'],
+            )
+            total = users_count * options['recipes']
+            for start in range(0, total, batch_size):
+                recipes, recipe_tags, recipe_ingredients = [], [], []
+                summaries = []
+                for index in range(start, min(start + batch_size, total)):
+                    user_index = index // options['recipes']
+                    image = ''
+                    if images and rand.random() < options['images']:
+                        image = rand.choice(images)
+                    recipe = (
+                        recipe_id, first_user + user_index,
+                        ' '.join(rand.sample(WORDS, 3)).capitalize(),
+                        'Mix everything and cook until done.',
+                        rand.randint(5, 180),
+                        Decimal(rand.randint(100, 99999)) / 100,
+                        '', image,
+                    )
+                    recipes.append(recipe)
+                    tags = []
+                    for rank in zipf_sample(
+                        rand, tag_weights, options['tags_per_recipe'],
+                    ):
+                        tags.append({
+                            'id': tag_id + user_index * tags_count + rank,
+                            'name': f'Tag {rank}',
+                        })
+                        recipe_tags.append(
+                            (recipe_tag_id, recipe_id, tags[-1]['id'])
+                        )
+                        recipe_tag_id += 1
+                    ingredients = []
+                    for rank in zipf_sample(
+                        rand, ingredient_weights,
+                        options['ingredients_per_recipe'],
+                    ):
+                        ingredients.append({
+                            'id': ingredient_id
+                            + user_index * ingredients_count + rank,
+                            'name': f'Ingredient {rank}',
+                        })
+                        recipe_ingredients.append((
+                            recipe_ingredient_id, recipe_id,
+                            ingredients[-1]['id'],
+                        ))
+                        recipe_ingredient_id += 1
+                    summaries.append(recipe[:3] + recipe[4:7] + (
+                        json.dumps(tags), json.dumps(ingredients),
+                    ))
+                    recipe_id += 1
+
+                self._insert(Recipe, (
+                    'id', 'user_id', 'title', 'description', 'time_minutes',
+                    'price', 'link', 'image',
+                ), recipes)
+                self._insert(
+                    Recipe.tags.through, ('id', 'recipe_id', 'tag_id'),
+                    recipe_tags,
+                )
+                self._insert(
+                    Recipe.ingredients.through,
+                    ('id', 'recipe_id', 'ingredient_id'),
+                    recipe_ingredients,
+                )
+                self._insert(RecipeSummary, (
+                    'recipe_id', 'user_id', 'title', 'time_minutes', 'price',
+                    'link', 'tags', 'ingredients',
+                ), summaries)
+                self.stdout.write(f'{start + len(recipes)}/{total} recipes')
+
+            recount(Tag.objects.filter(pk__gte=tag_id))
+            recount(Ingredient.objects.filter(pk__gte=ingredient_id))
+
+            # ids were set explicitly, move the sequences past them
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), [
+                    User, Tag, Ingredient, Recipe,
+                    Recipe.tags.through, Recipe.ingredients.through,
+                ]):
+                    cursor.execute(sql)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {users_count} users and {total} recipes'
+        ))
@@ -4,11 +4,10 @@ Django command to wait for de db to be availble
 
 import time
 
-from psycopg2 import OperationalError as Psycopg2Error
-
-from django.db.utils import OperationalError
 from django.core.management.base import BaseCommand
 
+from core.health import DATABASE_ERRORS, check_database
+
 
 class Command(BaseCommand):
     """Django command to wait for de db to be availble"""
@@ -19,9 +18,10 @@ class Command(BaseCommand):
         db_up = False
         while db_up is False:
             try:
-                self.check(databases=['default'])
+                # the probe of the readiness endpoint, with its timeouts
+                check_database()
                 db_up = True
-            except (Psycopg2Error, OperationalError):
+            except DATABASE_ERRORS:
                 self.stdout.write("Database unavailable, waiting 1 second...")
                 time.sleep(1)
         self.stdout.write(self.style.SUCCESS("Database available!"))
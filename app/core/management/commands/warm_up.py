@@ -0,0 +1,28 @@
+"""
+Django command to run the worker warm-up steps
+"""
+
+from django.core.management.base import BaseCommand
+
+from core import warmup
+
+
+class Command(BaseCommand):
+    """Django command to run the worker warm-up steps"""
+    help = (
+        'Import the apps, compile the URL patterns, build the serializer '
+        'fields and request WARM_UP_PATHS, and print the time of each '
+        'step. The workers run the same steps when they load the '
+        'application, see the WARM_UP setting. They keep the database '
+        'connection opened by the requests only with WARM_UP=sync and '
+        'DB_CONN_MAX_AGE > 0.'
+    )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        timings = warmup.warm_up()
+        for name, seconds in timings.items():
+            self.stdout.write(f'{name:<14}{seconds * 1000:>10.2f} ms')
+        self.stdout.write(
+            f'{"total":<14}{sum(timings.values()) * 1000:>10.2f} ms'
+        )
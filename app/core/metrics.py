@@ -0,0 +1,384 @@
+"""
+In-process metrics registry with a Prometheus text exposition
+"""
+
+import fcntl
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Metric:
+    """Base metric, values are stored by label values"""
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self):
+        """Return the metric as a JSON serializable dict"""
+        with self._lock:
+            values = [
+                [list(key), value] for key, value in self._values.items()
+            ]
+        return {
+            'type': self.type,
+            'help': self.documentation,
+            'labelnames': list(self.labelnames),
+            'values': values,
+        }
+
+
+class Counter(Metric):
+    """Monotonic counter"""
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Value of the process at the time of the scrape"""
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets"""
+    type = 'histogram'
+
+    def __init__(self, *args, buckets=DEFAULT_BUCKETS, **kwargs):
+        self.buckets = tuple(buckets)
+        super().__init__(*args, **kwargs)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # counts per bucket, then sum and count
+            values = self._values.setdefault(
+                key, [0] * len(self.buckets) + [0, 0],
+            )
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    values[index] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    def snapshot(self):
+        result = super().snapshot()
+        result['buckets'] = list(self.buckets)
+        return result
+
+
+def _add(left, right):
+    """Add two metric values, histogram values element by element"""
+    if isinstance(left, list):
+        return [a + b for a, b in zip(left, right)]
+    return left + right
+
+
+def merge(snapshots):
+    """Merge the snapshots of several processes"""
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, 'values': {}})
+            for key, value in metric['values']:
+                key = tuple(key)
+                if key in target['values']:
+                    value = _add(target['values'][key], value)
+                target['values'][key] = value
+    return merged
+
+
+def _as_snapshot(merged):
+    """Return merged metrics in the JSON serializable snapshot format"""
+    return {
+        name: {**metric, 'values': [
+            [list(key), value] for key, value in metric['values'].items()
+        ]}
+        for name, metric in merged.items()
+    }
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{n}="{v}"' for n, v in escaped) + '}'
+
+
+def exposition(merged):
+    """Return the merged metrics in the Prometheus text format"""
+    lines = []
+    for name, metric in sorted(merged.items()):
+        lines.append(f'# HELP {name} {metric["help"]}')
+        lines.append(f'# TYPE {name} {metric["type"]}')
+        names = metric['labelnames']
+        for key, value in sorted(metric['values'].items()):
+            if metric['type'] != 'histogram':
+                lines.append(f'{name}{_format_labels(names, key)} {value}')
+                continue
+            bounds = [str(bound) for bound in metric['buckets']] + ['+Inf']
+            for bound, count in zip(bounds, value[:-2] + [value[-1]]):
+                labels = _format_labels(names, key, [('le', bound)])
+                lines.append(f'{name}_bucket{labels} {count}')
+            labels = _format_labels(names, key)
+            lines.append(f'{name}_sum{labels} {value[-2]}')
+            lines.append(f'{name}_count{labels} {value[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ProcessFiles:
+    """
+    Snapshots shared by the processes through the files of a directory.
+
+    The files are named after the pid and start time of the process, so a
+    reused pid does not overwrite them. Reading them folds the snapshots
+    of the processes which exited into a total file with `fold(total,
+    snapshot)` and deletes their files.
+    """
+
+    def __init__(self, prefix, fold):
+        self.prefix = prefix
+        self.fold = fold
+        self.total_file = f'{prefix}_total.json'
+        self._pid = None
+        self._started = None
+
+    def process_file(self):
+        """Return the name of the file of the process"""
+        pid = os.getpid()
+        if pid != self._pid:
+            # first write, or a process forked after a write
+            self._pid, self._started = pid, int(time.time() * 1000)
+        return f'{self.prefix}_{pid}_{self._started}.json'
+
+    @contextmanager
+    def lock(self, directory):
+        """Lock the files of the directory against the other processes"""
+        lock_path = os.path.join(directory, f'{self.prefix}.lock')
+        with open(lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def write(self, directory, snapshot, name=None):
+        """Write a snapshot, to the file of the process by default"""
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'w') as tmp_file:
+            json.dump(snapshot, tmp_file)
+        os.replace(
+            tmp_path, os.path.join(directory, name or self.process_file()),
+        )
+
+    def _read(self, path):
+        try:
+            with open(path) as snapshot_file:
+                return json.load(snapshot_file)
+        except (OSError, ValueError):
+            return None
+
+    def _exited(self, path):
+        """Return whether the process of a file exited"""
+        pid = int(os.path.basename(path).rsplit('_', 2)[1])
+        if pid == os.getpid():
+            return os.path.basename(path) != self.process_file()
+        return not _pid_alive(pid)
+
+    def _files(self, directory):
+        return glob.glob(os.path.join(directory, f'{self.prefix}_*_*.json'))
+
+    def read(self, directory):
+        """
+        Return the snapshots of the processes, after adding the ones of the
+        processes which exited to the total file and deleting their files
+        """
+        # concurrent reads would count the folded files twice
+        with self.lock(directory):
+            total = self._read(os.path.join(directory, self.total_file))
+            total = total or {}
+            running, exited = [], []
+            for path in self._files(directory):
+                snapshot = self._read(path)
+                if snapshot is None:
+                    continue
+                if not self._exited(path):
+                    running.append(snapshot)
+                    continue
+                exited.append(path)
+                total = self.fold(total, snapshot)
+
+            if exited:
+                self.write(directory, total, self.total_file)
+                for path in exited:
+                    os.unlink(path)
+            return [total] + running
+
+    def delete(self, directory):
+        """Delete the files of every process and the total file"""
+        for path in self._files(directory) + [
+            os.path.join(directory, self.total_file),
+        ]:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+def _fold(total, snapshot):
+    """Add the counters and histograms of an exited process to the total"""
+    return _as_snapshot(merge([total, {
+        name: metric for name, metric in snapshot.items()
+        if metric['type'] != 'gauge'
+    }]))
+
+
+class Registry:
+    """
+    Metrics of the process.
+
+    With METRICS_DIR set, every process writes its metrics to a file of
+    that directory at most every METRICS_FLUSH_SECONDS, and a scrape from
+    any process adds up the files of all of them (gunicorn workers). A
+    scrape folds the counters and histograms of the processes which
+    exited into a total file and deletes their files, their gauges are
+    dropped (see ProcessFiles).
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._last_flush = 0
+        self.files = ProcessFiles('metrics', _fold)
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+
+    def add_collector(self, collector):
+        """Add a callable updating gauges before each snapshot"""
+        self._collectors.append(collector)
+
+    def snapshot(self):
+        for collector in self._collectors:
+            collector()
+        return {
+            name: metric.snapshot() for name, metric in self._metrics.items()
+        }
+
+    def flush(self, force=False):
+        """Write the metrics of the process to METRICS_DIR"""
+        if not settings.METRICS_DIR:
+            return
+        now = time.monotonic()
+        interval = settings.METRICS_FLUSH_SECONDS
+        if not force and now - self._last_flush < interval:
+            return
+        self._last_flush = now
+
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        self.files.write(settings.METRICS_DIR, self.snapshot())
+
+    def collect(self):
+        """Return the metrics of all the processes in the text format"""
+        if not settings.METRICS_DIR:
+            return exposition(merge([self.snapshot()]))
+
+        self.flush(force=True)
+        return exposition(merge(self.files.read(settings.METRICS_DIR)))
+
+
+REGISTRY = Registry()
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'Request latency by route name',
+    ['route', 'method'],
+)
+DB_QUERIES = Counter(
+    'db_queries_total',
+    'Database queries by route name',
+    ['route'],
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total',
+    'Cache lookups by cache and result (hit or miss)',
+    ['cache', 'result'],
+)
+DB_CONNECTIONS_OPEN = Gauge(
+    'db_connections_open',
+    'Open database connections of the process by alias',
+    ['alias'],
+)
+DB_CONNECTIONS_CREATED = Counter(
+    'db_connections_created_total',
+    'Database connections opened by alias',
+    ['alias'],
+)
+IMAGE_UPLOAD_BYTES = Histogram(
+    'recipe_image_upload_bytes',
+    'Size of the uploaded recipe images',
+    buckets=(
+        16 * 1024, 64 * 1024, 256 * 1024,
+        1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2,
+    ),
+)
+
+
+def record_cache(cache, hit):
+    """Count a cache lookup"""
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def _collect_connections():
+    # only the connections of the calling thread are visible
+    for connection in connections.all():
+        DB_CONNECTIONS_OPEN.set(
+            int(connection.connection is not None), alias=connection.alias,
+        )
+
+
+def _connection_created(sender, connection, **kwargs):
+    DB_CONNECTIONS_CREATED.inc(alias=connection.alias)
+
+
+REGISTRY.add_collector(_collect_connections)
+connection_created.connect(_connection_created)
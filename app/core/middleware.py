@@ -0,0 +1,331 @@
+"""
+Middlewares of the project
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from rest_framework.throttling import BaseThrottle
+
+from core import compression, instrumentation, profiling, query_log
+from core.metrics import DB_QUERIES, REGISTRY, REQUEST_DURATION
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentationMiddleware(MiddlewareMixin):
+    """
+    Measure the database queries, SQL time, serializer time and render
+    time of each request.
+
+    They are returned in a `Server-Timing` header and logged as one JSON
+    line per request, at warning level for requests running more than
+    INSTRUMENTATION_QUERY_THRESHOLD queries. Latency and query counts also
+    feed the /metrics registry, and every query the slow query log of
+    `core.query_log`.
+
+    Like the other middlewares of the project it runs in the mode of the
+    handler, so an ASGI request does not hold a thread until it reaches
+    its view. Queries are counted on the connections of the request
+    thread, and by the async views in theirs; the queries of sync views
+    under ASGI, which Django runs in threads of its own, are not counted.
+    """
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # DRF viewsets map the HTTP method to an action
+        actions = getattr(view_func, 'actions', None) or {}
+        request.instrumentation_action = actions.get(request.method.lower())
+
+    def process_template_response(self, request, response):
+        metrics = instrumentation.current_metrics()
+        if metrics is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                metrics.add('render', time.perf_counter() - start)
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        token = instrumentation.start_request()
+        start = time.perf_counter()
+        try:
+            with instrumentation.instrument_queries():
+                response = self.get_response(request)
+        finally:
+            metrics = instrumentation.finish_request(token)
+        return self._record(
+            request, response, metrics, time.perf_counter() - start,
+        )
+
+    async def __acall__(self, request):
+        token = instrumentation.start_request()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics = instrumentation.finish_request(token)
+        return self._record(
+            request, response, metrics, time.perf_counter() - start,
+        )
+
+    def _record(self, request, response, metrics, total):
+        """Add the timings to the response, the metrics and the log"""
+        response['Server-Timing'] = ', '.join(
+            [f'db;dur={metrics.timings["db"] * 1000:.2f};'
+             f'desc="{metrics.queries} queries"'] +
+            [f'{name};dur={seconds * 1000:.2f}'
+             for name, seconds in metrics.timings.items() if name != 'db'] +
+            [f'total;dur={total * 1000:.2f}']
+        )
+
+        match = request.resolver_match
+        route = match.view_name if match else 'unmatched'
+        REQUEST_DURATION.observe(total, route=route, method=request.method)
+        DB_QUERIES.inc(metrics.queries, route=route)
+        REGISTRY.flush()
+        query_log.STATS.flush()
+
+        too_many = metrics.queries > settings.INSTRUMENTATION_QUERY_THRESHOLD
+        logger.log(
+            logging.WARNING if too_many else logging.INFO,
+            json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'view': route,
+                'action': getattr(request, 'instrumentation_action', None),
+                'status': response.status_code,
+                'queries': metrics.queries,
+                'query_threshold_exceeded': too_many,
+                **{
+                    f'{name}_ms': round(seconds * 1000, 2)
+                    for name, seconds in metrics.timings.items()
+                },
+                'total_ms': round(total * 1000, 2),
+            }),
+        )
+        return response
+
+
+class ProfilingMiddleware(MiddlewareMixin):
+    """
+    Profile PROFILER_SAMPLE_RATE of the requests with a sampling profiler,
+    at most PROFILER_MAX_PER_MINUTE per process. Whether a request is
+    profiled is decided before it runs, so the other requests never pay
+    for the sampler. With PROFILER_SLOW_MS set, only the profiles of the
+    requests running more than that are kept.
+
+    Profiles are written to PROFILER_DIR as collapsed stacks or speedscope
+    JSON, keeping the PROFILER_MAX_FILES most recent ones. The middleware
+    is disabled while PROFILER_DIR is empty. The sampler follows the
+    thread of the request, so ASGI requests, which have none, and code run
+    in other threads (the async views) are not profiled.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILER_DIR:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.interval = settings.PROFILER_INTERVAL_MS / 1000
+        self.sampler = profiling.Sampler(self.interval)
+        self.limiter = profiling.RateLimiter(
+            settings.PROFILER_MAX_PER_MINUTE
+        )
+
+    def _write(self, request, stacks, total):
+        match = request.resolver_match
+        route = match.view_name if match else 'unmatched'
+        name = f'{request.method} {request.path} {total * 1000:.0f}ms'
+        filename = '{}-{}-{}-{:.0f}ms-{}'.format(
+            time.strftime('%Y%m%dT%H%M%S'), request.method,
+            re.sub(r'[^\w.-]', '_', route), total * 1000,
+            uuid.uuid4().hex[:8],
+        )
+        if settings.PROFILER_FORMAT == 'speedscope':
+            filename += '.speedscope.json'
+            content = profiling.speedscope(stacks, name, self.interval)
+        else:
+            filename += '.txt'
+            content = profiling.collapsed(stacks)
+        profiling.write_profile(
+            settings.PROFILER_DIR, filename, content,
+            settings.PROFILER_MAX_FILES,
+        )
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.get_response(request)
+        # the limiter is charged for every profile started, written or not
+        if random.random() >= settings.PROFILER_SAMPLE_RATE or \
+                not self.limiter.allow():
+            return self.get_response(request)
+
+        thread_id = threading.get_ident()
+        start = time.perf_counter()
+        self.sampler.start(thread_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            stacks = self.sampler.stop(thread_id)
+        total = time.perf_counter() - start
+
+        if stacks and total * 1000 >= settings.PROFILER_SLOW_MS:
+            self._write(request, stacks, total)
+        return response
+
+
+class ConcurrencyLimitMiddleware(MiddlewareMixin):
+    """
+    Reject the API requests of a client which already has
+    THROTTLE_MAX_IN_FLIGHT requests running in the worker, with a 429 and a
+    Retry-After header.
+
+    Clients are identified from the Authorization header, the session cookie
+    or the address, so the check runs before any database query. The
+    address is the one the throttles use, read from X-Forwarded-For when
+    the NUM_PROXIES setting of REST_FRAMEWORK counts the proxies in front
+    of the workers.
+    """
+
+    def __init__(self, get_response):
+        if settings.THROTTLE_MAX_IN_FLIGHT <= 0:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def _client_key(self, request):
+        credentials = request.META.get('HTTP_AUTHORIZATION') or \
+            request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        if credentials:
+            return hashlib.sha256(credentials.encode()).hexdigest()
+        return f'anon:{BaseThrottle().get_ident(request)}'
+
+    def _enter(self, key):
+        """Count a request of the client, return a 429 if it has too many"""
+        with self._lock:
+            running = self._in_flight.get(key, 0)
+            if running >= settings.THROTTLE_MAX_IN_FLIGHT:
+                response = JsonResponse(
+                    {'detail': 'Too many concurrent requests.'}, status=429,
+                )
+                response['Retry-After'] = '1'
+                return response
+            self._in_flight[key] = running + 1
+        return None
+
+    def _leave(self, key):
+        with self._lock:
+            self._in_flight[key] -= 1
+            if not self._in_flight[key]:
+                del self._in_flight[key]
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not request.path.startswith('/api/'):
+            return self.get_response(request)
+
+        key = self._client_key(request)
+        rejected = self._enter(key)
+        if rejected is not None:
+            return rejected
+        try:
+            return self.get_response(request)
+        finally:
+            self._leave(key)
+
+    async def __acall__(self, request):
+        if not request.path.startswith('/api/'):
+            return await self.get_response(request)
+
+        key = self._client_key(request)
+        rejected = self._enter(key)
+        if rejected is not None:
+            return rejected
+        try:
+            return await self.get_response(request)
+        finally:
+            self._leave(key)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress the API responses of at least COMPRESSION_MIN_BYTES with the
+    first encoding of COMPRESSION_ENCODINGS the client accepts, among the
+    installed ones (brotli and zstandard are optional, gzip always works).
+
+    Views serving cached content can set `compressed_variants` on the
+    response to a dict kept with their cache entry: it is used to look up
+    and store the compressed bytes by encoding, so they are only compressed
+    once. The middleware is disabled while COMPRESSION_ENCODINGS is empty.
+    """
+
+    def __init__(self, get_response):
+        self.encodings = compression.available(
+            settings.COMPRESSION_ENCODINGS
+        )
+        if not self.encodings:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self._compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._compress(request, await self.get_response(request))
+
+    def _compress(self, request, response):
+        """Return the response compressed, when worth it"""
+        if not request.path.startswith('/api/') or response.streaming or \
+                response.has_header('Content-Encoding') or \
+                not compression.compressible(
+                    response.get('Content-Type', '')
+                ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < settings.COMPRESSION_MIN_BYTES:
+            return response
+        encoding = compression.negotiate(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''), self.encodings,
+        )
+        if encoding is None:
+            return response
+
+        variants = getattr(response, 'compressed_variants', None)
+        content = variants.get(encoding) if variants is not None else None
+        if content is None:
+            with instrumentation.timed('compress'):
+                content = compression.compress(response.content, encoding)
+            if variants is not None:
+                variants[encoding] = content
+        if len(content) >= len(response.content):
+            return response
+
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        # the compressed bytes differ, a strong ETag would claim otherwise
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
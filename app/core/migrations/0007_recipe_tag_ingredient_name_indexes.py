@@ -0,0 +1,26 @@
+# flake8: noqa
+# Generated by Django 4.0.10 on 2026-10-19 10:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_user_token_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['name'], name='core_ingredient_name_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['title'], name='core_recipe_title_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['name'], name='core_tag_name_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# flake8: noqa
+# Generated by Django 4.0.10 on 2026-10-19 10:56
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_recipes(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    for field in ('tags', 'ingredients'):
+        through = getattr(Recipe, field).through
+        model = Recipe._meta.get_field(field).related_model
+        column = f'{model._meta.model_name}_id'
+        actual = through.objects.filter(**{column: OuterRef('pk')}) \
+            .values(column).annotate(count=Count('*')).values('count')
+        model.objects.update(recipe_count=Coalesce(Subquery(actual), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_tag_ingredient_name_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_recipes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', '-recipe_count'], name='core_ingredient_usage_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', '-recipe_count'], name='core_tag_usage_idx'),
+        ),
+    ]
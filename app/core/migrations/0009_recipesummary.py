@@ -0,0 +1,69 @@
+# flake8: noqa
+# Generated by Django 4.0.10 on 2026-10-19 10:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+BATCH_SIZE = 1000
+
+
+def build_summaries(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    RecipeSummary = apps.get_model('core', 'RecipeSummary')
+    recipes = Recipe.objects.order_by('id').values(
+        'id', 'user_id', 'title', 'time_minutes', 'price', 'link',
+    )
+    last_pk = 0
+    while True:
+        # in batches of primary keys, like recipe_summaries.refresh
+        batch = list(recipes.filter(id__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            return
+        last_pk = batch[-1]['id']
+        summaries = {}
+        for recipe in batch:
+            recipe_id = recipe.pop('id')
+            summaries[recipe_id] = RecipeSummary(
+                recipe_id=recipe_id, **recipe, tags=[], ingredients=[],
+            )
+        for relation, target in (('tags', 'tag'), ('ingredients', 'ingredient')):
+            links = getattr(Recipe, relation).through.objects.filter(
+                recipe_id__in=list(summaries),
+            ).order_by(
+                f'{target}_id',
+            ).values_list('recipe_id', f'{target}_id', f'{target}__name')
+            for recipe_id, obj_id, name in links:
+                getattr(summaries[recipe_id], relation).append(
+                    {'id': obj_id, 'name': name},
+                )
+        RecipeSummary.objects.bulk_create(summaries.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_tag_ingredient_recipe_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSummary',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='core.recipe')),
+                ('title', models.CharField(max_length=255)),
+                ('time_minutes', models.IntegerField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('link', models.CharField(blank=True, max_length=255)),
+                ('tags', models.JSONField(default=list)),
+                ('ingredients', models.JSONField(default=list)),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='recipesummary',
+            index=models.Index(fields=['user', '-recipe'], name='core_summary_user_idx'),
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
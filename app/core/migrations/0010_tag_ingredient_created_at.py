@@ -0,0 +1,27 @@
+# flake8: noqa
+# Generated by Django 4.0.10 on 2026-10-19 11:20
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipesummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -2,11 +2,18 @@
 Database models
 """
 
+import multiprocessing
 import uuid
 import os
+from concurrent.futures import ProcessPoolExecutor
 
+import django
 from django.conf import settings
-from django.db import models
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import models, transaction, IntegrityError
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -40,6 +47,107 @@ class UserManager(BaseUserManager):
         user.save(using=self._db)
         return user
 
+    def _hash_passwords(self, passwords, processes):
+        """Hash the passwords, in parallel when processes > 1"""
+        if processes <= 1 or len(passwords) < 2:
+            return [make_password(password) for password in passwords]
+
+        # spawn so the workers do not share our database connections
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        ) as pool:
+            chunksize = max(1, len(passwords) // (processes * 4))
+            return list(
+                pool.map(make_password, passwords, chunksize=chunksize)
+            )
+
+    def _validate_rows(self, rows, batch_size):
+        """Split rows into users to create and failures"""
+        users, failures, seen = [], [], set()
+        for index, row in enumerate(rows):
+            email = self.normalize_email(row.get('email') or '')
+            password = row.get('password') or ''
+            name = row.get('name') or ''
+            try:
+                validate_email(email)
+                if len(password) < 5:
+                    raise ValidationError('Password too short')
+                if len(name) > 255:
+                    raise ValidationError('Name too long')
+                if email in seen:
+                    raise ValidationError('Duplicate email in input')
+            except ValidationError as exc:
+                failures.append(
+                    {'row': index, 'email': email, 'error': exc.messages[0]}
+                )
+                continue
+            seen.add(email)
+            users.append((index, email, password, name))
+
+        emails = [user[1] for user in users]
+        existing = set()
+        for start in range(0, len(emails), batch_size):
+            existing.update(self.filter(
+                email__in=emails[start:start + batch_size],
+            ).values_list('email', flat=True))
+        for index, email, _, _ in users:
+            if email in existing:
+                failures.append(
+                    {'row': index, 'email': email, 'error': 'Already exists'}
+                )
+
+        return [user for user in users if user[1] not in existing], failures
+
+    def bulk_create_users(self, rows, batch_size=1000, processes=1):
+        """
+        Create users from dicts with email, password and name.
+
+        Passwords are hashed by `processes` worker processes and users are
+        inserted `batch_size` at a time. Invalid rows are reported and do
+        not stop the run. Returns the number of users created and the
+        failures as dicts with the row index, email and error.
+        """
+        users, failures = self._validate_rows(rows, batch_size)
+        hashes = self._hash_passwords(
+            [user[2] for user in users], processes,
+        )
+
+        created = 0
+        for start in range(0, len(users), batch_size):
+            batch = [
+                self.model(email=email, name=name, password=encoded)
+                for (_, email, _, name), encoded in zip(
+                    users[start:start + batch_size],
+                    hashes[start:start + batch_size],
+                )
+            ]
+            try:
+                with transaction.atomic(using=self._db):
+                    self.bulk_create(batch)
+                created += len(batch)
+                continue
+            except IntegrityError:
+                pass
+
+            # a concurrent insert won the race, find the failing rows
+            for (index, email, _, _), user in zip(
+                users[start:start + batch_size], batch,
+            ):
+                try:
+                    with transaction.atomic(using=self._db):
+                        user.save(using=self._db)
+                    created += 1
+                except IntegrityError:
+                    failures.append(
+                        {'row': index, 'email': email,
+                         'error': 'Already exists'}
+                    )
+
+        failures.sort(key=lambda failure: failure['row'])
+        return created, failures
+
     def create_superuser(self, email, password=None, **extra_fields):
         """Create a new super user"""
         # create a new user
@@ -58,12 +166,41 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     # is the user a django admin member
     is_staff = models.BooleanField(default=False)
+    # bumped to revoke every signed token issued to the user
+    token_version = models.PositiveIntegerField(default=0)
 
     # this is the object manager for the user model
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
 
+    @staticmethod
+    def token_cache_key(pk):
+        """Return the cache key of the user loaded by the signed tokens"""
+        return f'signed-token:user:{pk}'
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        cache.delete(self.token_cache_key(self.pk))
+
+    def delete(self, *args, **kwargs):
+        cache.delete(self.token_cache_key(self.pk))
+        return super().delete(*args, **kwargs)
+
+    def set_password(self, raw_password):
+        """Set the password, revoking the signed tokens once saved"""
+        super().set_password(raw_password)
+        if self.pk is not None:
+            self.token_version += 1
+
+    def revoke_tokens(self):
+        """Revoke every signed token issued to the user"""
+        User.objects.filter(pk=self.pk).update(
+            token_version=models.F('token_version') + 1,
+        )
+        cache.delete(self.token_cache_key(self.pk))
+        self.refresh_from_db(fields=['token_version'])
+
 
 #  models.modl is the base class for all models in django
 class Recipe(models.Model):
@@ -81,11 +218,52 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient', blank=True)
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
 
+    class Meta:
+        indexes = [
+            # pattern ops let the admin prefix searches use the index
+            models.Index(
+                fields=['title'], name='core_recipe_title_idx',
+                opclasses=['varchar_pattern_ops'],
+            ),
+        ]
+
     def __str__(self):
         """Return the string representation of the model"""
         return self.title
 
 
+class RecipeSummary(models.Model):
+    """List representation of a recipe, maintained by core.recipe_summaries"""
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='summary',
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        db_index=False,
+    )
+    title = models.CharField(max_length=255)
+    time_minutes = models.IntegerField()
+    price = models.DecimalField(decimal_places=2, max_digits=5)
+    link = models.CharField(max_length=255, blank=True)
+    # lists of {"id": ..., "name": ...} ordered by id
+    tags = models.JSONField(default=list)
+    ingredients = models.JSONField(default=list)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-recipe'], name='core_summary_user_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
 class Tag(models.Model):
     """Tag to be used for a recipe"""
     user = models.ForeignKey(
@@ -93,6 +271,21 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )
     name = models.CharField(max_length=255)
+    # maintained by core.recipe_counts
+    recipe_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['name'], name='core_tag_name_idx',
+                opclasses=['varchar_pattern_ops'],
+            ),
+            models.Index(
+                fields=['user', '-recipe_count'],
+                name='core_tag_usage_idx',
+            ),
+        ]
 
     # this is how to make a model return a string
     def __str__(self):
@@ -106,6 +299,21 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE,
     )
     name = models.CharField(max_length=255)
+    # maintained by core.recipe_counts
+    recipe_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['name'], name='core_ingredient_name_idx',
+                opclasses=['varchar_pattern_ops'],
+            ),
+            models.Index(
+                fields=['user', '-recipe_count'],
+                name='core_ingredient_usage_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
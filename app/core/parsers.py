@@ -0,0 +1,30 @@
+"""
+Fast JSON parser for the API
+"""
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from core.renderers import FastJSONRenderer, orjson, use_orjson
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSON parser backed by orjson.
+
+    orjson only reads UTF-8, other encodings and the stdlib backend
+    go through DRF's JSONParser.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parse the incoming bytestream as JSON"""
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8')
+        if not use_orjson() or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,149 @@
+"""
+Statistical profiler of the request threads
+"""
+
+import collections
+import json
+import os
+import sys
+import threading
+import time
+
+
+class Sampler:
+    """
+    Background thread recording the Python stack of the registered
+    threads every `interval` seconds. It sleeps while no thread is
+    registered.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._stacks = {}
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id):
+        """Start sampling the thread"""
+        with self._lock:
+            self._stacks[thread_id] = collections.Counter()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='profiler', daemon=True,
+                )
+                self._thread.start()
+            self._active.set()
+
+    def stop(self, thread_id):
+        """Stop sampling the thread and return its stack counts"""
+        with self._lock:
+            stacks = self._stacks.pop(thread_id, collections.Counter())
+            if not self._stacks:
+                self._active.clear()
+        return stacks
+
+    def sample(self):
+        """Record the stack of every registered thread once"""
+        frames = sys._current_frames()
+        with self._lock:
+            for thread_id, stacks in self._stacks.items():
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((
+                        code.co_name, code.co_filename, code.co_firstlineno,
+                    ))
+                    frame = frame.f_back
+                if stack:
+                    stacks[tuple(reversed(stack))] += 1
+
+    def _run(self):
+        while True:
+            self._active.wait()
+            time.sleep(self.interval)
+            self.sample()
+
+
+class RateLimiter:
+    """Allow at most `limit` events per `period` seconds"""
+
+    def __init__(self, limit, period=60):
+        self.limit = limit
+        self.period = period
+        self._events = collections.deque()
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        while self._events and self._events[0] <= now - self.period:
+            self._events.popleft()
+
+    def allow(self):
+        """Record an event if it is allowed and return whether it was"""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            if len(self._events) >= self.limit:
+                return False
+            self._events.append(now)
+            return True
+
+
+def _frame_name(frame):
+    name, filename, line = frame
+    return f'{name} ({filename}:{line})'
+
+
+def collapsed(stacks):
+    """Format stack counts in the collapsed format of flame graph tools"""
+    return ''.join(
+        ';'.join(_frame_name(frame) for frame in stack) + f' {count}\n'
+        for stack, count in stacks.most_common()
+    )
+
+
+def speedscope(stacks, name, interval):
+    """Format stack counts as a speedscope sampled profile"""
+    frames, samples, weights = {}, [], []
+    for stack, count in stacks.most_common():
+        samples.append([frames.setdefault(frame, len(frames))
+                        for frame in stack])
+        weights.append(count * interval * 1000)
+    return json.dumps({
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'exporter': 'recipe-app-api',
+        'name': name,
+        'shared': {'frames': [
+            {'name': frame[0], 'file': frame[1], 'line': frame[2]}
+            for frame in frames
+        ]},
+        'profiles': [{
+            'type': 'sampled',
+            'name': name,
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': sum(weights),
+            'samples': samples,
+            'weights': weights,
+        }],
+    })
+
+
+def write_profile(directory, name, content, max_files):
+    """Write a profile file and delete the oldest ones beyond max_files"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    with open(path, 'w') as profile_file:
+        profile_file.write(content)
+
+    profiles = sorted(
+        (entry for entry in os.scandir(directory) if entry.is_file()),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in profiles[:max(len(profiles) - max_files, 0)]:
+        try:
+            os.unlink(entry.path)
+        except FileNotFoundError:
+            pass
+    return path
@@ -0,0 +1,244 @@
+"""
+Slow query log and statistics of the normalized queries
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from rest_framework import serializers, views
+
+from core.metrics import ProcessFiles
+
+logger = logging.getLogger(__name__)
+
+# set while running an EXPLAIN, which must not be logged itself
+_explaining = contextvars.ContextVar('explaining', default=False)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_ROWS = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+_SPACE = re.compile(r'\s+')
+
+_EXPLAIN = {
+    'postgresql': 'EXPLAIN (ANALYZE off) ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+
+
+@functools.lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """Return the query with its literals and value lists replaced"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _LIST.sub('(...)', sql.replace('%s', '?'))
+    sql = _ROWS.sub('(...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def _merge(snapshots):
+    """Add up the statistics of several processes"""
+    merged = {}
+    for snapshot in snapshots:
+        for key, stats in snapshot.items():
+            total = merged.setdefault(key, {
+                'count': 0, 'total': 0.0, 'max': 0.0, 'plan': None,
+            })
+            total['count'] += stats['count']
+            total['total'] += stats['total']
+            total['max'] = max(total['max'], stats['max'])
+            total['plan'] = total['plan'] or stats['plan']
+    return merged
+
+
+class QueryStats:
+    """
+    Count and time of the queries of the process, by fingerprint.
+
+    With QUERY_LOG_DIR set, every process writes its statistics to a file
+    of that directory at most every METRICS_FLUSH_SECONDS, and `collect`
+    adds up the files of all of them, folding the ones of the processes
+    which exited like the metrics do. `reset` records its time in a
+    marker file, the other processes clear their statistics at their next
+    flush after it.
+    """
+    reset_file = 'queries.reset'
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._last_flush = 0
+        self._since = time.time()
+        self.files = ProcessFiles(
+            'queries', lambda total, snapshot: _merge([total, snapshot]),
+        )
+
+    def record(self, sql, duration):
+        key = fingerprint(sql)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = {
+                    'count': 0, 'total': 0.0, 'max': 0.0, 'plan': None,
+                }
+            stats['count'] += 1
+            stats['total'] += duration
+            stats['max'] = max(stats['max'], duration)
+        return key
+
+    def should_explain(self, key):
+        """Return whether to explain a slow query, once per fingerprint"""
+        with self._lock:
+            stats = self._stats.get(key)
+            return stats is not None and stats['plan'] is None and \
+                random.random() < settings.SLOW_QUERY_EXPLAIN_RATE
+
+    def set_plan(self, key, plan):
+        with self._lock:
+            if key in self._stats:
+                self._stats[key]['plan'] = plan
+
+    def snapshot(self):
+        with self._lock:
+            return {key: dict(stats) for key, stats in self._stats.items()}
+
+    def _clear(self, since):
+        with self._lock:
+            self._stats.clear()
+            self._since = since
+
+    def _reset_time(self):
+        """Return the time of the last reset of QUERY_LOG_DIR, 0 if none"""
+        path = os.path.join(settings.QUERY_LOG_DIR, self.reset_file)
+        try:
+            with open(path) as reset_file:
+                return float(reset_file.read())
+        except (OSError, ValueError):
+            return 0
+
+    def reset(self):
+        """Forget the statistics of every process"""
+        now = time.time()
+        if settings.QUERY_LOG_DIR:
+            os.makedirs(settings.QUERY_LOG_DIR, exist_ok=True)
+            with self.files.lock(settings.QUERY_LOG_DIR):
+                self.files.write(
+                    settings.QUERY_LOG_DIR, now, self.reset_file,
+                )
+                self.files.delete(settings.QUERY_LOG_DIR)
+        self._clear(now)
+
+    def flush(self, force=False):
+        """Write the statistics of the process to QUERY_LOG_DIR"""
+        if not settings.QUERY_LOG_DIR:
+            return
+        now = time.monotonic()
+        interval = settings.METRICS_FLUSH_SECONDS
+        if not force and now - self._last_flush < interval:
+            return
+        self._last_flush = now
+
+        os.makedirs(settings.QUERY_LOG_DIR, exist_ok=True)
+        # a reset between the check and the write would be overwritten
+        with self.files.lock(settings.QUERY_LOG_DIR):
+            reset = self._reset_time()
+            if reset > self._since:
+                # the statistics recorded since the reset go with the rest
+                self._clear(reset)
+            self.files.write(settings.QUERY_LOG_DIR, self.snapshot())
+
+    def collect(self):
+        """Return the statistics of all the processes"""
+        if not settings.QUERY_LOG_DIR:
+            return self.snapshot()
+
+        self.flush(force=True)
+        return _merge(self.files.read(settings.QUERY_LOG_DIR))
+
+
+STATS = QueryStats()
+
+
+def _origin(frame):
+    """Return the view and serializer running the query"""
+    view = serializer = None
+    while frame is not None and (view is None or serializer is None):
+        obj = frame.f_locals.get('self')
+        if serializer is None and \
+                isinstance(obj, serializers.BaseSerializer):
+            serializer = type(obj).__name__
+        elif view is None and isinstance(obj, views.APIView):
+            cls = type(obj)
+            view = f'{cls.__module__}.{cls.__qualname__}'
+            action = getattr(obj, 'action', None)
+            if action:
+                view += f'.{action}'
+        frame = frame.f_back
+    return view, serializer
+
+
+def _explain(connection, sql, params):
+    """Return the plan of a query, None if it can't be explained"""
+    prefix = _EXPLAIN.get(connection.vendor)
+    if prefix is None:
+        return None
+    token = _explaining.set(True)
+    try:
+        # a savepoint keeps a failing EXPLAIN from breaking the transaction
+        with transaction.atomic(using=connection.alias), \
+                connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+    except DatabaseError:
+        return None
+    finally:
+        _explaining.reset(token)
+    return '\n'.join(str(row[-1]) for row in rows)
+
+
+def log_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper adding the queries to the statistics and
+    logging the ones slower than SLOW_QUERY_MS, with the plan of a sample
+    of them
+    """
+    if _explaining.get():
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        result = execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        key = STATS.record(sql, duration)
+
+    threshold = settings.SLOW_QUERY_MS
+    if threshold <= 0 or duration * 1000 < threshold:
+        return result
+
+    view, serializer = _origin(sys._getframe(1))
+    plan = None
+    if not many and sql.lstrip()[:6].upper() == 'SELECT' and \
+            STATS.should_explain(key):
+        plan = _explain(context['connection'], sql, params)
+        # an empty plan keeps failing queries from being explained again
+        STATS.set_plan(key, plan or '')
+    logger.warning(json.dumps({
+        'slow_query_ms': round(duration * 1000, 2),
+        'fingerprint': key,
+        'view': view,
+        'serializer': serializer,
+        'plan': plan,
+    }))
+    return result
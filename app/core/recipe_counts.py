@@ -0,0 +1,108 @@
+"""
+Maintenance of the recipe_count of tags and ingredients
+"""
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import m2m_changed, pre_delete
+from django.dispatch import receiver
+
+from core.models import Ingredient, Recipe, Tag
+
+# through model of each counted relation to the counted model
+RELATIONS = {
+    Recipe.tags.through: Tag,
+    Recipe.ingredients.through: Ingredient,
+}
+
+
+def _add(model, ids, delta):
+    """Add delta to the recipe_count of the objects"""
+    if ids:
+        model.objects.filter(pk__in=ids).update(
+            recipe_count=Greatest(F('recipe_count') + delta, 0),
+        )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def _recipe_links_changed(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    """Update the counts when recipes are linked to tags or ingredients"""
+    model = RELATIONS[sender]
+    column = f'{model._meta.model_name}_id'
+    # pk_set of post_add only holds the new links, but the one of remove
+    # holds every pk given, so the existing links are looked up before
+    if reverse:
+        # the links of one tag or ingredient, to the recipes of pk_set
+        if action == 'post_add':
+            _add(model, [instance.pk], len(pk_set))
+        elif action == 'pre_remove':
+            instance._removed_count = sender.objects.filter(
+                **{column: instance.pk}, recipe_id__in=pk_set,
+            ).count()
+        elif action == 'post_remove':
+            _add(model, [instance.pk], -instance.__dict__.pop(
+                '_removed_count', 0,
+            ))
+        elif action == 'post_clear':
+            model.objects.filter(pk=instance.pk).update(recipe_count=0)
+        return
+
+    if action == 'post_add':
+        _add(model, pk_set, 1)
+    elif action == 'pre_remove':
+        instance._removed_ids = list(sender.objects.filter(
+            recipe_id=instance.pk, **{f'{column}__in': pk_set},
+        ).values_list(column, flat=True))
+    elif action == 'post_remove':
+        _add(model, instance.__dict__.pop('_removed_ids', []), -1)
+    elif action == 'pre_clear':
+        instance._cleared_ids = list(sender.objects.filter(
+            recipe_id=instance.pk,
+        ).values_list(column, flat=True))
+    elif action == 'post_clear':
+        _add(model, instance.__dict__.pop('_cleared_ids', []), -1)
+
+
+@receiver(pre_delete, sender=Recipe)
+def _recipe_deleted(sender, instance, **kwargs):
+    """Decrement the counts of the tags and ingredients of a recipe"""
+    for model in RELATIONS.values():
+        model.objects.filter(recipe=instance).update(
+            recipe_count=Greatest(F('recipe_count') - 1, 0),
+        )
+
+
+def recount(queryset):
+    """Set the recipe_count of the tags or ingredients from their links"""
+    model = queryset.model
+    through = next(
+        through for through, counted in RELATIONS.items() if counted is model
+    )
+    column = f'{model._meta.model_name}_id'
+    actual = through.objects.filter(**{column: OuterRef('pk')}) \
+        .values(column).annotate(count=Count('*')).values('count')
+    return queryset.update(recipe_count=Coalesce(Subquery(actual), 0))
+
+
+def reconcile(model, batch_size=1000, dry_run=False):
+    """
+    Recount the recipes of every tag or ingredient in batches of primary
+    keys, fixing the drifted counts. Return the number of drifted rows.
+    """
+    fixed = 0
+    last_pk = 0
+    while True:
+        batch = list(model.objects.filter(pk__gt=last_pk).order_by('pk')
+                     .annotate(actual=Count('recipe'))
+                     .values_list('pk', 'recipe_count', 'actual')
+                     [:batch_size])
+        if not batch:
+            return fixed
+        last_pk = batch[-1][0]
+        drifted = [pk for pk, count, actual in batch if count != actual]
+        if drifted and not dry_run:
+            # recounted in the UPDATE, so links changed meanwhile are kept
+            recount(model.objects.filter(pk__in=drifted))
+        fixed += len(drifted)
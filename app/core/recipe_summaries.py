@@ -0,0 +1,199 @@
+"""
+Maintenance of the recipe summaries read by the recipe list
+"""
+
+import contextvars
+from collections import defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from core.models import Ingredient, Recipe, RecipeSummary, Tag
+
+# scalar fields copied from the recipe
+FIELDS = ('title', 'time_minutes', 'price', 'link')
+RELATIONS = {
+    'tags': Recipe.tags.through,
+    'ingredients': Recipe.ingredients.through,
+}
+BATCH_SIZE = 1000
+
+# ids of the recipes to refresh when the deferred block exits
+_pending = contextvars.ContextVar('pending_summaries', default=None)
+
+
+def _related(relation, recipe_ids):
+    """Return the (id, name) dicts of a relation grouped by recipe"""
+    through = RELATIONS[relation]
+    target = Recipe._meta.get_field(relation).related_model._meta.model_name
+    links = through.objects.filter(
+        recipe_id__in=recipe_ids,
+    ).order_by(
+        f'{target}_id',
+    ).values_list('recipe_id', f'{target}_id', f'{target}__name')
+
+    related = defaultdict(list)
+    for recipe_id, obj_id, name in links:
+        related[recipe_id].append({'id': obj_id, 'name': name})
+    return related
+
+
+def build(recipe_ids):
+    """Return the unsaved up to date summaries of the recipes"""
+    recipes = Recipe.objects.filter(pk__in=recipe_ids) \
+        .values('id', 'user_id', *FIELDS)
+    related = {
+        relation: _related(relation, recipe_ids) for relation in RELATIONS
+    }
+    summaries = []
+    for recipe in recipes:
+        recipe_id = recipe.pop('id')
+        summaries.append(RecipeSummary(recipe_id=recipe_id, **recipe, **{
+            relation: related[relation].get(recipe_id, [])
+            for relation in RELATIONS
+        }))
+    return summaries
+
+
+def refresh(recipe_ids):
+    """Rebuild the summaries of the recipes"""
+    recipe_ids = sorted(set(recipe_ids))
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        batch = recipe_ids[start:start + BATCH_SIZE]
+        with transaction.atomic():
+            summaries = build(batch)
+            RecipeSummary.objects.filter(recipe_id__in=batch).delete()
+            RecipeSummary.objects.bulk_create(summaries)
+
+
+def _key(summary):
+    return (
+        summary.user_id, summary.title, summary.time_minutes,
+        Decimal(summary.price), summary.link, summary.tags,
+        summary.ingredients,
+    )
+
+
+def check(batch_size=BATCH_SIZE, last_pk=0):
+    """
+    Compare the summaries to the recipes in batches of primary keys and
+    yield the ids of the recipes whose summary is missing or out of date
+    """
+    while True:
+        recipe_ids = list(Recipe.objects.filter(pk__gt=last_pk)
+                          .order_by('pk')
+                          .values_list('pk', flat=True)[:batch_size])
+        if not recipe_ids:
+            return
+        last_pk = recipe_ids[-1]
+        stored = {
+            summary.recipe_id: _key(summary)
+            for summary in RecipeSummary.objects.filter(
+                recipe_id__in=recipe_ids,
+            )
+        }
+        for summary in build(recipe_ids):
+            if stored.get(summary.recipe_id) != _key(summary):
+                yield summary.recipe_id
+
+
+@contextmanager
+def deferred():
+    """Refresh the summaries changed in the block once, at its end"""
+    if _pending.get() is not None:
+        yield
+        return
+    token = _pending.set(set())
+    try:
+        yield
+        pending = _pending.get()
+    finally:
+        _pending.reset(token)
+    refresh(pending)
+
+
+def _changed(recipe_ids):
+    pending = _pending.get()
+    if pending is None:
+        refresh(recipe_ids)
+    else:
+        pending.update(recipe_ids)
+
+
+def _linked_recipes(instance):
+    """Return the ids of the recipes linked to a tag or ingredient"""
+    field = f'{instance._meta.model_name}s'
+    return list(RELATIONS[field].objects.filter(**{
+        f'{instance._meta.model_name}_id': instance.pk,
+    }).values_list('recipe_id', flat=True))
+
+
+def refresh_linked(model_name, pk):
+    """
+    Rebuild the summaries of the recipes linked to a tag or ingredient,
+    in batches of primary keys
+    """
+    links = RELATIONS[f'{model_name}s'].objects.filter(**{
+        f'{model_name}_id': pk,
+    }).order_by('recipe_id').values_list('recipe_id', flat=True)
+    last_pk = 0
+    while True:
+        batch = list(links.filter(recipe_id__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            return
+        last_pk = batch[-1]
+        refresh(batch)
+
+
+@receiver(post_save, sender=Recipe)
+def _recipe_saved(sender, instance, **kwargs):
+    _changed([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def _recipe_links_changed(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _changed([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        _changed(pk_set)
+    elif action == 'pre_clear':
+        instance._summary_recipe_ids = _linked_recipes(instance)
+    elif action == 'post_clear':
+        _changed(instance.__dict__.pop('_summary_recipe_ids', []))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def _name_saved(sender, instance, created, **kwargs):
+    # a tag may be linked to many recipes, they are refreshed in batches
+    # once the rename is committed rather than inside its transaction
+    if not created:
+        model_name, pk = instance._meta.model_name, instance.pk
+        transaction.on_commit(lambda: refresh_linked(model_name, pk))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def _name_deleting(sender, instance, **kwargs):
+    instance._summary_recipe_ids = _linked_recipes(instance)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def _name_deleted(sender, instance, **kwargs):
+    # the recipes may be deleted by the same cascade (user deletion), so
+    # they are only refreshed once it is committed
+    recipe_ids = instance.__dict__.pop('_summary_recipe_ids', [])
+    if recipe_ids:
+        transaction.on_commit(lambda: refresh(recipe_ids))
@@ -0,0 +1,64 @@
+"""
+Fast JSON renderer for the API
+"""
+
+from django.conf import settings
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    if orjson is not None else 0
+)
+
+
+def use_orjson():
+    """Return True if the orjson backend is installed and selected"""
+    return orjson is not None and settings.JSON_BACKEND == 'orjson'
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson.
+
+    Produces the same bytes as DRF's JSONRenderer: datetimes, decimals and
+    lazy strings are handed to DRF's own encoder so their representation
+    does not change. Falls back to the stdlib implementation when orjson is
+    not installed, when JSON_BACKEND is 'json', or for indented output.
+    """
+    # we reuse DRF's encoder for the types orjson does not handle the same
+    _default = staticmethod(encoders.JSONEncoder().default)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render `data` into JSON, returning a bytestring"""
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if not use_orjson() or indent is not None \
+                or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self._default,
+                option=ORJSON_OPTIONS,
+            )
+        except orjson.JSONEncodeError:
+            # e.g. integers over 64 bits, let the stdlib deal with it
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # same escaping as DRF so the output stays a javascript subset
+        return ret.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace(
+            '\u2029'.encode(), b'\\u2029'
+        )
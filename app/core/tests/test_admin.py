@@ -1,11 +1,16 @@
 """
 Tests for the Django admin modifications.
 """
+from unittest.mock import patch
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import Client
 
+from core.admin import EstimatedCountPaginator
+from core.models import Ingredient, Recipe, Tag
+
 
 class AdminSiteTests(TestCase):
     """Tests for Django admin."""
@@ -45,3 +50,66 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+
+class RecipeAdminTests(TestCase):
+    """Tests for the admin pages of recipes, tags and ingredients."""
+
+    def setUp(self):
+        """Create a recipe and log in an admin."""
+        self.client = Client()
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+        )
+        self.client.force_login(self.admin_user)
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Pumpkin soup', time_minutes=5,
+            price='5.00',
+        )
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        self.recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Pumpkin')
+        )
+        Tag.objects.create(user=self.admin_user, name='Unrelated tag')
+
+    def test_changelists(self):
+        """Test the changelists list and search the objects."""
+        for model, text in (
+            ('recipe', 'Pumpkin soup'), ('tag', 'Vegan'),
+            ('ingredient', 'Pumpkin'),
+        ):
+            url = reverse(f'admin:core_{model}_changelist')
+            res = self.client.get(url, {'q': text[:4]})
+
+            self.assertContains(res, text)
+
+    def test_recipe_search_prefix(self):
+        """Test recipes are searched by title prefix."""
+        url = reverse('admin:core_recipe_changelist')
+
+        res = self.client.get(url, {'q': 'soup'})
+
+        self.assertNotContains(res, 'Pumpkin soup')
+
+    def test_edit_recipe_page(self):
+        """Test the edit page doesn't render the tags of every user."""
+        url = reverse('admin:core_recipe_change', args=[self.recipe.id])
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertNotContains(res, 'Unrelated tag')
+
+    @patch('core.admin.COUNT_LIMIT', 2)
+    def test_paginator_count_limit(self):
+        """Test the paginator stops counting at the limit."""
+        for index in range(3):
+            Tag.objects.create(user=self.user, name=f'Tag {index}')
+
+        paginator = EstimatedCountPaginator(Tag.objects.order_by('id'), 1)
+
+        self.assertEqual(paginator.count, 2)
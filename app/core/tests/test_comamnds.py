@@ -2,32 +2,248 @@
 Test custom maangement commands
 """
 
+import io
+import json
+import tempfile
+from datetime import timedelta
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
 
+from core import recipe_summaries
+from core.models import Recipe, Tag
 
-@patch("core.management.commands.wait_for_db.Command.check")
+
+@patch("core.management.commands.wait_for_db.check_database")
 class CommandTests(SimpleTestCase):
     """Test commands"""
     def test_wait_for_db_ready(self, patched_check):
         """Test if the db is ready"""
-        patched_check.return_value = True
+        patched_check.return_value = None
 
         call_command("wait_for_db")
 
-        patched_check.assert_called_once_with(databases=['default'])
+        patched_check.assert_called_once_with()
 
     @patch("time.sleep")
     def test_wait_for_db_delay(self, patched_sleep, patched_check):
         """Test waiting for db when waiting for operationnal errors"""
         patched_check.side_effect = [Psycopg2Error] * 2 + \
-            [OperationalError] * 3 + [True]
+            [OperationalError] * 3 + [None]
         call_command("wait_for_db")
 
         self.assertEqual(patched_check.call_count, 6)
-        patched_check.assert_called_with(databases=['default'])
+        patched_check.assert_called_with()
+
+
+class BulkCreateUsersCommandTests(TestCase):
+    """Test the bulk_create_users command"""
+
+    def test_bulk_create_users(self):
+        """Test creating users from a CSV file"""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as csv_file:
+            csv_file.write(
+                'email,password,name\n'
+                'user1@example.com,pass123,User One\n'
+                'bad-email,pass123,Bad\n'
+            )
+            csv_file.flush()
+
+            call_command(
+                'bulk_create_users', csv_file.name, processes=1,
+                stdout=tempfile.TemporaryFile('w'),
+                stderr=tempfile.TemporaryFile('w'),
+            )
+
+        users = get_user_model().objects.all()
+        self.assertEqual([user.name for user in users], ['User One'])
+
+
+class BenchmarkApiCommandTests(TransactionTestCase):
+    """Test the benchmark_api command"""
+
+    def test_benchmark_api(self):
+        """Test the benchmark reports every scenario and cleans up"""
+        out = io.StringIO()
+        # concurrent writes lock the tables of an in-memory SQLite database
+        concurrency = 1 if connection.vendor == 'sqlite' else 2
+
+        call_command(
+            'benchmark_api', users=2, recipes=3, tags=2, ingredients=2,
+            requests=4, concurrency=concurrency, stdout=out,
+        )
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(len(report['scenarios']), 6)
+        for result in report['scenarios'].values():
+            self.assertEqual(result['requests'], 4)
+            self.assertEqual(result['errors'], 0)
+            self.assertGreater(result['queries_per_request'], 0)
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_benchmark_api_no_request(self):
+        """Test scenarios without a successful request report nulls"""
+        out = io.StringIO()
+
+        call_command(
+            'benchmark_api', users=1, recipes=1, tags=1, ingredients=1,
+            requests=0, concurrency=1, scenarios='list', stdout=out,
+        )
+
+        result = json.loads(out.getvalue())['scenarios']['list']
+        self.assertEqual(result['requests'], 0)
+        self.assertIsNone(result['p50_ms'])
+        self.assertIsNone(result['queries_per_request'])
+
+
+class SeedRecipesCommandTests(TestCase):
+    """Test the seed_recipes command"""
+
+    def seed(self, **options):
+        call_command(
+            'seed_recipes', users=2, recipes=5, tags=4, ingredients=6,
+            tags_per_recipe=2, ingredients_per_recipe=3, batch_size=3,
+            stdout=io.StringIO(), **options,
+        )
+
+    def test_seed_recipes(self):
+        """Test the dataset has the requested shape"""
+        self.seed()
+
+        users = get_user_model().objects.all()
+        self.assertEqual(users.count(), 2)
+        for user in users:
+            recipes = Recipe.objects.filter(user=user)
+            self.assertEqual(recipes.count(), 5)
+            self.assertEqual(Tag.objects.filter(user=user).count(), 4)
+            for recipe in recipes:
+                self.assertEqual(
+                    set(recipe.tags.values_list('user', flat=True)),
+                    {user.id},
+                )
+                self.assertEqual(recipe.tags.count(), 2)
+                self.assertEqual(recipe.ingredients.count(), 3)
+        for tag in Tag.objects.all():
+            self.assertEqual(tag.recipe_count, tag.recipe_set.count())
+        self.assertEqual(list(recipe_summaries.check()), [])
+        recipe = Recipe.objects.create(
+            user=users[0], title='After', time_minutes=1, price='1.00',
+        )
+        self.assertGreater(recipe.id, Recipe.objects.exclude(
+            id=recipe.id,
+        ).latest('id').id)
+
+    def test_seed_recipes_deterministic(self):
+        """Test the same seed generates the same recipes"""
+        self.seed(seed=7)
+        first = list(Recipe.objects.order_by('id').values_list(
+            'title', 'time_minutes', 'price',
+        ))
+        self.seed(seed=7)
+        second = list(Recipe.objects.order_by('id').values_list(
+            'title', 'time_minutes', 'price',
+        ))[len(first):]
+
+        self.assertEqual(first, second)
+
+    def test_seed_recipes_images(self):
+        """Test seeding recipes with images"""
+        with tempfile.TemporaryDirectory() as media_root, \
+                self.settings(MEDIA_ROOT=media_root):
+            self.seed(images=1)
+
+            self.assertFalse(Recipe.objects.filter(image='').exists())
+
+
+class ReconcileRecipeCountsCommandTests(TestCase):
+    """Test the reconcile_recipe_counts command"""
+
+    def test_reconcile_recipe_counts(self):
+        """Test drifted recipe counts are fixed"""
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'test123',
+        )
+        recipe = Recipe.objects.create(
+            user=user, title='Soup', time_minutes=5, price='5.00',
+        )
+        tags = [Tag.objects.create(user=user, name=f'Tag {i}')
+                for i in range(3)]
+        recipe.tags.add(tags[0], tags[1])
+        Tag.objects.filter(id=tags[0].id).update(recipe_count=5)
+        Tag.objects.filter(id=tags[2].id).update(recipe_count=2)
+        out = io.StringIO()
+
+        call_command('reconcile_recipe_counts', batch_size=2, stdout=out)
+
+        self.assertIn('tags: 2 fixed', out.getvalue())
+        self.assertEqual(
+            list(Tag.objects.order_by('id').values_list(
+                'recipe_count', flat=True,
+            )),
+            [1, 1, 0],
+        )
+
+
+class PruneOrphansCommandTests(TestCase):
+    """Test the prune_orphans command"""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'test123',
+        )
+        recipe = self.recipe = Recipe.objects.create(
+            user=user, title='Soup', time_minutes=5, price='5.00',
+        )
+        self.old_orphan = Tag.objects.create(user=user, name='Old')
+        self.new_orphan = Tag.objects.create(user=user, name='New')
+        self.used = Tag.objects.create(user=user, name='Used')
+        recipe.tags.add(self.used)
+        Tag.objects.exclude(id=self.new_orphan.id).update(
+            created_at=timezone.now() - timedelta(days=2),
+        )
+
+    def test_prune_orphans(self):
+        """Test old unused tags are deleted in batches"""
+        out = io.StringIO()
+
+        call_command('prune_orphans', batch_size=1, stdout=out)
+
+        self.assertIn('tags: 1 deleted', out.getvalue())
+        self.assertEqual(
+            set(Tag.objects.values_list('name', flat=True)), {'New', 'Used'},
+        )
+
+    def test_prune_orphans_linked_meanwhile(self):
+        """Test an orphan linked after it was selected is not deleted"""
+        values_list = QuerySet.values_list
+
+        def link_after_select(queryset, *args, **kwargs):
+            yield from values_list(queryset, *args, **kwargs)
+            patcher.stop()
+            self.recipe.tags.add(self.old_orphan)
+
+        out = io.StringIO()
+        patcher = patch.object(QuerySet, 'values_list', link_after_select)
+        patcher.start()
+        self.addCleanup(patch.stopall)
+        call_command('prune_orphans', stdout=out)
+
+        self.assertIn('tags: 0 deleted', out.getvalue())
+        self.assertTrue(Tag.objects.filter(id=self.old_orphan.id).exists())
+
+    def test_prune_orphans_dry_run(self):
+        """Test a dry run only counts the orphans"""
+        out = io.StringIO()
+
+        call_command('prune_orphans', grace_hours=0, dry_run=True, stdout=out)
+
+        self.assertIn('tags: 2 orphans', out.getvalue())
+        self.assertEqual(Tag.objects.count(), 3)
@@ -0,0 +1,171 @@
+"""
+Tests for the response compression
+"""
+
+import gzip
+from unittest.mock import patch
+
+from django.http import HttpResponse, JsonResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, \
+    override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import compression
+from core.middleware import CompressionMiddleware
+from core.views import CachedSpectacularAPIView
+
+PAYLOAD = {'results': [{'title': f'Recipe {i}'} for i in range(200)]}
+
+
+class NegotiateTests(SimpleTestCase):
+    """Test the content encoding negotiation"""
+
+    def test_server_preference(self):
+        """Test the first accepted encoding of the server list is used"""
+        with patch.dict(compression.COMPRESSORS, {'br': None}):
+            encoding = compression.negotiate('gzip, br', ['br', 'gzip'])
+
+        self.assertEqual(encoding, 'br')
+
+    def test_quality(self):
+        """Test quality values are honoured"""
+        with patch.dict(compression.COMPRESSORS, {'br': None}):
+            self.assertEqual(
+                compression.negotiate('br;q=0.5, gzip', ['br', 'gzip']),
+                'gzip',
+            )
+            self.assertIsNone(
+                compression.negotiate('gzip;q=0', ['br', 'gzip'])
+            )
+
+    def test_wildcard(self):
+        """Test a wildcard accepts the encodings not listed"""
+        self.assertEqual(compression.negotiate('*', ['gzip']), 'gzip')
+        self.assertIsNone(compression.negotiate('*, gzip;q=0', ['gzip']))
+
+    def test_not_installed(self):
+        """Test the encodings without their library are skipped"""
+        with patch.dict(compression.COMPRESSORS, clear=True):
+            compression.COMPRESSORS['gzip'] = None
+            self.assertEqual(compression.negotiate('zstd, gzip', [
+                'zstd', 'gzip',
+            ]), 'gzip')
+
+
+@override_settings(
+    COMPRESSION_ENCODINGS=['gzip'], COMPRESSION_MIN_BYTES=1024,
+)
+class CompressionMiddlewareTests(SimpleTestCase):
+    """Test the compression middleware"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def _get(self, view, path='/api/recipe/recipes/', **headers):
+        request = self.factory.get(path, **headers)
+        return CompressionMiddleware(view)(request)
+
+    def test_compressed(self):
+        """Test a large API response is compressed"""
+        res = self._get(
+            lambda request: JsonResponse(PAYLOAD),
+            HTTP_ACCEPT_ENCODING='gzip',
+        )
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(res['Content-Length'], str(len(res.content)))
+        self.assertIn('Accept-Encoding', res['Vary'])
+        self.assertEqual(
+            gzip.decompress(res.content), JsonResponse(PAYLOAD).content,
+        )
+
+    def test_not_accepted(self):
+        """Test responses are not compressed for other clients"""
+        res = self._get(lambda request: JsonResponse(PAYLOAD))
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', res['Vary'])
+
+    def test_small_response(self):
+        """Test responses under the threshold are not compressed"""
+        res = self._get(
+            lambda request: JsonResponse({'id': 1}),
+            HTTP_ACCEPT_ENCODING='gzip',
+        )
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+    def test_other_paths(self):
+        """Test only API responses of compressible types are compressed"""
+        res = self._get(
+            lambda request: JsonResponse(PAYLOAD), '/admin/',
+            HTTP_ACCEPT_ENCODING='gzip',
+        )
+        image = self._get(
+            lambda request: HttpResponse(
+                b'\0' * 4096, content_type='image/png',
+            ),
+            HTTP_ACCEPT_ENCODING='gzip',
+        )
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertFalse(image.has_header('Content-Encoding'))
+
+    def test_weak_etag(self):
+        """Test the ETag of a compressed response is made weak"""
+        def view(request):
+            response = JsonResponse(PAYLOAD)
+            response['ETag'] = '"abc"'
+            return response
+
+        res = self._get(view, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['ETag'], 'W/"abc"')
+
+    def test_compressed_variants(self):
+        """Test the variants set by the view are used and filled"""
+        variants = {}
+
+        def view(request):
+            response = JsonResponse(PAYLOAD)
+            response.compressed_variants = variants
+            return response
+
+        with patch.object(
+            compression, 'compress', wraps=compression.compress,
+        ) as mock_compress:
+            res1 = self._get(view, HTTP_ACCEPT_ENCODING='gzip')
+            res2 = self._get(view, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(mock_compress.call_count, 1)
+        self.assertEqual(variants['gzip'], res1.content)
+        self.assertEqual(res2.content, res1.content)
+
+
+@override_settings(
+    SCHEMA_FILE='', COMPRESSION_ENCODINGS=['gzip'], COMPRESSION_MIN_BYTES=1,
+)
+class CompressedSchemaTests(TestCase):
+    """Test the compressed schema is cached"""
+
+    def setUp(self):
+        self.client = APIClient()
+        CachedSpectacularAPIView.clear_cache()
+        self.addCleanup(CachedSpectacularAPIView.clear_cache)
+
+    def test_schema_compressed_once(self):
+        """Test the schema is compressed on the first request only"""
+        url = reverse('api-schema')
+        with patch.object(
+            compression, 'compress', wraps=compression.compress,
+        ) as mock_compress:
+            res1 = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+            res2 = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        plain = self.client.get(url)
+
+        self.assertEqual(mock_compress.call_count, 1)
+        self.assertEqual(res1['Content-Encoding'], 'gzip')
+        self.assertEqual(res2.content, res1.content)
+        self.assertEqual(gzip.decompress(res2.content), plain.content)
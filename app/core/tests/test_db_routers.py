@@ -0,0 +1,271 @@
+"""
+Tests for the read replica database router
+"""
+
+from decimal import Decimal
+from types import SimpleNamespace
+import unittest
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (
+    SimpleTestCase,
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.checks import check_replica_cache
+from core.db_routers import ReplicaRouter, ReplicaRoutingMiddleware
+from core.models import Recipe
+
+REPLICAS = ['replica1']
+TOKEN_URL = reverse('user:token')
+RECIPES_URL = reverse('recipe:recipe-list')
+LOCMEM = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}}
+
+
+def make_view(reads, write=False, user=None):
+    """Create a view recording the database used to read"""
+    router = ReplicaRouter()
+
+    def view(request):
+        if user is not None:
+            # set by DRF once it authenticated the request
+            request.user = user
+        reads.append(router.db_for_read(Recipe))
+        if write:
+            router.db_for_write(Recipe)
+            reads.append(router.db_for_read(Recipe))
+        return HttpResponse()
+
+    return view
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, REPLICA_PIN_SECONDS=5)
+class ReplicaRouterTests(SimpleTestCase):
+    """Test routing reads to the replicas"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.reads = []
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_outside_request_uses_primary(self):
+        """Test reads outside a request use the primary"""
+        router = ReplicaRouter()
+
+        self.assertEqual(router.db_for_read(Recipe), 'default')
+        self.assertEqual(router.db_for_write(Recipe), 'default')
+
+    def test_safe_request_uses_replica(self):
+        """Test reads of a GET request use a replica"""
+        middleware = ReplicaRoutingMiddleware(make_view(self.reads))
+
+        middleware(self.factory.get('/', HTTP_AUTHORIZATION='Token a'))
+
+        self.assertEqual(self.reads, ['replica1'])
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_uses_primary(self):
+        """Test reads use the primary without replicas configured"""
+        middleware = ReplicaRoutingMiddleware(make_view(self.reads))
+
+        middleware(self.factory.get('/'))
+
+        self.assertEqual(self.reads, ['default'])
+
+    def test_unsafe_request_uses_primary(self):
+        """Test reads of a POST request use the primary"""
+        middleware = ReplicaRoutingMiddleware(make_view(self.reads))
+
+        middleware(self.factory.post('/'))
+
+        self.assertEqual(self.reads, ['default'])
+
+    def test_reads_after_write_use_primary(self):
+        """Test reads after a write in the same request use the primary"""
+        middleware = ReplicaRoutingMiddleware(make_view(self.reads, True))
+
+        middleware(self.factory.get('/'))
+
+        self.assertEqual(self.reads, ['replica1', 'default'])
+
+    def test_client_pinned_after_write(self):
+        """Test a client reads from the primary after it wrote"""
+        writer = ReplicaRoutingMiddleware(make_view([], write=True))
+        reader = ReplicaRoutingMiddleware(make_view(self.reads))
+
+        writer(self.factory.post('/', HTTP_AUTHORIZATION='Token a'))
+        reader(self.factory.get('/', HTTP_AUTHORIZATION='Token a'))
+        reader(self.factory.get('/', HTTP_AUTHORIZATION='Token b'))
+
+        self.assertEqual(self.reads, ['default', 'replica1'])
+
+    def test_user_pinned_after_write(self):
+        """Test the other tokens of a user are pinned after a write"""
+        user = SimpleNamespace(pk=1, is_authenticated=True)
+        other = SimpleNamespace(pk=2, is_authenticated=True)
+        writer = ReplicaRoutingMiddleware(make_view([], True, user))
+
+        writer(self.factory.post('/', HTTP_AUTHORIZATION='Token a'))
+        for token, token_user in (('b', user), ('c', other)):
+            ReplicaRoutingMiddleware(make_view(self.reads, user=token_user))(
+                self.factory.get('/', HTTP_AUTHORIZATION=f'Token {token}'),
+            )
+
+        self.assertEqual(self.reads, ['default', 'replica1'])
+
+    def test_migrations_only_on_primary(self):
+        """Test migrations only run on the primary"""
+        router = ReplicaRouter()
+
+        self.assertTrue(router.allow_migrate('default', 'core'))
+        self.assertFalse(router.allow_migrate('replica1', 'core'))
+
+
+class ReplicaCacheCheckTests(SimpleTestCase):
+    """Test the check of the cache used with replicas"""
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS, CACHES=LOCMEM)
+    def test_process_cache_with_replicas(self):
+        """Test a per process cache is an error with replicas"""
+        errors = check_replica_cache(None)
+
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS, CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': '/tmp/cache',
+    }})
+    def test_shared_cache_with_replicas(self):
+        """Test a shared cache passes the check"""
+        self.assertEqual(check_replica_cache(None), [])
+
+    @override_settings(DATABASE_REPLICAS=[], CACHES=LOCMEM)
+    def test_process_cache_without_replicas(self):
+        """Test a per process cache is fine without replicas"""
+        self.assertEqual(check_replica_cache(None), [])
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, REPLICA_PIN_SECONDS=5)
+class LoginPinTests(TestCase):
+    """Test the token issued at login is pinned to the primary"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.reads = []
+        cache.clear()
+        self.addCleanup(cache.clear)
+        get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123',
+        )
+
+    def _read_with(self, token, keyword):
+        middleware = ReplicaRoutingMiddleware(make_view(self.reads))
+        middleware(self.factory.get(
+            '/', HTTP_AUTHORIZATION=f'{keyword} {token}',
+        ))
+
+    def test_token_pinned(self):
+        """Test the first reads with a new token use the primary"""
+        res = APIClient().post(TOKEN_URL, {
+            'email': 'user@example.com', 'password': 'testpass123',
+        })
+
+        self._read_with(res.data['token'], 'Token')
+        self.assertEqual(self.reads, ['default'])
+
+    @override_settings(AUTH_TOKEN_MODE='signed')
+    def test_signed_token_pinned(self):
+        """Test the first reads with a new signed token use the primary"""
+        res = APIClient().post(TOKEN_URL, {
+            'email': 'user@example.com', 'password': 'testpass123',
+        })
+
+        self._read_with(res.data['token'], 'Bearer')
+        self.assertEqual(self.reads, ['default'])
+
+
+@unittest.skipUnless(
+    settings.DATABASE_REPLICAS,
+    'needs a replica alias, set DB_REPLICA_HOSTS and a shared cache',
+)
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Test the queries of requests run on the replica alias. The replica is a
+    test mirror of the primary, a second connection to the same database.
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123',
+        )
+        self.client = APIClient()
+        res = self.client.post(TOKEN_URL, {
+            'email': 'user@example.com', 'password': 'testpass123',
+        })
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {res.data["token"]}',
+        )
+        cache.clear()
+
+    def _queries(self, method, *args, **kwargs):
+        """Return the aliases which ran queries for the request"""
+        captured = {
+            alias: CaptureQueriesContext(connections[alias])
+            for alias in ['default', *settings.DATABASE_REPLICAS]
+        }
+        for context in captured.values():
+            context.__enter__()
+        try:
+            method(*args, **kwargs)
+        finally:
+            for context in captured.values():
+                context.__exit__(None, None, None)
+        return {alias for alias, context in captured.items() if len(context)}
+
+    def test_read_on_replica(self):
+        """Test a GET request reads from a replica"""
+        aliases = self._queries(self.client.get, RECIPES_URL)
+
+        self.assertEqual(aliases, set(settings.DATABASE_REPLICAS))
+
+    def test_write_then_read_on_primary(self):
+        """Test the reads following a write use the primary"""
+        self._queries(self.client.post, RECIPES_URL, {
+            'title': 'Soup', 'time_minutes': 5, 'price': Decimal('1.50'),
+        }, format='json')
+        aliases = self._queries(self.client.get, RECIPES_URL)
+
+        self.assertEqual(aliases, {'default'})
+
+    def test_login_then_read_on_primary(self):
+        """Test the reads with a new token use the primary"""
+        client = APIClient()
+        res = client.post(TOKEN_URL, {
+            'email': 'user@example.com', 'password': 'testpass123',
+        })
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Token {res.data["token"]}',
+        )
+
+        aliases = self._queries(client.get, RECIPES_URL)
+
+        self.assertEqual(aliases, {'default'})
@@ -0,0 +1,112 @@
+"""
+Tests for the password hashers
+"""
+
+import threading
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.hashers import PasswordHashingBusy, hashing_slot
+
+TOKEN_URL = reverse('user:token')
+
+
+class HashersTests(TestCase):
+    """Test the configurable password hashers"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+
+    def _login(self):
+        return self.client.post(TOKEN_URL, {
+            'email': 'test@example.com',
+            'password': 'testpass123',
+        })
+
+    @override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+    def test_iterations_configurable(self):
+        """Test the PBKDF2 iterations come from the settings"""
+        encoded = make_password('testpass123')
+
+        self.assertTrue(encoded.startswith('pbkdf2_sha256$1000$'))
+
+    def test_rehash_on_login(self):
+        """Test passwords of another hasher are rehashed on login"""
+        self.user.password = make_password('testpass123', hasher='scrypt')
+        self.user.save()
+
+        res = self._login()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$'))
+
+    def test_rehash_on_login_after_cost_change(self):
+        """Test passwords are rehashed when the cost changes"""
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            res = self._login()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+
+    @override_settings(PASSWORD_HASH_CONCURRENCY=1, PASSWORD_HASH_WAIT=0.01)
+    def test_login_busy(self):
+        """Test logins get a 503 when all hashing slots are taken"""
+        taken = threading.Event()
+        release = threading.Event()
+
+        def hold_slot():
+            with hashing_slot():
+                taken.set()
+                release.wait()
+
+        thread = threading.Thread(target=hold_slot)
+        thread.start()
+        taken.wait()
+        try:
+            res = self._login()
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(self._login().status_code, status.HTTP_200_OK)
+
+    @override_settings(PASSWORD_HASH_CONCURRENCY=1, PASSWORD_HASH_WAIT=0.01)
+    def test_nested_slots_reentrant(self):
+        """Test nested hashing slots in one thread do not block"""
+        with hashing_slot():
+            with hashing_slot():
+                pass
+
+        with hashing_slot():
+            pass
+
+    @override_settings(PASSWORD_HASH_CONCURRENCY=0, PASSWORD_HASH_WAIT=0)
+    def test_no_slot_raises(self):
+        """Test taking a slot without a free one raises"""
+        with self.assertRaises(PasswordHashingBusy):
+            with hashing_slot():
+                pass
+
+    @override_settings(PASSWORD_HASH_CONCURRENCY=0, PASSWORD_HASH_WAIT=0)
+    def test_hashing_outside_api_not_limited(self):
+        """Test hashing outside the API views never waits for a slot"""
+        encoded = make_password('testpass123')
+
+        self.assertTrue(self.user.check_password('testpass123'))
+        self.assertTrue(encoded.startswith('pbkdf2_sha256$'))
+        self.assertEqual(
+            self._login().status_code, status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
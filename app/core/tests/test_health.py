@@ -0,0 +1,163 @@
+"""
+Tests for the health endpoints
+"""
+
+import tempfile
+import threading
+import time
+from unittest.mock import MagicMock, Mock, patch
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from core import health, warmup
+
+LIVE_URL = reverse('health-live')
+READY_URL = reverse('health-ready')
+
+
+class LivenessTests(SimpleTestCase):
+    """Test the liveness endpoint"""
+
+    def test_live(self):
+        """Test the endpoint answers without checking anything"""
+        with patch.object(health.HEALTH_CHECKS, 'results') as mock_results:
+            res = self.client.get(LIVE_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {'status': 'alive'})
+        mock_results.assert_not_called()
+
+
+@override_settings(HEALTH_CHECK_TIMEOUT=1, HEALTH_CHECK_CACHE_SECONDS=60)
+class ReadinessTests(SimpleTestCase):
+    """Test the readiness endpoint"""
+    databases = ['default']
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.settings = override_settings(MEDIA_ROOT=media.name)
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+
+        patcher = patch.multiple(
+            warmup, _started=False, _done=threading.Event(),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        health.HEALTH_CHECKS.clear()
+        self.addCleanup(health.HEALTH_CHECKS.clear)
+
+    def test_ready(self):
+        """Test the worker is ready when every check passes"""
+        res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {'status': 'ready', 'checks': {
+            'database': 'ok', 'media': 'ok', 'cache': 'ok',
+        }})
+
+    def test_failing_check(self):
+        """Test the worker is not ready when a check fails"""
+        with override_settings(MEDIA_ROOT='/nonexistent/media'), \
+                self.assertLogs('core.health', level='WARNING'):
+            res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['status'], 'not ready')
+        self.assertEqual(
+            res.json()['checks']['media'], 'error: FileNotFoundError',
+        )
+
+    @override_settings(HEALTH_CHECK_TIMEOUT=0.05)
+    def test_check_timeout(self):
+        """Test a check running too long is reported as timed out"""
+        release = threading.Event()
+        self.addCleanup(release.set)
+        with patch.dict(health.HEALTH_CHECKS.checks, {
+            'cache': lambda: release.wait(5),
+        }):
+            start = time.monotonic()
+            res = self.client.get(READY_URL)
+
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['checks']['cache'], 'timeout')
+
+    @override_settings(HEALTH_CHECK_TIMEOUT=0.05)
+    def test_check_not_run_twice(self):
+        """Test a check still running is not started again"""
+        release = threading.Event()
+        self.addCleanup(release.set)
+        check = Mock(side_effect=lambda: release.wait(5))
+        with patch.dict(health.HEALTH_CHECKS.checks, {'cache': check}):
+            self.client.get(READY_URL)
+            health.HEALTH_CHECKS.clear()
+            res = self.client.get(READY_URL)
+
+        check.assert_called_once_with()
+        self.assertEqual(res.json()['checks']['cache'], 'timeout')
+
+    def test_results_cached(self):
+        """Test the checks run once for the probes of the cache period"""
+        check = Mock()
+        with patch.dict(health.HEALTH_CHECKS.checks, {'cache': check}):
+            self.client.get(READY_URL)
+            self.client.get(READY_URL)
+
+        check.assert_called_once_with()
+
+    def test_database_connection_closed(self):
+        """Test the database probe does not keep its connection"""
+        connection = MagicMock(vendor='sqlite')
+        with patch.object(
+            health.connections, 'create_connection', return_value=connection,
+        ):
+            health.check_database()
+
+        connection.cursor.return_value.__enter__.return_value \
+            .execute.assert_called_once_with('SELECT 1')
+        connection.close.assert_called_once_with()
+
+    def test_database_options_kept(self):
+        """Test the database probe adds its timeout to the options"""
+        connection = MagicMock(vendor='postgresql', settings_dict={
+            'OPTIONS': {'options': '-c search_path=app'},
+        })
+        with patch.object(
+            health.connections, 'create_connection', return_value=connection,
+        ):
+            health.check_database()
+
+        self.assertEqual(
+            connection.settings_dict['OPTIONS']['options'],
+            '-c search_path=app -c statement_timeout=1000',
+        )
+
+    @override_settings(WARM_UP='background')
+    def test_not_ready_while_warming_up(self):
+        """Test the worker is ready once the background warm-up is over"""
+        release = threading.Event()
+        with patch.object(
+            warmup, 'warm_up', side_effect=lambda: (
+                release.wait(5), {},
+            )[1],
+        ):
+            warmup.start()
+            res = self.client.get(READY_URL)
+            release.set()
+            self.assertTrue(warmup._done.wait(5))
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json(), {'status': 'warming up'})
+        self.assertEqual(self.client.get(READY_URL).status_code, 200)
+
+    @override_settings(WARM_UP='off')
+    def test_ready_without_warm_up(self):
+        """Test the warm-up is skipped when it is off"""
+        with patch.object(warmup, 'warm_up') as mock_warm_up:
+            warmup.start()
+
+        mock_warm_up.assert_not_called()
+        self.assertEqual(self.client.get(READY_URL).status_code, 200)
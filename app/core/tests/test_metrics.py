@@ -0,0 +1,112 @@
+"""
+Tests for the metrics registry and endpoint
+"""
+
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.metrics import Counter, Gauge, Histogram, Registry
+
+METRICS_URL = reverse('metrics')
+
+
+class RegistryTests(SimpleTestCase):
+    """Test the metrics registry"""
+
+    def setUp(self):
+        self.registry = Registry()
+        self.counter = Counter(
+            'jobs_total', 'Jobs', ['kind'], registry=self.registry,
+        )
+        self.gauge = Gauge('workers', 'Workers', registry=self.registry)
+        self.histogram = Histogram(
+            'latency_seconds', 'Latency', buckets=(0.1, 1),
+            registry=self.registry,
+        )
+
+    @override_settings(METRICS_DIR='')
+    def test_exposition(self):
+        """Test the metrics are exposed in the Prometheus text format"""
+        self.counter.inc(kind='a')
+        self.counter.inc(2, kind='a')
+        self.gauge.set(3)
+        self.histogram.observe(0.05)
+        self.histogram.observe(0.5)
+
+        text = self.registry.collect()
+
+        self.assertIn('# TYPE jobs_total counter', text)
+        self.assertIn('jobs_total{kind="a"} 3', text)
+        self.assertIn('workers 3', text)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{le="1"} 2', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn('latency_seconds_sum 0.55', text)
+        self.assertIn('latency_seconds_count 2', text)
+
+    def test_multiprocess_aggregation(self):
+        """Test the metrics of several processes are added up"""
+        self.counter.inc(kind='a')
+        self.gauge.set(1)
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            # a process that has exited, and an earlier one with our pid
+            for name in (
+                'metrics_99999999_1.json', f'metrics_{os.getpid()}_1.json',
+            ):
+                with open(os.path.join(metrics_dir, name), 'w') as file:
+                    json.dump(self.registry.snapshot(), file)
+
+            with override_settings(METRICS_DIR=metrics_dir):
+                text = self.registry.collect()
+                self.assertEqual(sorted(os.listdir(metrics_dir)), [
+                    'metrics.lock', self.registry.files.process_file(),
+                    'metrics_total.json',
+                ])
+                self.counter.inc(kind='a')
+                second = self.registry.collect()
+
+        self.assertIn('jobs_total{kind="a"} 3', text)
+        self.assertIn('workers 1', text)
+        self.assertIn('jobs_total{kind="a"} 4', second)
+
+
+class MetricsEndpointTests(TestCase):
+    """Test the metrics endpoint"""
+
+    def test_request_metrics(self):
+        """Test requests are counted by route name"""
+        user = get_user_model().objects.create_user(
+            'user@example.com',
+            'test123',
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        client.get(reverse('recipe:recipe-list'))
+
+        res = client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        content = res.content.decode()
+        self.assertIn(
+            'http_request_duration_seconds_count'
+            '{route="recipe:recipe-list",method="GET"}',
+            content,
+        )
+        self.assertIn('db_queries_total{route="recipe:recipe-list"}', content)
+        self.assertIn('db_connections_open{alias="default"} 1', content)
+
+    @override_settings(METRICS_ALLOWED_NETWORKS=['10.0.0.0/8'])
+    def test_metrics_restricted(self):
+        """Test the metrics are only served to the allowed networks"""
+        res = self.client.get(METRICS_URL, REMOTE_ADDR='192.0.2.1')
+        self.assertEqual(res.status_code, 403)
+
+        res = self.client.get(METRICS_URL, REMOTE_ADDR='10.1.2.3')
+        self.assertEqual(res.status_code, 200)
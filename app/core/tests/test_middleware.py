@@ -0,0 +1,220 @@
+"""
+Tests for the middlewares
+"""
+
+import asyncio
+import collections
+import itertools
+import json
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, \
+    override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.middleware import ProfilingMiddleware
+from core.models import Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class InstrumentationMiddlewareTests(TestCase):
+    """Test the instrumentation middleware"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'test123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=10,
+            price='5.00',
+        )
+
+    def test_server_timing_header(self):
+        """Test the timings are returned in a Server-Timing header"""
+        res = self.client.get(RECIPES_URL)
+
+        timing = res['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('desc="1 queries"', timing)
+        self.assertIn('serialize;dur=', timing)
+        self.assertIn('render;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    def test_log_line(self):
+        """Test a structured log line is written per request"""
+        with self.assertLogs('core.middleware', level='INFO') as logs:
+            self.client.get(RECIPES_URL)
+
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+        self.assertEqual(line['view'], 'recipe:recipe-list')
+        self.assertEqual(line['action'], 'list')
+        self.assertEqual(line['queries'], 1)
+        self.assertFalse(line['query_threshold_exceeded'])
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_serialize_time(self):
+        """Test the serialization of the list and detail views is timed"""
+        recipe = Recipe.objects.get()
+        urls = [
+            RECIPES_URL,
+            reverse('recipe:recipe-detail', args=[recipe.id]),
+            reverse('recipe:tag-list'),
+            reverse('user:me'),
+        ]
+        with self.assertLogs('core.middleware', level='INFO') as logs, \
+                patch(
+                    'core.instrumentation.time.perf_counter',
+                    side_effect=itertools.count(),
+                ):
+            for url in urls:
+                self.client.get(url)
+
+        for record in logs.records:
+            self.assertGreater(
+                json.loads(record.getMessage())['serialize_ms'], 0,
+            )
+
+    @override_settings(INSTRUMENTATION_QUERY_THRESHOLD=0)
+    def test_query_threshold(self):
+        """Test requests over the query threshold are flagged"""
+        with self.assertLogs('core.middleware', level='INFO') as logs:
+            self.client.get(RECIPES_URL)
+
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(logs.records[0].levelname, 'WARNING')
+        self.assertTrue(line['query_threshold_exceeded'])
+
+
+def ok_view(request):
+    return HttpResponse('ok')
+
+
+async def async_ok_view(request):
+    return HttpResponse('ok')
+
+
+class FakeSampler:
+    """Sampler returning the same stack for every request"""
+
+    def __init__(self):
+        self.started = 0
+
+    def start(self, thread_id):
+        self.started += 1
+
+    def stop(self, thread_id):
+        return collections.Counter({
+            (('main', 'app.py', 1), ('ok_view', 'views.py', 10)): 3,
+        })
+
+
+class ProfilingMiddlewareTests(SimpleTestCase):
+    """Test the profiling middleware"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.settings = override_settings(
+            PROFILER_DIR=self.directory.name,
+            PROFILER_SAMPLE_RATE=1,
+            PROFILER_SLOW_MS=0,
+            PROFILER_INTERVAL_MS=1,
+            PROFILER_MAX_PER_MINUTE=10,
+            PROFILER_FORMAT='collapsed',
+        )
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+        self.request = RequestFactory().get('/api/recipe/recipes/')
+
+    def _middleware(self):
+        middleware = ProfilingMiddleware(ok_view)
+        middleware.sampler = FakeSampler()
+        return middleware
+
+    def test_disabled_without_directory(self):
+        """Test the middleware is not used without a directory"""
+        with override_settings(PROFILER_DIR=''):
+            with self.assertRaises(MiddlewareNotUsed):
+                ProfilingMiddleware(ok_view)
+
+    def test_sampled_request_profile(self):
+        """Test a sampled request writes collapsed stacks"""
+        response = self._middleware()(self.request)
+
+        self.assertEqual(response.content, b'ok')
+        [name] = os.listdir(self.directory.name)
+        self.assertTrue(name.endswith('.txt'))
+        with open(os.path.join(self.directory.name, name)) as profile:
+            self.assertIn('ok_view (views.py:10) 3', profile.read())
+
+    @override_settings(PROFILER_FORMAT='speedscope')
+    def test_speedscope_profile(self):
+        """Test writing speedscope profiles"""
+        self._middleware()(self.request)
+
+        [name] = os.listdir(self.directory.name)
+        with open(os.path.join(self.directory.name, name)) as profile:
+            data = json.load(profile)
+        frames = [frame['name'] for frame in data['shared']['frames']]
+        self.assertIn('ok_view', frames)
+        self.assertEqual(data['profiles'][0]['type'], 'sampled')
+
+    @override_settings(PROFILER_SAMPLE_RATE=0, PROFILER_SLOW_MS=10)
+    def test_not_sampled(self):
+        """Test requests not sampled never start the sampler"""
+        middleware = self._middleware()
+
+        middleware(self.request)
+
+        self.assertEqual(middleware.sampler.started, 0)
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    @override_settings(PROFILER_SLOW_MS=10)
+    def test_slow_request_profile(self):
+        """Test only profiles above the latency threshold are kept"""
+        middleware = self._middleware()
+
+        with patch('core.middleware.time.perf_counter',
+                   side_effect=[0, 0.005, 0, 0.02]):
+            middleware(self.request)
+            self.assertEqual(os.listdir(self.directory.name), [])
+            middleware(self.request)
+
+        self.assertEqual(len(os.listdir(self.directory.name)), 1)
+
+    @override_settings(PROFILER_MAX_PER_MINUTE=2, PROFILER_SLOW_MS=10)
+    def test_rate_limit(self):
+        """Test the profiles started, kept or not, are rate limited"""
+        middleware = self._middleware()
+
+        with patch('core.middleware.time.perf_counter', return_value=0):
+            for _ in range(4):
+                middleware(self.request)
+
+        self.assertEqual(middleware.sampler.started, 2)
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_async_request_not_profiled(self):
+        """Test the middleware runs async without profiling"""
+        middleware = ProfilingMiddleware(async_ok_view)
+        middleware.sampler = FakeSampler()
+
+        response = asyncio.run(middleware(self.request))
+
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        self.assertEqual(response.content, b'ok')
+        self.assertEqual(middleware.sampler.started, 0)
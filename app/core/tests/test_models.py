@@ -113,3 +113,96 @@ class ModelTests(TestCase):
 
         expected_path = f'uploads/recipe/{uuid}.jpg'
         self.assertEqual(file_path, expected_path)
+
+    def test_bulk_create_users(self):
+        """Test creating users in bulk reports the failing rows"""
+        create_user(email='taken@example.com')
+        rows = [
+            {'email': 'user1@EXAMPLE.com', 'password': 'pass123', 'name': 'A'},
+            {'email': 'not-an-email', 'password': 'pass123'},
+            {'email': 'user2@example.com', 'password': '12'},
+            {'email': 'taken@example.com', 'password': 'pass123'},
+            {'email': 'user1@example.com', 'password': 'pass123'},
+            {'email': 'user3@example.com', 'password': 'pass123'},
+        ]
+
+        created, failures = get_user_model().objects.bulk_create_users(
+            rows, batch_size=1,
+        )
+
+        self.assertEqual(created, 2)
+        self.assertEqual([f['row'] for f in failures], [1, 2, 3, 4])
+        user = get_user_model().objects.get(email='user1@example.com')
+        self.assertEqual(user.name, 'A')
+        self.assertTrue(user.check_password('pass123'))
+
+    def test_bulk_create_users_processes(self):
+        """Test hashing the passwords of a bulk creation in processes"""
+        rows = [
+            {'email': f'user{i}@example.com', 'password': f'pass12{i}'}
+            for i in range(4)
+        ]
+
+        created, failures = get_user_model().objects.bulk_create_users(
+            rows, processes=2,
+        )
+
+        self.assertEqual((created, failures), (4, []))
+        user = get_user_model().objects.get(email='user3@example.com')
+        self.assertTrue(user.check_password('pass123'))
+
+    def test_recipe_count_maintained(self):
+        """Test the recipe counts follow the links of the recipes"""
+        user = create_user()
+        tag1 = models.Tag.objects.create(user=user, name='Vegan')
+        tag2 = models.Tag.objects.create(user=user, name='Dessert')
+        recipes = [
+            models.Recipe.objects.create(
+                user=user, title=f'Recipe {index}', time_minutes=5,
+                price=Decimal('5.50'),
+            )
+            for index in range(3)
+        ]
+
+        def counts():
+            return [
+                tag.recipe_count
+                for tag in models.Tag.objects.order_by('id')
+            ]
+
+        recipes[0].tags.add(tag1, tag2)
+        recipes[0].tags.add(tag1)
+        recipes[1].tags.add(tag1)
+        tag2.recipe_set.add(recipes[1], recipes[2])
+        self.assertEqual(counts(), [2, 3])
+
+        recipes[0].tags.remove(tag2)
+        recipes[1].tags.clear()
+        self.assertEqual(counts(), [1, 1])
+
+        recipes[0].delete()
+        tag2.recipe_set.clear()
+        self.assertEqual(counts(), [0, 0])
+
+    def test_recipe_count_remove_unlinked(self):
+        """Test removing links which do not exist keeps the counts"""
+        user = create_user()
+        tag1 = models.Tag.objects.create(user=user, name='Vegan')
+        tag2 = models.Tag.objects.create(user=user, name='Dessert')
+        recipe1, recipe2 = [
+            models.Recipe.objects.create(
+                user=user, title=f'Recipe {index}', time_minutes=5,
+                price=Decimal('5.50'),
+            )
+            for index in range(2)
+        ]
+        recipe1.tags.add(tag1)
+        recipe2.tags.add(tag1, tag2)
+
+        recipe1.tags.remove(tag1, tag2)
+        tag2.recipe_set.remove(recipe1)
+
+        self.assertEqual(
+            [tag.recipe_count for tag in models.Tag.objects.order_by('id')],
+            [1, 1],
+        )
@@ -0,0 +1,60 @@
+"""
+Tests for the sampling profiler
+"""
+
+import collections
+import os
+import tempfile
+import threading
+
+from django.test import SimpleTestCase
+
+from core import profiling
+
+
+class ProfilingTests(SimpleTestCase):
+    """Test the profiler helpers"""
+
+    def test_collapsed(self):
+        """Test formatting collapsed stacks"""
+        stacks = collections.Counter({
+            (('main', 'app.py', 1), ('view', 'views.py', 10)): 3,
+        })
+
+        self.assertEqual(
+            profiling.collapsed(stacks),
+            'main (app.py:1);view (views.py:10) 3\n',
+        )
+
+    def test_rate_limiter(self):
+        """Test the limiter allows a fixed number of events per period"""
+        limiter = profiling.RateLimiter(2)
+
+        self.assertEqual(
+            [limiter.allow() for _ in range(3)], [True, True, False],
+        )
+
+    def test_sampler(self):
+        """Test the sampler records the stack of a registered thread"""
+        sampler = profiling.Sampler(interval=60)
+        thread_id = threading.get_ident()
+
+        sampler.start(thread_id)
+        sampler.sample()
+        stacks = sampler.stop(thread_id)
+
+        [(stack, count)] = stacks.items()
+        self.assertEqual(count, 1)
+        self.assertEqual(stack[-1][0], 'sample')
+        self.assertIn('test_sampler', [frame[0] for frame in stack])
+
+    def test_write_profile_retention(self):
+        """Test only the most recent profiles are kept"""
+        with tempfile.TemporaryDirectory() as directory:
+            for index in range(4):
+                path = profiling.write_profile(
+                    directory, f'{index}.txt', 'a 1\n', 2,
+                )
+                os.utime(path, (index, index))
+
+            self.assertEqual(sorted(os.listdir(directory)), ['2.txt', '3.txt'])
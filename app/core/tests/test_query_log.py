@@ -0,0 +1,149 @@
+"""
+Tests for the slow query log
+"""
+
+import io
+import json
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import query_log
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class FingerprintTests(SimpleTestCase):
+    """Test normalizing queries"""
+
+    def test_fingerprint(self):
+        """Test literals, placeholders and value lists are replaced"""
+        self.assertEqual(
+            query_log.fingerprint(
+                "SELECT * FROM core_recipe WHERE id IN (%s, %s, %s) "
+                "AND title = 'Soup'  LIMIT 21"
+            ),
+            'SELECT * FROM core_recipe WHERE id IN (...) AND title = ? '
+            'LIMIT ?',
+        )
+        self.assertEqual(
+            query_log.fingerprint('INSERT INTO t (a) VALUES (%s), (%s)'),
+            'INSERT INTO t (a) VALUES (...)',
+        )
+
+
+@override_settings(SLOW_QUERY_MS=0.000001, SLOW_QUERY_EXPLAIN_RATE=1)
+class QueryLogTests(TestCase):
+    """Test logging the queries of the requests"""
+
+    def setUp(self):
+        query_log.STATS.reset()
+        self.addCleanup(query_log.STATS.reset)
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'test123',
+        )
+        recipe = Recipe.objects.create(
+            user=user, title='Soup', time_minutes=5, price='5.00',
+        )
+        recipe.tags.add(Tag.objects.create(user=user, name='Vegan'))
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def test_slow_queries_logged(self):
+        """Test slow queries are logged with their origin and plan"""
+        with self.assertLogs('core.query_log', 'WARNING') as logs:
+            self.client.get(RECIPES_URL)
+
+        entries = [json.loads(line.split(':', 2)[2]) for line in logs.output]
+        self.assertTrue(all(
+            entry['view'] == 'recipe.views.RecipeViewSet.list'
+            for entry in entries
+        ))
+        self.assertIn(
+            'RecipeSummaryReadSerializer',
+            [entry['serializer'] for entry in entries],
+        )
+        self.assertTrue(any(entry['plan'] for entry in entries))
+
+    def test_query_report(self):
+        """Test the report adds up the statistics of the processes"""
+        with tempfile.TemporaryDirectory() as directory, \
+                self.settings(QUERY_LOG_DIR=directory), \
+                self.assertLogs('core.query_log', 'WARNING'):
+            self.client.get(RECIPES_URL)
+            self.client.get(RECIPES_URL)
+            out = io.StringIO()
+
+            call_command('query_report', plans=True, reset=True, stdout=out)
+
+            self.assertEqual(query_log.STATS.collect(), {})
+
+        report = out.getvalue()
+        self.assertIn('FROM "core_recipesummary"', report)
+        self.assertIn('WHERE "core_recipesummary"."user_id" = ?', report)
+
+    @override_settings(QUERY_LOG_DIR='')
+    def test_query_report_without_directory(self):
+        """Test the report fails without a directory shared by processes"""
+        with self.assertRaisesRegex(CommandError, 'QUERY_LOG_DIR'):
+            call_command('query_report', stdout=io.StringIO())
+
+
+@override_settings(METRICS_FLUSH_SECONDS=0)
+class QueryStatsFilesTests(SimpleTestCase):
+    """Test the statistics shared by the processes"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.settings_override = override_settings(
+            QUERY_LOG_DIR=self.directory,
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def test_exited_processes_folded(self):
+        """Test the statistics of exited processes are kept in a total"""
+        with open(os.path.join(
+            self.directory, 'queries_99999999_1.json',
+        ), 'w') as stats_file:
+            json.dump({'SELECT ?': {
+                'count': 2, 'total': 0.5, 'max': 0.3, 'plan': None,
+            }}, stats_file)
+        stats = query_log.QueryStats()
+        stats.record('SELECT 1', 0.1)
+
+        first = stats.collect()
+        second = stats.collect()
+
+        self.assertEqual(first['SELECT ?']['count'], 3)
+        self.assertEqual(second, first)
+        self.assertFalse(os.path.exists(
+            os.path.join(self.directory, 'queries_99999999_1.json'),
+        ))
+
+    def test_reset_clears_other_processes(self):
+        """Test a reset clears the statistics of the other processes"""
+        worker = query_log.QueryStats()
+        worker.record('SELECT 1', 0.1)
+        worker.flush()
+
+        with patch('core.query_log.time.time', return_value=time.time() + 1):
+            query_log.QueryStats().reset()
+        worker.flush()
+
+        self.assertEqual(worker.snapshot(), {})
+        self.assertEqual(worker.collect(), {})
+        worker.record('SELECT 1', 0.1)
+        worker.flush()
+        self.assertEqual(worker.collect()['SELECT ?']['count'], 1)
@@ -0,0 +1,99 @@
+"""
+Tests for the recipe summaries
+"""
+
+import io
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core import recipe_summaries
+from core.models import Ingredient, Recipe, RecipeSummary, Tag
+
+
+class RecipeSummaryTests(TestCase):
+    """Test maintaining the recipe summaries"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'test123',
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5,
+            price=Decimal('5.50'),
+        )
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+
+    def summary(self):
+        return RecipeSummary.objects.get(recipe=self.recipe)
+
+    def test_summary_follows_recipe(self):
+        """Test the summary is updated with the recipe and its links"""
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(ingredient)
+        self.recipe.title = 'Tomato soup'
+        self.recipe.save()
+
+        summary = self.summary()
+        self.assertEqual(summary.title, 'Tomato soup')
+        self.assertEqual(summary.price, Decimal('5.50'))
+        self.assertEqual(summary.tags, [{'id': self.tag.id, 'name': 'Vegan'}])
+        self.assertEqual(
+            summary.ingredients, [{'id': ingredient.id, 'name': 'Salt'}],
+        )
+
+        self.tag.recipe_set.clear()
+        self.assertEqual(self.summary().tags, [])
+
+    def test_summary_tag_renamed(self):
+        """Test renaming a tag updates the summaries once committed"""
+        other = Recipe.objects.create(
+            user=self.user, title='Salad', time_minutes=5, price='2.00',
+        )
+        self.tag.recipe_set.add(self.recipe, other)
+
+        with patch.object(recipe_summaries, 'BATCH_SIZE', 1), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.tag.name = 'Vegetarian'
+            self.tag.save()
+            self.assertEqual(self.summary().tags[0]['name'], 'Vegan')
+
+        for recipe in (self.recipe, other):
+            self.assertEqual(recipe.summary.tags[0]['name'], 'Vegetarian')
+
+    def test_summary_tag_deleted(self):
+        """Test deleting a tag updates the summaries once committed"""
+        self.recipe.tags.add(self.tag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.delete()
+
+        self.assertEqual(self.summary().tags, [])
+
+    def test_deferred(self):
+        """Test deferred refreshes run once at the end of the block"""
+        with recipe_summaries.deferred():
+            self.recipe.tags.add(self.tag)
+            self.recipe.save()
+            self.assertEqual(self.summary().tags, [])
+
+        self.assertEqual(len(self.summary().tags), 1)
+
+    def test_refresh_command(self):
+        """Test the command detects and repairs drifted summaries"""
+        RecipeSummary.objects.filter(recipe=self.recipe).update(title='Old')
+        out = io.StringIO()
+
+        with self.assertRaises(CommandError):
+            call_command('refresh_recipe_summaries', check=True, stdout=out)
+        self.assertIn('1 recipe summaries drifted', out.getvalue())
+
+        call_command('refresh_recipe_summaries', stdout=out)
+
+        self.assertEqual(self.summary().title, 'Soup')
+        self.assertEqual(list(recipe_summaries.check()), [])
@@ -0,0 +1,91 @@
+"""
+Tests for the fast JSON renderer and parser
+"""
+
+import datetime
+import io
+from decimal import Decimal
+
+from django.test import SimpleTestCase, override_settings
+from django.utils.translation import gettext_lazy
+
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+
+def sample_payload():
+    """Create and return a payload with the tricky types"""
+    return {
+        'id': 1,
+        'title': 'Crème brûlée\u2028',
+        'price': Decimal('5.50'),
+        'name': gettext_lazy('Dessert'),
+        'created': datetime.datetime(
+            2023, 8, 2, 15, 7, 1, 123456, tzinfo=datetime.timezone.utc,
+        ),
+        'date': datetime.date(2023, 8, 2),
+        'tags': [{'id': 2, 'name': 'Vegan'}],
+        'big': 2 ** 70,
+    }
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test the fast JSON renderer"""
+
+    def test_render_matches_drf(self):
+        """Test output is identical to DRF's JSONRenderer"""
+        payload = sample_payload()
+
+        self.assertEqual(
+            FastJSONRenderer().render(payload),
+            JSONRenderer().render(payload),
+        )
+
+    def test_render_indent_matches_drf(self):
+        """Test indented output is identical to DRF's JSONRenderer"""
+        payload = sample_payload()
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            FastJSONRenderer().render(payload, media_type),
+            JSONRenderer().render(payload, media_type),
+        )
+
+    @override_settings(JSON_BACKEND='json')
+    def test_render_stdlib_backend(self):
+        """Test the stdlib backend can be selected"""
+        payload = sample_payload()
+
+        self.assertEqual(
+            FastJSONRenderer().render(payload),
+            JSONRenderer().render(payload),
+        )
+
+    def test_render_none(self):
+        """Test rendering None returns an empty body"""
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """Test the fast JSON parser"""
+
+    def test_parse(self):
+        """Test parsing a JSON body"""
+        body = b'{"title": "Cr\xc3\xa8me", "price": 5.5, "tags": []}'
+
+        data = FastJSONParser().parse(io.BytesIO(body))
+
+        self.assertEqual(data, {'title': 'Crème', 'price': 5.5, 'tags': []})
+
+    def test_parse_invalid(self):
+        """Test invalid JSON raises a parse error"""
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"title": '))
+
+    def test_parse_non_finite_rejected(self):
+        """Test NaN is rejected like DRF's strict parser"""
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"price": NaN}'))
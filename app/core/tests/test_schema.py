@@ -0,0 +1,75 @@
+"""
+Tests for the cached schema view
+"""
+
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.views import CachedSpectacularAPIView
+
+SCHEMA_URL = reverse('api-schema')
+
+
+@override_settings(SCHEMA_FILE='')
+class CachedSchemaViewTests(TestCase):
+    """Test the cached schema view"""
+
+    def setUp(self):
+        self.client = APIClient()
+        CachedSpectacularAPIView.clear_cache()
+
+    def tearDown(self):
+        CachedSpectacularAPIView.clear_cache()
+
+    def test_schema_generated_once(self):
+        """Test the schema is generated once and served from memory"""
+        generator = CachedSpectacularAPIView.generator_class
+        with patch.object(
+            generator, 'get_schema', autospec=True,
+            side_effect=generator.get_schema,
+        ) as mock_get_schema:
+            res1 = self.client.get(SCHEMA_URL)
+            res2 = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res1.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_get_schema.call_count, 1)
+        self.assertEqual(res1.content, res2.content)
+        self.assertIn(b'/api/recipe/recipes/', res1.content)
+
+    def test_schema_etag(self):
+        """Test a matching If-None-Match returns not modified"""
+        res = self.client.get(SCHEMA_URL)
+        etag = res['ETag']
+
+        res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_schema_formats_cached_separately(self):
+        """Test the JSON and YAML renderings are cached separately"""
+        res_yaml = self.client.get(SCHEMA_URL)
+        res_json = self.client.get(SCHEMA_URL, {'format': 'json'})
+
+        self.assertTrue(res_json.content.startswith(b'{'))
+        self.assertNotEqual(res_yaml['ETag'], res_json['ETag'])
+
+    def test_schema_from_file(self):
+        """Test the pre-generated schema file is served"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'schema.yml')
+            with open(path, 'w') as schema_file:
+                schema_file.write('openapi: 3.0.3\ninfo:\n  title: Built\n')
+
+            with override_settings(SCHEMA_FILE=path):
+                res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(b'title: Built', res.content)
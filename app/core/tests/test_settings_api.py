@@ -0,0 +1,63 @@
+"""
+Tests for the settings of the API-only workers
+"""
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from app import settings_api
+from core.models import Recipe
+from core.views import CachedSpectacularAPIView
+
+
+@override_settings(
+    MIDDLEWARE=settings_api.MIDDLEWARE,
+    ROOT_URLCONF=settings_api.ROOT_URLCONF,
+    REST_FRAMEWORK=settings_api.REST_FRAMEWORK,
+    SCHEMA_FILE='',
+)
+class ApiSettingsTests(TestCase):
+    """Test serving the API with the API-only settings"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'test123',
+        )
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def test_browser_machinery_removed(self):
+        """Test the session, CSRF and admin parts are not loaded"""
+        for name in settings_api.BROWSER_MIDDLEWARE:
+            self.assertNotIn(name, settings_api.MIDDLEWARE)
+        self.assertNotIn('django.contrib.admin', settings_api.INSTALLED_APPS)
+        self.assertEqual(self.client.get('/admin/').status_code, 404)
+
+    def test_token_authenticated_request(self):
+        """Test token authenticated API requests work without sessions"""
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price='2.00',
+        )
+
+        res = self.client.get(reverse('recipe:recipe-list'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()[0]['title'], 'Soup')
+        self.assertFalse(res.has_header('X-Frame-Options'))
+
+    def test_lazy_schema_view(self):
+        """Test the schema view is served from its lazy route"""
+        CachedSpectacularAPIView.clear_cache()
+        self.addCleanup(CachedSpectacularAPIView.clear_cache)
+
+        res = self.client.get(reverse('api-schema'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(b'/api/recipe/recipes/', res.content)
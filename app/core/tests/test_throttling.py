@@ -0,0 +1,159 @@
+"""
+Tests for the throttles
+"""
+
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, \
+    override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.middleware import ConcurrencyLimitMiddleware
+from core.throttling import STORE, BucketStore
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class BucketStoreTests(SimpleTestCase):
+    """Test the token buckets"""
+
+    def setUp(self):
+        cache.clear()
+
+    @patch('core.throttling.time.monotonic')
+    def test_take(self, patched_monotonic):
+        """Test tokens are taken up to the burst then refilled"""
+        patched_monotonic.return_value = 100
+        store = BucketStore()
+
+        self.assertEqual(store.take('key', 2, 1), 0)
+        self.assertEqual(store.take('key', 2, 1), 0)
+        self.assertEqual(store.take('key', 2, 1), 1)
+
+        patched_monotonic.return_value = 101
+        self.assertEqual(store.take('key', 2, 1), 0)
+        self.assertEqual(store.take('other', 2, 1), 0)
+
+    @override_settings(THROTTLE_CACHE_SYNC=True, THROTTLE_SYNC_SECONDS=0)
+    def test_cache_sync(self):
+        """Test workers remove the tokens taken by the others"""
+        worker1, worker2 = BucketStore(), BucketStore()
+
+        worker1.take('key', 3, 0.001)
+        worker1.take('key', 3, 0.001)
+        worker1.take('key', 3, 0.001)
+        worker2.take('key', 3, 0.001)
+        # the tokens of worker1 are only sent at its next sync
+        worker1.take('key', 3, 0.001)
+
+        self.assertGreater(worker2.take('key', 3, 0.001), 0)
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {'user': '10/min', 'recipe-list': '2/min'},
+})
+class ThrottleApiTests(TestCase):
+    """Test throttling the API requests"""
+
+    def setUp(self):
+        STORE.clear()
+        self.addCleanup(STORE.clear)
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'test123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_route_throttle(self):
+        """Test the requests to a route are throttled per user"""
+        for _ in range(2):
+            self.assertEqual(
+                self.client.get(RECIPES_URL).status_code, status.HTTP_200_OK,
+            )
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '30')
+        self.assertEqual(
+            self.client.get(TAGS_URL).status_code, status.HTTP_200_OK,
+        )
+
+    def test_user_throttle(self):
+        """Test all the requests of a user are throttled"""
+        statuses = [self.client.get(TAGS_URL).status_code for _ in range(11)]
+
+        self.assertEqual(statuses.count(status.HTTP_200_OK), 10)
+        self.assertEqual(statuses[-1], status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+@override_settings(THROTTLE_MAX_IN_FLIGHT=1)
+class ConcurrencyLimitMiddlewareTests(SimpleTestCase):
+    """Test the in flight requests limit"""
+
+    def test_concurrent_requests_rejected(self):
+        """Test a client can't run more requests than the limit"""
+        factory = RequestFactory()
+        responses = []
+
+        def view(request):
+            if request.META['HTTP_AUTHORIZATION'] != 'Token abc' or \
+                    responses:
+                return HttpResponse('ok')
+            # a second request of the same client while this one runs
+            responses.append(middleware(factory.get(
+                '/api/recipe/recipes/', HTTP_AUTHORIZATION='Token abc',
+            )))
+            responses.append(middleware(factory.get(
+                '/api/recipe/recipes/', HTTP_AUTHORIZATION='Token other',
+            )))
+            return HttpResponse('ok')
+
+        middleware = ConcurrencyLimitMiddleware(view)
+        first = middleware(factory.get(
+            '/api/recipe/recipes/', HTTP_AUTHORIZATION='Token abc',
+        ))
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(responses[0].status_code, 429)
+        self.assertEqual(responses[0]['Retry-After'], '1')
+        self.assertEqual(responses[1].status_code, 200)
+        # the slot is released once the request is done
+        self.assertEqual(middleware(factory.get(
+            '/api/recipe/recipes/', HTTP_AUTHORIZATION='Token abc',
+        )).status_code, 200)
+
+    @override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK, 'NUM_PROXIES': 1,
+    })
+    def test_anonymous_clients_behind_proxy(self):
+        """Test anonymous clients are told apart by forwarded address"""
+        factory = RequestFactory()
+        responses = []
+
+        def anonymous(address):
+            return factory.get(
+                '/api/recipe/recipes/', REMOTE_ADDR='10.0.0.1',
+                HTTP_X_FORWARDED_FOR=address,
+            )
+
+        def view(request):
+            if not responses:
+                responses.append(middleware(anonymous('203.0.113.1')))
+                responses.append(middleware(anonymous('203.0.113.2')))
+            return HttpResponse('ok')
+
+        middleware = ConcurrencyLimitMiddleware(view)
+        middleware(anonymous('203.0.113.1'))
+
+        self.assertEqual(responses[0].status_code, 429)
+        self.assertEqual(responses[1].status_code, 200)
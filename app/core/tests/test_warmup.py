@@ -0,0 +1,68 @@
+"""
+Tests for the worker warm-up
+"""
+
+from unittest.mock import patch
+
+from django.http import HttpResponse
+from django.test import SimpleTestCase, override_settings
+from django.urls import ResolverMatch, get_resolver
+
+from core import metrics, throttling, warmup
+
+
+class WarmUpTests(SimpleTestCase):
+    """Test the warm-up steps"""
+    databases = ['default']
+
+    def test_warm_up_steps(self):
+        """Test every step runs and is timed"""
+        with patch.object(warmup, 'send_requests') as mock_send:
+            timings = warmup.warm_up()
+
+        self.assertEqual(list(timings), [
+            'apps', 'urls', 'serializers', 'requests',
+        ])
+        mock_send.assert_called_once_with()
+        self.assertTrue(get_resolver()._populated)
+
+    def test_failing_step(self):
+        """Test a failing step is logged and the others still run"""
+        with patch.object(warmup, 'import_apps', side_effect=ValueError), \
+                self.assertLogs('core.warmup', level='ERROR'):
+            timings = warmup.warm_up()
+
+        self.assertIn('requests', timings)
+
+    @override_settings(ALLOWED_HOSTS=['.example.com'])
+    def test_send_requests(self):
+        """Test the paths are sent to their views, outside the middlewares"""
+        requests = []
+
+        def view(request):
+            requests.append(request)
+            return HttpResponse()
+
+        resolver = get_resolver()
+        with patch.object(
+            resolver, 'resolve', return_value=ResolverMatch(view, (), {}),
+        ):
+            warmup.send_requests(['/api/schema/', '/health/ready'])
+
+        self.assertEqual(
+            [request.path for request in requests],
+            ['/api/schema/', '/health/ready'],
+        )
+        self.assertEqual(requests[0].get_host(), 'example.com')
+        self.assertTrue(requests[0].warm_up)
+
+    def test_requests_not_counted(self):
+        """Test the warm-up requests are not in the metrics nor throttled"""
+        with patch.object(throttling.STORE, 'take') as mock_take, \
+                patch.object(
+                    metrics.REQUEST_DURATION, 'observe',
+                ) as mock_observe:
+            warmup.send_requests(['/api/schema/'])
+
+        mock_take.assert_not_called()
+        mock_observe.assert_not_called()
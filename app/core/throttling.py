@@ -0,0 +1,190 @@
+"""
+Token bucket throttles per user and per route
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from rest_framework import throttling
+from rest_framework.settings import api_settings
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """Return the (capacity, tokens per second) of a '<count>/<period>'"""
+    count, period = rate.split('/')
+    count = int(count)
+    return count, count / PERIODS[period[0]]
+
+
+class TokenBucket:
+    """Tokens left in a bucket and its cache synchronization state"""
+
+    def __init__(self, capacity, rate, now):
+        self.tokens = capacity
+        self.updated = now
+        self.refill_seconds = capacity / rate
+        # tokens taken since the last sync, and the cache total seen then
+        self.pending = 0
+        self.seen = 0
+        self.synced = now
+
+
+class BucketStore:
+    """
+    Token buckets of the worker process.
+
+    With THROTTLE_CACHE_SYNC set, every bucket adds the tokens it took to a
+    counter of the Django cache at most every THROTTLE_SYNC_SECONDS, and
+    removes the tokens the other workers took meanwhile.
+    """
+    max_buckets = 10000
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def _refill(self, bucket, capacity, rate, now):
+        bucket.tokens = min(
+            capacity, bucket.tokens + (now - bucket.updated) * rate,
+        )
+        bucket.updated = now
+
+    def _prune(self, now):
+        """Forget the buckets which refilled, they start full anyway"""
+        for key, bucket in list(self._buckets.items()):
+            if now - bucket.updated > bucket.refill_seconds and \
+                    not bucket.pending:
+                del self._buckets[key]
+
+    def _sync(self, key, bucket):
+        """Exchange the tokens taken with the other workers"""
+        with self._lock:
+            pending = bucket.pending
+            bucket.pending = 0
+            bucket.synced = time.monotonic()
+        cache_key = f'throttle:{key}'
+        # the counter is useless once every bucket would have refilled
+        timeout = max(int(bucket.refill_seconds * 2), 1)
+        if cache.add(cache_key, pending, timeout):
+            total = pending
+        else:
+            try:
+                total = cache.incr(cache_key, pending)
+            except ValueError:
+                # expired between the add and the incr
+                cache.set(cache_key, pending, timeout)
+                total = pending
+        with self._lock:
+            # a total lower than seen means the counter expired
+            taken = max(total - bucket.seen - pending, 0)
+            bucket.tokens = max(bucket.tokens - taken, 0)
+            bucket.seen = total
+
+    def take(self, key, capacity, rate):
+        """
+        Take a token from the bucket of the key, return 0 if there was
+        one, else the seconds until there is one
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_buckets:
+                    self._prune(now)
+                bucket = self._buckets[key] = TokenBucket(
+                    capacity, rate, now,
+                )
+            sync = settings.THROTTLE_CACHE_SYNC and \
+                now - bucket.synced >= settings.THROTTLE_SYNC_SECONDS
+        if sync:
+            self._sync(key, bucket)
+
+        with self._lock:
+            self._refill(bucket, capacity, rate, now)
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                bucket.pending += 1
+                return 0
+            return (1 - bucket.tokens) / rate
+
+
+STORE = BucketStore()
+
+
+def unthrottled_settings():
+    """Return the settings overrides turning the throttles off"""
+    return {
+        'THROTTLE_MAX_IN_FLIGHT': 0,
+        'REST_FRAMEWORK': {
+            **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_CLASSES': [],
+        },
+    }
+
+
+class TokenBucketThrottle(throttling.BaseThrottle):
+    """
+    Throttle taking a token from a bucket per request. The rate of a scope
+    in DEFAULT_THROTTLE_RATES, e.g. '60/min', gives both the refill rate and
+    the burst size. Scopes without a rate are not throttled.
+    """
+
+    def get_scope(self, request, view):
+        raise NotImplementedError('.get_scope() must be overridden')
+
+    def get_ident(self, request):
+        """Identify the user, or the client address if anonymous"""
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return f'user:{user.pk}'
+        return f'anon:{super().get_ident(request)}'
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        if getattr(request, 'warm_up', False):
+            # sent by the worker to itself, see core.warmup.send_requests
+            return True
+        scope = self.get_scope(request, view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if scope is None or rate is None:
+            return True
+
+        capacity, refill = parse_rate(rate)
+        self.wait_seconds = STORE.take(
+            f'{scope}:{self.get_ident(request)}', capacity, refill,
+        )
+        return self.wait_seconds == 0
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Throttle all the requests of a user, scope 'user' or 'anon'"""
+
+    def get_scope(self, request, view):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return 'user'
+        return 'anon'
+
+
+class RouteTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Throttle the requests of a user to a route, scope is the URL name
+    without its `async-` prefix
+    """
+
+    def get_scope(self, request, view):
+        match = request.resolver_match
+        name = match.url_name if match else None
+        # the async variants of the routes share their buckets
+        return name and name.removeprefix('async-')
@@ -0,0 +1,112 @@
+"""
+Views shared by the whole project
+"""
+
+import hashlib
+import ipaddress
+import os
+
+import yaml
+from drf_spectacular.views import SpectacularAPIView
+
+from django.conf import settings
+from django.http import (
+    HttpResponse,
+    HttpResponseForbidden,
+    HttpResponseNotModified,
+)
+from django.views.decorators.http import require_GET
+from django.utils import translation
+from django.utils.http import quote_etag
+
+from core.metrics import REGISTRY, record_cache
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """
+    OpenAPI schema view serving the schema from memory.
+
+    The schema is read from SCHEMA_FILE (generated at build time with
+    `manage.py spectacular --file`) or generated once on the first request,
+    and each rendering is kept for the life of the process, so it is only
+    invalidated by a deploy. Responses carry an ETag, and the compressed
+    renderings made by the CompressionMiddleware are cached with them.
+    """
+    # rendered schemas, their ETag and compressed renderings by encoding,
+    # by (media type, language, version)
+    _cache = {}
+
+    @classmethod
+    def clear_cache(cls):
+        """Forget the cached schemas"""
+        cls._cache.clear()
+
+    def _load_schema(self, request, version):
+        """Return the schema, from SCHEMA_FILE when possible"""
+        path = settings.SCHEMA_FILE
+        if path and os.path.exists(path) and not request.GET.get('lang'):
+            with open(path) as schema_file:
+                return yaml.safe_load(schema_file)
+
+        generator = self.generator_class(
+            urlconf=self.urlconf,
+            api_version=version,
+            patterns=self.patterns,
+        )
+        return generator.get_schema(request=request, public=self.serve_public)
+
+    def _get_schema_response(self, request):
+        version = self.api_version or request.version or \
+            self._get_version_parameter(request)
+        key = (
+            request.accepted_media_type,
+            translation.get_language(),
+            version,
+        )
+        record_cache('schema', key in self._cache)
+        if key not in self._cache:
+            content = request.accepted_renderer.render(
+                self._load_schema(request, version),
+                request.accepted_media_type,
+                self.get_renderer_context(),
+            )
+            etag = quote_etag(hashlib.sha256(content).hexdigest())
+            self._cache[key] = (content, etag, {})
+
+        content, etag, variants = self._cache[key]
+        if etag in request.headers.get('If-None-Match', ''):
+            return HttpResponseNotModified(headers={'ETag': etag})
+
+        content_type = request.accepted_media_type
+        if request.accepted_renderer.charset:
+            content_type += f'; charset={request.accepted_renderer.charset}'
+        response = HttpResponse(content, content_type=content_type, headers={
+            'ETag': etag,
+            'Content-Disposition':
+                f'inline; filename="{self._get_filename(request, version)}"',
+        })
+        response.compressed_variants = variants
+        return response
+
+
+def _metrics_allowed(address):
+    """Return whether the address is in METRICS_ALLOWED_NETWORKS"""
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network)
+        for network in settings.METRICS_ALLOWED_NETWORKS
+    )
+
+
+@require_GET
+def metrics(request):
+    """Return the metrics of all the processes in the Prometheus format"""
+    if not _metrics_allowed(request.META.get('REMOTE_ADDR', '')):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        REGISTRY.collect(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,165 @@
+"""
+Warm-up of the worker processes before they serve requests
+"""
+
+import io
+import json
+import logging
+import sys
+import threading
+import time
+from importlib import import_module
+
+from django.apps import apps
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections, connections
+from django.urls import URLResolver, get_resolver
+from django.utils.module_loading import module_has_submodule
+
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+# modules of the project apps imported ahead of the first request, the
+# views are imported with the URL patterns which route to them
+MODULES = ('models', 'serializers')
+
+# set once the warm-up started by `start` is over
+_done = threading.Event()
+_started = False
+
+
+def _project_apps():
+    """Return the configs of the apps of the project, not the libraries"""
+    return [
+        config for config in apps.get_app_configs()
+        if config.path.startswith(str(settings.BASE_DIR))
+    ]
+
+
+def import_apps():
+    """Import the modules of the project apps"""
+    for config in _project_apps():
+        for name in MODULES:
+            if module_has_submodule(config.module, name):
+                import_module(f'{config.name}.{name}')
+
+
+def compile_urls(resolver=None):
+    """
+    Import the URL configurations, compile their patterns and build the
+    reverse lookup tables
+    """
+    resolver = resolver or get_resolver()
+    resolver.reverse_dict
+    for pattern in resolver.url_patterns:
+        pattern.pattern.regex
+        if isinstance(pattern, URLResolver):
+            compile_urls(pattern)
+
+
+def _subclasses(cls):
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _subclasses(subclass)
+
+
+def build_serializers():
+    """Build the fields of the serializers of the project apps"""
+    names = {config.name for config in _project_apps()}
+    for cls in set(_subclasses(serializers.Serializer)):
+        if cls.__module__.split('.')[0] not in names:
+            continue
+        try:
+            cls().fields
+        except Exception:
+            # abstract serializers or ones needing arguments
+            logger.debug('Serializer %s not warmed up', cls, exc_info=True)
+
+
+def send_requests(paths=None):
+    """
+    Send GET requests to the paths straight to their views. The requests
+    skip the middlewares, so they are not counted in the metrics, and are
+    marked with `warm_up` for the throttles to let them through.
+    """
+    resolver = get_resolver()
+    host = next((
+        host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'
+    ), 'localhost')
+    for path in settings.WARM_UP_PATHS if paths is None else paths:
+        request = WSGIRequest({
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '',
+            'SERVER_NAME': host, 'SERVER_PORT': '80', 'HTTP_HOST': host,
+            'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+            'wsgi.url_scheme': 'http',
+        })
+        request.warm_up = True
+        request.resolver_match = match = resolver.resolve(path)
+        response = match.func(request, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        response.close()
+
+
+def warm_up():
+    """
+    Run the warm-up steps and return their durations in seconds by step.
+    A failing step is logged and does not stop the others.
+    """
+    timings = {}
+    for name, step in (
+        ('apps', import_apps),
+        ('urls', compile_urls),
+        ('serializers', build_serializers),
+        ('requests', send_requests),
+    ):
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception('Warm-up step %s failed', name)
+        timings[name] = time.perf_counter() - start
+    return timings
+
+
+def _run(background):
+    timings = warm_up()
+    if background:
+        # connections belong to the thread, the request threads open theirs
+        connections.close_all()
+    else:
+        # as after a request, close the connections past CONN_MAX_AGE
+        close_old_connections()
+    _done.set()
+    logger.info(json.dumps({
+        f'warm_up_{name}_ms': round(seconds * 1000, 2)
+        for name, seconds in timings.items()
+    }))
+
+
+def start():
+    """
+    Warm the worker up according to WARM_UP: 'sync' before returning,
+    'background' in a thread while it serves requests, or 'off'.
+
+    Only a sync warm-up with DB_CONN_MAX_AGE > 0 hands its database
+    connection over to the requests, the connections of a background one
+    belong to its thread and are closed when it ends.
+    """
+    global _started
+    if settings.WARM_UP == 'off' or _started:
+        return
+    _started = True
+    if settings.WARM_UP == 'background':
+        threading.Thread(
+            target=_run, args=(True,), name='warm-up', daemon=True,
+        ).start()
+    else:
+        _run(False)
+
+
+def is_ready():
+    """Return False while the warm-up started by `start` is running"""
+    return not _started or _done.is_set()
@@ -2,8 +2,15 @@
 Serializers for recipe API
 """
 
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models.query import QuerySet
+
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 
+from core import recipe_summaries
 from core.models import Recipe, Tag, Ingredient
 
 
@@ -45,11 +52,16 @@ class RecipeSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
     # _ is a convention for private methods
+    # The tags and ingredients are locked until the recipe is saved, so
+    # prune_orphans (which skips locked rows) cannot delete one between
+    # its lookup and the link to the recipe. They are locked in name
+    # order, so two requests never wait for each other's locks
     def _get_or_create_ingredients(self, ingredients, recipe):
         """handle getting or createing ingrediants as nedded"""
         auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
+        queryset = Ingredient.objects.select_for_update()
+        for ingredient in sorted(ingredients, key=lambda row: row['name']):
+            ingredient_obj, created = queryset.get_or_create(
                 user=auth_user,
                 **ingredient,
             )
@@ -58,13 +70,16 @@ class RecipeSerializer(serializers.ModelSerializer):
     def _get_or_create_tags(self, tags, recipe):
         """handle getting or createing tage as nedded"""
         auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
+        queryset = Tag.objects.select_for_update()
+        for tag in sorted(tags, key=lambda row: row['name']):
+            tag_obj, created = queryset.get_or_create(
                 user=auth_user,
                 **tag,
             )
             recipe.tags.add(tag_obj)
 
+    @transaction.atomic
+    @recipe_summaries.deferred()
     def create(self, validated_data):
         """Create a recipe"""
         tags = validated_data.pop('tags', [])
@@ -74,6 +89,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         self._get_or_create_ingredients(ingredients, recipe)
         return recipe
 
+    @transaction.atomic
+    @recipe_summaries.deferred()
     def update(self, instance, validated_data):
         """Update a recipe"""
         tags = validated_data.pop('tags', [])
@@ -107,3 +124,132 @@ class RecipeImageSerializer(serializers.ModelSerializer):
         fields = ('id', 'image')
         read_only_fields = ('id',)
         extra_kwargs = {'image': {'required': True}}
+
+
+class RecipeReadListSerializer(serializers.ListSerializer):
+    """List serializer fetching the related rows once for all recipes"""
+
+    def to_representation(self, data):
+        return self.child.to_representation_many(data)
+
+
+class RecipeReadSerializer(serializers.BaseSerializer):
+    """
+    Read only serializer for recipe list responses.
+
+    Builds the same output as RecipeSerializer straight from `.values()`
+    rows, with one query per many to many relation instead of a nested
+    serializer per recipe.
+    """
+    fields = RecipeSerializer.Meta.fields
+    related_fields = ('tags', 'ingredients')
+    price_field = serializers.DecimalField(max_digits=5, decimal_places=2)
+
+    class Meta:
+        list_serializer_class = RecipeReadListSerializer
+
+    def __init__(self, *args, fields=None, **kwargs):
+        # `fields` restricts or extends the output (sparse fieldsets)
+        if fields is not None:
+            self.fields = list(fields)
+        super().__init__(*args, **kwargs)
+
+    def to_representation(self, instance):
+        return self.to_representation_many([instance])[0]
+
+    def _rows(self, data):
+        """Return the scalar fields of the recipes as dicts"""
+        names = ['id'] + [
+            f for f in self.fields
+            if f not in self.related_fields and f != 'id'
+        ]
+        if isinstance(data, QuerySet):
+            return list(data.values(*names))
+        return [{name: getattr(obj, name) for name in names} for obj in data]
+
+    def _related(self, relation, recipe_ids):
+        """Return the (id, name) pairs of a relation grouped by recipe"""
+        field = Recipe._meta.get_field(relation)
+        through = field.remote_field.through
+        target = field.related_model._meta.model_name
+        links = through.objects.filter(
+            recipe_id__in=recipe_ids,
+        ).order_by(
+            f'{target}_id',
+        ).values_list('recipe_id', f'{target}_id', f'{target}__name')
+
+        related = defaultdict(list)
+        for recipe_id, obj_id, name in links:
+            related[recipe_id].append({'id': obj_id, 'name': name})
+        return related
+
+    def _image_url(self, name):
+        """Return the image representation like DRF's ImageField"""
+        name = getattr(name, 'name', name)
+        if not name:
+            return None
+        if not api_settings.UPLOADED_FILES_USE_URL:
+            return name
+        url = Recipe._meta.get_field('image').storage.url(name)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def to_representation_many(self, data):
+        """Return the representation of all recipes in `data`"""
+        rows = self._rows(data)
+        recipe_ids = [row['id'] for row in rows]
+        related = {
+            relation: self._related(relation, recipe_ids)
+            for relation in self.related_fields
+            if relation in self.fields
+        }
+
+        results = []
+        for row in rows:
+            # keep the field order of the model serializers
+            result = {}
+            for name in self.fields:
+                if name in related:
+                    result[name] = related[name].get(row['id'], [])
+                elif name == 'price':
+                    result[name] = self.price_field.to_representation(
+                        row[name]
+                    )
+                elif name == 'image':
+                    result[name] = self._image_url(row[name])
+                else:
+                    result[name] = row[name]
+            results.append(result)
+        return results
+
+
+class RecipeDetailReadSerializer(RecipeReadSerializer):
+    """Read only serializer for recipe detail responses"""
+    fields = RecipeDetailSerializer.Meta.fields
+
+
+class RecipeSummaryReadSerializer(RecipeReadSerializer):
+    """
+    Read only serializer for recipe list responses built from the
+    RecipeSummary rows, for the fields they hold
+    """
+
+    def to_representation_many(self, data):
+        """Return the representation of all summaries in `data`"""
+        names = [name for name in self.fields if name != 'id']
+        results = []
+        for row in data.values('recipe_id', *names):
+            result = {}
+            for name in self.fields:
+                if name == 'id':
+                    result[name] = row['recipe_id']
+                elif name == 'price':
+                    result[name] = self.price_field.to_representation(
+                        row[name]
+                    )
+                else:
+                    result[name] = row[name]
+            results.append(result)
+        return results
@@ -0,0 +1,134 @@
+"""
+Tests for the async recipe api read endpoints
+"""
+
+from asgiref.sync import async_to_sync
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+from core.throttling import STORE
+
+RECIPES_URL = reverse('recipe:recipe-list')
+ASYNC_RECIPES_URL = reverse('recipe:async-recipe-list')
+ASYNC_TAGS_URL = reverse('recipe:async-tag-list')
+ASYNC_INGREDIENTS_URL = reverse('recipe:async-ingredient-list')
+
+
+def async_detail_url(recipe_id):
+    """Create and return an async recipe detail url"""
+    return reverse('recipe:async-recipe-detail', args=[recipe_id])
+
+
+class AsyncReadViewsTests(TransactionTestCase):
+    """Test the async read endpoints match the sync ones"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'test123',
+        )
+        token = Token.objects.create(user=self.user)
+        self.authorization = f'Token {token.key}'
+        self.client = APIClient(enforce_csrf_checks=True)
+        self.client.credentials(HTTP_AUTHORIZATION=self.authorization)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=10,
+            price='5.00',
+        )
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        self.recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Salt')
+        )
+
+    def test_auth_required(self):
+        """Test that authentication is required"""
+        res = APIClient().get(ASYNC_RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_recipe_list(self):
+        """Test the async recipe list matches the sync one"""
+        res = self.client.get(ASYNC_RECIPES_URL, {'fields': 'id,tags'})
+        expected = self.client.get(
+            reverse('recipe:recipe-list'), {'fields': 'id,tags'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.content, expected.content)
+
+    def test_asgi_request(self):
+        """Test the async recipe list runs through the ASGI middlewares"""
+        expected = self.client.get(RECIPES_URL)
+
+        async def get():
+            return await AsyncClient().get(
+                ASYNC_RECIPES_URL, authorization=self.authorization,
+            )
+
+        res = async_to_sync(get)()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.content, expected.content)
+        self.assertNotIn('desc="0 queries"', res['Server-Timing'])
+
+    def test_recipe_detail(self):
+        """Test the async recipe detail matches the sync one"""
+        res = self.client.get(async_detail_url(self.recipe.id))
+        expected = self.client.get(
+            reverse('recipe:recipe-detail', args=[self.recipe.id]),
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.content, expected.content)
+
+    def test_recipe_detail_not_found(self):
+        """Test retrieving a missing recipe returns 404"""
+        res = self.client.get(async_detail_url(self.recipe.id + 1))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tags_and_ingredients_list(self):
+        """Test the async tag and ingredient lists"""
+        for url, name in ((ASYNC_TAGS_URL, 'Vegan'),
+                          (ASYNC_INGREDIENTS_URL, 'Salt')):
+            res = self.client.get(url)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.json()[0]['name'], name)
+
+    def test_read_only(self):
+        """Test the async endpoints do not accept writes"""
+        res = self.client.post(ASYNC_RECIPES_URL, {'title': 'New'})
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    @override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {'recipe-list': '2/min'},
+    })
+    def test_route_throttle_shared(self):
+        """Test the async recipe list shares the throttle of the sync one"""
+        STORE.clear()
+        self.addCleanup(STORE.clear)
+        for _ in range(2):
+            self.assertEqual(
+                self.client.get(RECIPES_URL).status_code, status.HTTP_200_OK,
+            )
+
+        res = self.client.get(ASYNC_RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
@@ -0,0 +1,134 @@
+"""
+Parity tests for the read only recipe serializers
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+
+from recipe.serializers import (
+    RecipeSerializer,
+    RecipeDetailSerializer,
+    RecipeReadSerializer,
+    RecipeDetailReadSerializer,
+)
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.00'),
+        'description': 'Sample description',
+        'link': 'https://sample.com',
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def render(data):
+    """Render serializer data to JSON bytes"""
+    return JSONRenderer().render(data)
+
+
+class ReadSerializerParityTests(TestCase):
+    """Test the read only serializers match the model serializers"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'test123',
+        )
+        self.request = APIRequestFactory().get('/api/recipe/recipes/')
+        self.context = {'request': self.request}
+
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dessert')
+        ingredient = Ingredient.objects.create(user=self.user, name='Sugar')
+
+        r1 = create_recipe(
+            user=self.user,
+            title='Crème brûlée',
+            price=Decimal('12.5'),
+        )
+        r1.tags.add(tag2, tag1)
+        r1.ingredients.add(ingredient)
+        r2 = create_recipe(user=self.user, title='Tea', price=Decimal('0.99'))
+        r2.tags.add(tag1)
+        create_recipe(user=self.user, title='Toast', link='')
+
+    def tearDown(self):
+        for recipe in Recipe.objects.all():
+            recipe.image.delete()
+
+    def test_list_parity(self):
+        """Test list output is byte identical"""
+        recipes = Recipe.objects.all().order_by('-id')
+
+        expected = RecipeSerializer(
+            recipes, many=True, context=self.context,
+        ).data
+        result = RecipeReadSerializer(
+            recipes, many=True, context=self.context,
+        ).data
+
+        self.assertEqual(render(result), render(expected))
+
+    def test_detail_parity(self):
+        """Test detail output is byte identical"""
+        for recipe in Recipe.objects.all():
+            expected = RecipeDetailSerializer(
+                recipe, context=self.context,
+            ).data
+            result = RecipeDetailReadSerializer(
+                recipe, context=self.context,
+            ).data
+
+            self.assertEqual(render(result), render(expected))
+
+    def test_detail_list_parity_with_image(self):
+        """Test detail output with images is byte identical"""
+        recipe = Recipe.objects.first()
+        recipe.image = SimpleUploadedFile('image.jpg', b'data')
+        recipe.save()
+        recipes = Recipe.objects.all().order_by('id')
+
+        for context in (self.context, {}):
+            expected = RecipeDetailSerializer(
+                recipes, many=True, context=context,
+            ).data
+            result = RecipeDetailReadSerializer(
+                recipes, many=True, context=context,
+            ).data
+
+            self.assertEqual(render(result), render(expected))
+
+    def test_list_query_count(self):
+        """Test the list is built with a constant number of queries"""
+        recipes = Recipe.objects.all().order_by('-id')
+
+        with self.assertNumQueries(3):
+            RecipeReadSerializer(
+                recipes, many=True, context=self.context,
+            ).data
+
+    def test_empty_list(self):
+        """Test an empty queryset gives an empty list"""
+        result = RecipeReadSerializer(
+            Recipe.objects.none(), many=True, context=self.context,
+        ).data
+
+        self.assertEqual(result, [])
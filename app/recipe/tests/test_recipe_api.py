@@ -5,11 +5,14 @@ Test for recipe api
 from decimal import Decimal
 import tempfile
 import os
+import unittest
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
@@ -181,6 +184,42 @@ class PrivateRecipeApiTests(TestCase):
             ).exists()
             self.assertTrue(exists)
 
+    @unittest.skipUnless(
+        connection.features.has_select_for_update, 'needs FOR UPDATE',
+    )
+    def test_create_recipe_locks_tags(self):
+        """Test the tags of a recipe are locked until it is saved"""
+        Tag.objects.create(user=self.user, name='Protein')
+        payload = {
+            'title': 'Cheesecake', 'time_minutes': 30, 'price': '5.00',
+            'tags': [{'name': 'Protein'}],
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertTrue(any(
+            '"core_tag"' in query['sql'] and 'FOR UPDATE' in query['sql']
+            for query in queries
+        ))
+
+    def test_create_recipe_tags_in_name_order(self):
+        """Test the tags are looked up and locked in name order"""
+        payload = {
+            'title': 'Cheesecake', 'time_minutes': 30, 'price': '5.00',
+            'tags': [{'name': 'Vegan'}, {'name': 'Dinner'}],
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(RECIPES_URL, payload, format='json')
+
+        names = [
+            name for query in queries if '"core_tag"' in query['sql']
+            for name in ('Dinner', 'Vegan') if f"'{name}'" in query['sql']
+        ]
+        self.assertEqual(names[0], 'Dinner')
+        self.assertEqual(names[-1], 'Vegan')
+
     def test_create_recipe_with_existing_tag(self):
         """Test creating a recipe with existing tag"""
         tag1 = Tag.objects.create(user=self.user, name="Protein")
@@ -474,6 +513,135 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(s2.data, res.data)
         self.assertNotIn(s3.data, res.data)
 
+    def test_list_sparse_fields(self):
+        """Test limiting the recipe list to some fields"""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(sample_tag(user=self.user))
+
+        # one query for the recipes, none for tags and ingredients
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [{'id': recipe.id, 'title': recipe.title}])
+
+    def test_list_from_summaries(self):
+        """Test the list is read from the summaries with one query"""
+        recipe1 = create_recipe(user=self.user)
+        recipe2 = create_recipe(user=self.user, title='Pancakes')
+        tag = sample_tag(user=self.user)
+        recipe1.tags.add(tag)
+        recipe2.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Flour')
+        )
+        self.client.patch(details_url(recipe1.id), {
+            'title': 'Soup', 'tags': [{'name': 'Vegan'}],
+        }, format='json')
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL)
+        with self.assertNumQueries(1):
+            res_filtered = self.client.get(
+                RECIPES_URL, {'tags': f'{tag.id},0'},
+            )
+
+        recipes = Recipe.objects.order_by('-id')
+        self.assertEqual(res.data, RecipeSerializer(recipes, many=True).data)
+        self.assertEqual(res.data[1]['tags'][0]['name'], 'Vegan')
+        self.assertEqual(res_filtered.data, [])
+
+    def test_list_expand_fields(self):
+        """Test adding detail fields to the recipe list"""
+        recipe = create_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL, {'expand': 'description'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        expected = RecipeSerializer(recipe).data
+        expected['description'] = recipe.description
+        self.assertEqual(res.data, [expected])
+
+    def test_multi_get(self):
+        """Test fetching recipes by ID in one request"""
+        recipe1 = create_recipe(user=self.user, title='Soup')
+        recipe2 = create_recipe(user=self.user, title='Pancakes')
+        create_recipe(user=self.user, title='Not requested')
+        other = create_recipe(
+            user=create_user(email='other@example.com', password='test123'),
+        )
+
+        res = self.client.get(RECIPES_URL, {
+            'ids': f'{recipe2.id},{other.id},{recipe1.id},0,{recipe2.id}',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [
+            RecipeDetailSerializer(recipe2).data,
+            RecipeDetailSerializer(recipe1).data,
+        ])
+        self.assertEqual(res.data['missing'], [other.id, 0])
+
+    def test_multi_get_summary_fields(self):
+        """Test fetching recipes by ID with the fields of the list"""
+        recipe = create_recipe(user=self.user)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, {
+                'ids': f'{recipe.id}',
+                'fields': ','.join(RecipeSerializer.Meta.fields),
+            })
+
+        self.assertEqual(
+            res.data['results'], [RecipeSerializer(recipe).data],
+        )
+
+    def test_multi_get_detail_fields(self):
+        """Test fetching recipes by ID with detail and sparse fields"""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(sample_tag(user=self.user))
+
+        res = self.client.get(RECIPES_URL, {
+            'ids': f'{recipe.id}', 'fields': 'title,description,tags',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [{
+            'id': recipe.id,
+            'title': recipe.title,
+            'tags': RecipeSerializer(recipe).data['tags'],
+            'description': recipe.description,
+        }])
+        self.assertEqual(res.data['missing'], [])
+
+    @override_settings(RECIPE_IDS_MAX=2)
+    def test_multi_get_limits(self):
+        """Test too many or malformed IDs are rejected"""
+        res_many = self.client.get(RECIPES_URL, {'ids': '1,2,3'})
+        res_invalid = self.client.get(RECIPES_URL, {'ids': '1,a'})
+
+        self.assertEqual(res_many.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res_invalid.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_detail_sparse_fields(self):
+        """Test limiting the recipe detail to some fields"""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(sample_tag(user=self.user))
+
+        url = details_url(recipe.id)
+        res = self.client.get(url, {'fields': 'title,tags'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'title': recipe.title,
+            'tags': RecipeSerializer(recipe).data['tags'],
+        })
+
+    def test_unknown_fields_rejected(self):
+        """Test requesting unknown fields returns an error"""
+        res = self.client.get(RECIPES_URL, {'fields': 'title,user'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class imageUploadTest(TestCase):
     """Test image upload"""
@@ -151,3 +151,24 @@ class PrivateTagsApi(TestCase):
         res = self.client.get(TAGS_URL, payload)
 
         self.assertEqual(len(res.data), 1)
+
+    def test_order_tags_by_usage(self):
+        """Test ordering tags by number of recipes"""
+        tag1 = Tag.objects.create(user=self.user, name="Breakfast")
+        tag2 = Tag.objects.create(user=self.user, name="Lunch")
+        tag3 = Tag.objects.create(user=self.user, name="Dinner")
+        for title in ("Eggs", "Toast"):
+            recipe = Recipe.objects.create(
+                title=title,
+                time_minutes=10,
+                price=5.00,
+                user=self.user,
+            )
+            recipe.tags.add(tag1)
+        recipe.tags.add(tag3)
+
+        res = self.client.get(TAGS_URL, {"ordering": "usage"})
+
+        self.assertEqual(
+            [tag["id"] for tag in res.data], [tag1.id, tag3.id, tag2.id],
+        )
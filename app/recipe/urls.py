@@ -5,7 +5,7 @@ from django.urls import path, include
 
 from rest_framework.routers import DefaultRouter
 
-from recipe import views
+from recipe import views, async_views
 
 # create endpoints for the viewset
 router = DefaultRouter()
@@ -17,4 +17,21 @@ app_name = 'recipe'
 
 urlpatterns = [
     path('', include(router.urls)),
+    # async variants of the read endpoints, for ASGI workers
+    path(
+        'async/recipes/',
+        async_views.recipe_list,
+        name='async-recipe-list',
+    ),
+    path(
+        'async/recipes/<int:pk>/',
+        async_views.recipe_detail,
+        name='async-recipe-detail',
+    ),
+    path('async/tags/', async_views.tag_list, name='async-tag-list'),
+    path(
+        'async/ingredients/',
+        async_views.ingredient_list,
+        name='async-ingredient-list',
+    ),
 ]
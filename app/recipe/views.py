@@ -9,6 +9,8 @@ from drf_spectacular.utils import (
     OpenApiTypes,
 )
 
+from django.conf import settings
+
 from rest_framework import (
     viewsets,
     mixins,
@@ -17,10 +19,15 @@ from rest_framework import (
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
+from core.authentication import SignedTokenAuthentication
+from core.instrumentation import TimedListModelMixin, timed
+from core.metrics import IMAGE_UPLOAD_BYTES
 from core.models import (
     Recipe,
+    RecipeSummary,
     Tag,
     Ingredient,
 )
@@ -28,6 +35,23 @@ from core.models import (
 from recipe import serializers
 
 
+# sparse fieldsets parameters of the recipe read endpoints
+FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        'fields',
+        OpenApiTypes.STR,
+        description="Coma separated list of fields to return, one of: " +
+        ", ".join(serializers.RecipeDetailReadSerializer.fields),
+    ),
+    OpenApiParameter(
+        'expand',
+        OpenApiTypes.STR,
+        description="Coma separated list of fields to add to the default " +
+        "ones, e.g. description,image on the list",
+    ),
+]
+
+
 # details of the viewsets
 @extend_schema_view(
     list=extend_schema(
@@ -42,20 +66,82 @@ from recipe import serializers
                 OpenApiTypes.STR,
                 description="Coma separated list of Ingredients to filter",
             ),
-        ],
-    )
+            OpenApiParameter(
+                'ids',
+                OpenApiTypes.STR,
+                description="Coma separated list of recipe IDs to fetch. "
+                "The response is then an object with the recipes in the "
+                "order of the IDs as `results` and the IDs of the recipes "
+                "not found as `missing`. The recipes have the fields of the "
+                "recipe detail unless `fields` is given",
+            ),
+        ] + FIELDS_PARAMETERS,
+    ),
+    retrieve=extend_schema(parameters=FIELDS_PARAMETERS),
 )
 class RecipeViewSet(viewsets.ModelViewSet):
     """View for manage recpie api"""
     serializer_class = serializers.RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [
+        TokenAuthentication,
+        SignedTokenAuthentication,
+    ]
     permission_classes = [IsAuthenticated]
 
     def _params_to_ints(self, qs):
         """Convert a list of strings to integers"""
         return [int(str_id) for str_id in qs.split(',')]
 
+    def _params_to_list(self, qs):
+        """Convert a coma separated string to a list of names"""
+        return [name.strip() for name in qs.split(',') if name.strip()]
+
+    def _get_ids(self):
+        """Return the recipe IDs requested with `ids`, None without"""
+        if 'ids' not in self.request.query_params:
+            return None
+        try:
+            ids = self._params_to_ints(self.request.query_params['ids'])
+        except ValueError:
+            raise ValidationError(
+                {'ids': 'Expected a coma separated list of IDs'}
+            )
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > settings.RECIPE_IDS_MAX:
+            raise ValidationError(
+                {'ids': f'At most {settings.RECIPE_IDS_MAX} IDs per request'}
+            )
+        return ids
+
+    def _get_fields(self, ids=None):
+        """
+        Return the fields requested with `fields` and `expand`, by default
+        the ones of the list or, when fetching recipes by `ids`, the detail
+        """
+        all_fields = serializers.RecipeDetailReadSerializer.fields
+        if self.action == 'list' and ids is None:
+            default = serializers.RecipeReadSerializer.fields
+        else:
+            default = all_fields
+
+        requested = self.request.query_params.get('fields')
+        expand = self.request.query_params.get('expand')
+        fields = set(self._params_to_list(requested) if requested else default)
+        if expand:
+            fields.update(self._params_to_list(expand))
+        if ids is not None:
+            # the IDs tell the recipes found from the missing ones
+            fields.add('id')
+
+        unknown = fields.difference(all_fields)
+        if unknown:
+            raise ValidationError(
+                {'fields': f'Unknown fields: {", ".join(sorted(unknown))}'}
+            )
+
+        return [name for name in all_fields if name in fields]
+
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
         tags = self.request.query_params.get('tags')
@@ -67,11 +153,20 @@ class RecipeViewSet(viewsets.ModelViewSet):
         if ingredients:
             ingredient_ids = self._params_to_ints(ingredients)
             queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+        if self.action == 'retrieve':
+            queryset = self._only_fields(queryset, self._get_fields())
 
         return queryset.filter(
             user=self.request.user
         ).order_by('-id').distinct()
 
+    def _only_fields(self, queryset, fields):
+        """Only load the columns of the requested fields"""
+        return queryset.only('id', *[
+            name for name in fields
+            if name not in serializers.RecipeReadSerializer.related_fields
+        ])
+
     def get_serializer_class(self):
         """Return appropriate serializer class"""
         if self.action == 'list':
@@ -81,6 +176,76 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return self.serializer_class
 
+    def _get_summaries(self, ids):
+        """Return the summaries of the recipes the list would return"""
+        queryset = RecipeSummary.objects.filter(user=self.request.user)
+        if ids is not None:
+            queryset = queryset.filter(recipe_id__in=ids)
+        for param, through, column in (
+            ('tags', Recipe.tags.through, 'tag_id'),
+            ('ingredients', Recipe.ingredients.through, 'ingredient_id'),
+        ):
+            related_ids = self.request.query_params.get(param)
+            if related_ids:
+                recipe_ids = through.objects.filter(
+                    **{f'{column}__in': self._params_to_ints(related_ids)}
+                ).values('recipe_id')
+                queryset = queryset.filter(recipe_id__in=recipe_ids)
+        return queryset.order_by('-recipe_id')
+
+    def _multi_get_response(self, ids, recipes):
+        """Return the recipes in the order of the IDs and the missing IDs"""
+        found = {recipe['id']: recipe for recipe in recipes}
+        return Response({
+            'results': [found[pk] for pk in ids if pk in found],
+            'missing': [pk for pk in ids if pk not in found],
+        })
+
+    def list(self, request, *args, **kwargs):
+        """
+        List recipes from their summaries, or through the read only
+        serializer for the fields the summaries don't hold. With `ids`,
+        return the recipes of these IDs and the IDs not found.
+        """
+        ids = self._get_ids()
+        fields = self._get_fields(ids)
+        if set(fields) <= set(serializers.RecipeSummaryReadSerializer.fields):
+            serializer = serializers.RecipeSummaryReadSerializer(
+                self._get_summaries(ids),
+                many=True,
+                fields=fields,
+                context=self.get_serializer_context(),
+            )
+        else:
+            queryset = self._only_fields(
+                self.filter_queryset(self.get_queryset()), fields,
+            )
+            if ids is not None:
+                queryset = queryset.filter(id__in=ids)
+            serializer = serializers.RecipeReadSerializer(
+                queryset,
+                many=True,
+                fields=fields,
+                context=self.get_serializer_context(),
+            )
+
+        with timed('serialize'):
+            data = serializer.data
+        if ids is not None:
+            return self._multi_get_response(ids, data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a recipe through the read only serializer"""
+        serializer = serializers.RecipeDetailReadSerializer(
+            self.get_object(),
+            fields=self._get_fields(),
+            context=self.get_serializer_context(),
+        )
+        with timed('serialize'):
+            data = serializer.data
+        return Response(data)
+
     def perform_create(self, serializer):
         """Create a new recipe"""
         serializer.save(user=self.request.user)
@@ -96,6 +261,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         if serializer.is_valid():
             serializer.save()
+            IMAGE_UPLOAD_BYTES.observe(serializer.validated_data['image'].size)
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK,
@@ -115,17 +281,26 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 OpenApiTypes.BOOL,
                 description="Filter only assigned items",
             ),
+            OpenApiParameter(
+                'ordering',
+                OpenApiTypes.STR,
+                enum=['name', 'usage'],
+                description="Order by name, or by number of recipes",
+            ),
         ],
     )
 )
 class BaseRecipeAttrViewSet(
                 mixins.DestroyModelMixin,
                 mixins.UpdateModelMixin,
-                mixins.ListModelMixin,
+                TimedListModelMixin,
                 viewsets.GenericViewSet
             ):
     """Base viewset for user owned recipe attributes"""
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [
+        TokenAuthentication,
+        SignedTokenAuthentication,
+    ]
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -135,11 +310,12 @@ class BaseRecipeAttrViewSet(
         )
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = queryset.filter(recipe_count__gt=0)
+        ordering = ['-name']
+        if self.request.query_params.get('ordering') == 'usage':
+            ordering = ['-recipe_count', '-name']
 
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-name').distinct()
+        return queryset.filter(user=self.request.user).order_by(*ordering)
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
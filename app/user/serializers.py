@@ -10,6 +10,8 @@ from django.contrib.auth import (
 
 from django.utils.translation import gettext as _
 
+from core.hashers import hashing_slot
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for users object"""
@@ -26,7 +28,8 @@ class UserSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         """Create a new user with encrypted password and return it"""
-        return get_user_model().objects.create_user(**validated_data)
+        with hashing_slot():
+            return get_user_model().objects.create_user(**validated_data)
 
     def update(self, instance, validated_data):
         """Update a user, setting the password correctly and return it"""
@@ -37,13 +40,39 @@ class UserSerializer(serializers.ModelSerializer):
         # Si le mot de passe n'est pas vide
         if password:
             # On met à jour le mot de passe
-            user.set_password(password)
+            with hashing_slot():
+                user.set_password(password)
             # On sauvegarde l'utilisateur
             user.save()
 
         return user
 
 
+class BulkUserSerializer(serializers.Serializer):
+    """Serializer for a row of a bulk user creation"""
+    # rows are validated when creating the users so that one bad row
+    # is reported without rejecting the whole request
+    email = serializers.CharField(allow_blank=True)
+    password = serializers.CharField(
+        allow_blank=True,
+        write_only=True,
+        style={'input_type': 'password'},
+        trim_whitespace=False,
+    )
+    name = serializers.CharField(allow_blank=True, required=False)
+
+
+class BulkCreateUserSerializer(serializers.Serializer):
+    """Serializer for bulk user creation"""
+    users = BulkUserSerializer(many=True)
+
+
+class BulkCreateUserResultSerializer(serializers.Serializer):
+    """Serializer for the result of a bulk user creation"""
+    created = serializers.IntegerField()
+    failures = serializers.ListField(child=serializers.DictField())
+
+
 class AuthTokenSerializer(serializers.Serializer):
     """Serializer for the user auth toker """
 
@@ -57,11 +86,12 @@ class AuthTokenSerializer(serializers.Serializer):
         """Validate and authenticate the user"""
         email = attrs.get('email')
         password = attrs.get('password')
-        user = authenticate(
-            request=self.context.get('request'),
-            username=email,
-            password=password,
-        )
+        with hashing_slot():
+            user = authenticate(
+                request=self.context.get('request'),
+                username=email,
+                password=password,
+            )
         if not user:
             # On lève une exception si l'utilisateur n'est pas trouvé
             msg = _('Unable to authenticate with provided credentials')
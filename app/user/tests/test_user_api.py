@@ -3,11 +3,12 @@ Tests for the user api
 """
 
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
 from rest_framework import status
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 
 # On définit l'URL pour créer un utilisateur.
@@ -15,6 +16,8 @@ from rest_framework.test import APIClient
 CREATE_USER_URL = reverse('user:create')  # /api/user/create
 TOKEN_URl = reverse('user:token')  # /api/user/token
 ME_URL = reverse('user:me')  # /api/user/me
+REVOKE_URL = reverse('user:token-revoke')  # /api/user/token/revoke
+BULK_CREATE_URL = reverse('user:bulk-create')  # /api/user/bulk-create
 
 
 def create_user(**params):
@@ -169,3 +172,142 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+@override_settings(AUTH_TOKEN_MODE='signed', SIGNED_TOKEN_MAX_AGE=60)
+class SignedTokenApiTests(TestCase):
+    """Test the signed token mode"""
+
+    def setUp(self):
+        self.user = create_user(
+            email='test@example.com',
+            password='testpass123',
+            name='Test Name',
+        )
+        self.client = APIClient()
+
+    def _get_token(self):
+        res = self.client.post(TOKEN_URl, {
+            'email': 'test@example.com',
+            'password': 'testpass123',
+        })
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data['token']
+
+    def test_signed_token_without_db_token(self):
+        """Test a signed token is issued without a token row"""
+        token = self._get_token()
+
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_signed_token_tampered(self):
+        """Test a tampered token is rejected"""
+        token = self._get_token()
+        user_id, rest = token.split(':', 1)
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {int(user_id) + 1}:{rest}'
+        )
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_signed_token_expired(self):
+        """Test an expired token is rejected"""
+        token = self._get_token()
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with override_settings(SIGNED_TOKEN_MAX_AGE=-1):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_signed_token_revoked(self):
+        """Test revoking the tokens of the user"""
+        token = self._get_token()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        res = self.client.post(REVOKE_URL)
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_signed_token_user_cached(self):
+        """Test the user of a signed token is not loaded every request"""
+        token = self._get_token()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_signed_token_revoked_by_password_change(self):
+        """Test changing the password revokes the signed tokens"""
+        token = self._get_token()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        res = self.client.patch(ME_URL, {'password': 'newpass123'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class BulkCreateUserApiTests(TestCase):
+    """Test the admin only bulk user creation"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_superuser(
+            'admin@example.com',
+            'testpass123',
+        )
+
+    def test_bulk_create_admin_only(self):
+        """Test non admin users cannot create users in bulk"""
+        user = create_user(email='user@example.com', password='testpass123')
+        self.client.force_authenticate(user=user)
+
+        res = self.client.post(BULK_CREATE_URL, {'users': []}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_bulk_create(self):
+        """Test creating users in bulk reports the failing rows"""
+        self.client.force_authenticate(user=self.admin)
+        payload = {'users': [
+            {'email': 'user1@example.com', 'password': 'pass123'},
+            {'email': 'admin@example.com', 'password': 'pass123'},
+        ]}
+
+        res = self.client.post(BULK_CREATE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 1)
+        self.assertEqual(res.data['failures'], [{
+            'row': 1, 'email': 'admin@example.com', 'error': 'Already exists',
+        }])
+
+    @override_settings(USER_BULK_CREATE_MAX_ROWS=1)
+    def test_bulk_create_too_many_rows(self):
+        """Test the number of users per request is capped"""
+        self.client.force_authenticate(user=self.admin)
+        payload = {'users': [
+            {'email': 'user1@example.com', 'password': 'pass123'},
+            {'email': 'user2@example.com', 'password': 'pass123'},
+        ]}
+
+        res = self.client.post(BULK_CREATE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(get_user_model().objects.filter(
+            email='user1@example.com',
+        ).exists())
@@ -1,13 +1,34 @@
 """
 Viexs for the user api
 """
-from rest_framework import generics, authentication, permissions
+from drf_spectacular.utils import extend_schema
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from rest_framework import (
+    generics,
+    authentication,
+    permissions,
+    status,
+    views,
+)
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
+from core.authentication import (
+    SignedTokenAuthentication,
+    create_signed_token,
+)
+from core.db_routers import pin_authorization
+from core.hashers import hashing_slot
+from core.instrumentation import TimedRetrieveModelMixin
 from user.serializers import (
     UserSerializer,
     AuthTokenSerializer,
+    BulkCreateUserSerializer,
+    BulkCreateUserResultSerializer,
 )
 
 
@@ -17,6 +38,40 @@ class CreateUserView(generics.CreateAPIView):
     serializer_class = UserSerializer
 
 
+class BulkCreateUserView(generics.GenericAPIView):
+    """Create many users at once, for admins only"""
+    serializer_class = BulkCreateUserSerializer
+    authentication_classes = [
+        authentication.TokenAuthentication,
+        SignedTokenAuthentication,
+    ]
+    permission_classes = [permissions.IsAdminUser]
+
+    @extend_schema(responses={200: BulkCreateUserResultSerializer})
+    def post(self, request):
+        """Create the users, reporting the rows that failed"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        users = serializer.validated_data['users']
+        if len(users) > settings.USER_BULK_CREATE_MAX_ROWS:
+            return Response(
+                {'users': [
+                    f'At most {settings.USER_BULK_CREATE_MAX_ROWS} users '
+                    'per request, use the bulk_create_users command for '
+                    'larger imports'
+                ]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # a hashing slot like a login, the rows are hashed in turn
+        with hashing_slot():
+            created, failures = get_user_model().objects.bulk_create_users(
+                users,
+                processes=settings.USER_BULK_CREATE_PROCESSES,
+            )
+        return Response({'created': created, 'failures': failures})
+
+
 class CreateTokenView(ObtainAuthToken):
     """Create a new auth token for user"""
     # On définit le serializer
@@ -24,12 +79,46 @@ class CreateTokenView(ObtainAuthToken):
     # On définit le renderer pour pouvoir voir la vue dans le navigateur
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
+    def post(self, request, *args, **kwargs):
+        """Return a signed token or a database token per AUTH_TOKEN_MODE"""
+        if settings.AUTH_TOKEN_MODE != 'signed':
+            response = super().post(request, *args, **kwargs)
+            keyword = authentication.TokenAuthentication.keyword
+        else:
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            user = serializer.validated_data['user']
+            response = Response({'token': create_signed_token(user)})
+            keyword = SignedTokenAuthentication.keyword
+
+        # the token may not have reached the replicas yet
+        pin_authorization(f'{keyword} {response.data["token"]}')
+        return response
+
+
+class RevokeTokensView(views.APIView):
+    """Revoke every signed token of the authenticated user"""
+    authentication_classes = [
+        authentication.TokenAuthentication,
+        SignedTokenAuthentication,
+    ]
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(request=None, responses={204: None})
+    def post(self, request):
+        """Revoke the tokens"""
+        request.user.revoke_tokens()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(TimedRetrieveModelMixin, generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
     # On définit l'authentification
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [
+        authentication.TokenAuthentication,
+        SignedTokenAuthentication,
+    ]
     # On définit les permissions
     permission_classes = [permissions.IsAuthenticated]
 